@@ -0,0 +1,102 @@
+# _*_ coding: utf-8 _*_
+"""Command line of benchmark suite.
+
+    python -m benchmarks run --size 10 --output base.json
+    python -m benchmarks run --release R4B --resource Bundle --operation json
+    python -m benchmarks compare base.json new.json --threshold 0.1
+"""
+import argparse
+import json
+import sys
+import typing
+
+from .runner import OPERATIONS, collect, compare, load_result, run
+from .synthetic import RELEASES, RESOURCE_TYPES
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+
+def _print_result(name: str, result: typing.Dict[str, typing.Any]) -> None:
+    """ """
+    print(
+        f"{name:<40} min {result['min'] * 1e6:12.2f}us  "
+        f"median {result['median'] * 1e6:12.2f}us  ({result['number']} loops)",
+        file=sys.stderr,
+    )
+
+
+def command_run(args: argparse.Namespace) -> int:
+    """ """
+    cases = collect(
+        releases=args.release,
+        resource_types=args.resource,
+        operations=args.operation,
+        size=args.size,
+    )
+    output = run(
+        cases,
+        size=args.size,
+        repeat=args.repeat,
+        min_time=args.min_time,
+        progress=_print_result,
+    )
+    data = json.dumps(output, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fp:
+            fp.write(data)
+    else:
+        print(data)
+    return 0
+
+
+def command_compare(args: argparse.Namespace) -> int:
+    """Exit code is ``1``, if any benchmark is slower than threshold."""
+    rows = compare(
+        load_result(args.base),
+        load_result(args.new),
+        threshold=args.threshold,
+        key=args.key,
+    )
+    for row in rows:
+        print(
+            f"{row['name']:<40} {row['base'] * 1e6:12.2f}us "
+            f"{row['new'] * 1e6:12.2f}us  x{row['ratio']:5.2f}  {row['status']}"
+        )
+    return 1 if any(row["status"] == "slower" for row in rows) else 0
+
+
+def main(argv: typing.List[str] = None) -> int:
+    """ """
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    run_parser = commands.add_parser("run", help="run benchmarks")
+    run_parser.add_argument("--release", action="append", choices=RELEASES)
+    run_parser.add_argument("--resource", action="append", choices=RESOURCE_TYPES)
+    run_parser.add_argument("--operation", action="append", choices=OPERATIONS)
+    run_parser.add_argument(
+        "--size", type=int, default=10, help="number of repeated elements"
+    )
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument(
+        "--min-time", type=float, default=0.2, help="seconds per repeat"
+    )
+    run_parser.add_argument("--output", "-o", help="JSON result file")
+    run_parser.set_defaults(func=command_run)
+
+    compare_parser = commands.add_parser("compare", help="compare two results")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.1)
+    compare_parser.add_argument(
+        "--key", choices=("min", "median"), default="min", help="timing to compare"
+    )
+    compare_parser.set_defaults(func=command_compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+# _*_ coding: utf-8 _*_
+"""Micro benchmark of FHIR date/time primitives validation,
+fast (regex free) path vs regex path.
+Before timing, both paths are checked for identical accept/reject
+behaviour over the same samples, which are used in test suite.
+
+    python -m benchmarks.bench_dateparse
+"""
+import sys
+import timeit
+
+from tests.test_dateparse import DATE_TYPES, get_samples, outcome
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+VALUES = {
+    "Date": ["2018", "1973-06", "1905-08-23"],
+    "DateTime": [
+        "2018",
+        "1905-08-23",
+        "2015-02-07T13:28:17-05:00",
+        "2017-01-01T00:00:00.000Z",
+    ],
+    "Instant": ["2015-02-07T13:28:17.239+02:00", "2017-01-01T00:00:00Z"],
+    "Time": ["13:28:17", "13:28:17.239"],
+}
+
+
+def check_equivalence() -> int:
+    """Returns number of compared samples."""
+    samples = get_samples()
+    for klass in DATE_TYPES:
+        for value in samples:
+            if outcome(klass.validate, value) != outcome(klass._validate_regex, value):
+                raise AssertionError(
+                    f"{klass.__module__}.{klass.__name__}: {value!r} differs."
+                )
+    return len(samples) * len(DATE_TYPES)
+
+
+def run(number: int = 20000) -> None:
+    """ """
+    print(f"{check_equivalence()} samples are identical in both paths.")
+    for klass in DATE_TYPES:
+        values = VALUES[klass.__name__]
+        fast = timeit.timeit(lambda: [klass.validate(v) for v in values], number=number)
+        regex = timeit.timeit(
+            lambda: [klass._validate_regex(v) for v in values], number=number
+        )
+        per_call = 1e6 / (number * len(values))
+        print(
+            f"{klass.__module__.split('.')[-2]:>10}.{klass.__name__:<10}"
+            f"fast {fast * per_call:6.2f}us  regex {regex * per_call:6.2f}us  "
+            f"x{regex / fast:4.1f}"
+        )
+
+
+if __name__ == "__main__":
+    run(*map(int, sys.argv[1:]))
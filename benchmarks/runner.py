@@ -0,0 +1,229 @@
+# _*_ coding: utf-8 _*_
+"""Benchmark cases (release x resource type x operation), timing
+and comparison of machine-readable (JSON) results between commits."""
+import datetime
+import gc
+import importlib
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import timeit
+import typing
+
+from .synthetic import RELEASES, RESOURCE_TYPES, generate
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+OPERATIONS = (
+    "parse_obj",
+    "parse_raw",
+    "dict",
+    "json",
+    "round_trip",
+    "construct",
+    "construct_trusted",
+    "xml",
+    "xml_loads",
+    "yaml",
+    "yaml_loads",
+)
+# DSTU2 has no xml/yaml support and no trusted construction.
+RELEASE_OPERATIONS = {
+    "R4B": OPERATIONS,
+    "STU3": OPERATIONS,
+    "DSTU2": ("parse_obj", "parse_raw", "dict", "json", "round_trip", "construct"),
+}
+RESULT_FORMAT_VERSION = 1
+
+
+class Case(typing.NamedTuple):
+    """ """
+
+    release: str
+    resource_type: str
+    operation: str
+    func: typing.Callable[[], typing.Any]
+
+    @property
+    def name(self) -> str:
+        """ """
+        return f"{self.release}.{self.resource_type}.{self.operation}"
+
+
+def get_package(release: str):
+    """ """
+    if release == "R4B":
+        return importlib.import_module("fhir.resources")
+    return importlib.import_module(f"fhir.resources.{release}")
+
+
+def _operation_funcs(
+    release: str, resource_type: str, size: int
+) -> typing.Dict[str, typing.Callable[[], typing.Any]]:
+    """Payloads are prepared once, so only the operation itself is timed."""
+    package = get_package(release)
+    klass = package.get_fhir_model_class(resource_type)
+    data = generate(release, resource_type, size)
+    model = klass.parse_obj(data)
+    raw = model.json(return_bytes=True)
+    construct = package.construct_fhir_element
+
+    funcs = {
+        "parse_obj": lambda: klass.parse_obj(data),
+        "parse_raw": lambda: klass.parse_raw(raw),
+        "dict": lambda: model.dict(),
+        "json": lambda: model.json(),
+        "round_trip": lambda: klass.parse_raw(model.json()),
+        "construct": lambda: construct(resource_type, data),
+    }
+    if "construct_trusted" in RELEASE_OPERATIONS[release]:
+        funcs["construct_trusted"] = lambda: construct(
+            resource_type, data, validate=False
+        )
+    if "xml" in RELEASE_OPERATIONS[release]:
+        xml = model.xml(return_bytes=True)
+        yaml = model.yaml(return_bytes=True)
+        funcs["xml"] = lambda: model.xml()
+        funcs["xml_loads"] = lambda: klass.parse_raw(xml, content_type="text/xml")
+        funcs["yaml"] = lambda: model.yaml()
+        funcs["yaml_loads"] = lambda: klass.parse_raw(yaml, content_type="text/yaml")
+    return funcs
+
+
+def collect(
+    releases: typing.Iterable[str] = None,
+    resource_types: typing.Iterable[str] = None,
+    operations: typing.Iterable[str] = None,
+    size: int = 10,
+) -> typing.List[Case]:
+    """ """
+    cases = list()
+    for release in releases or RELEASES:
+        for resource_type in resource_types or RESOURCE_TYPES:
+            funcs = _operation_funcs(release, resource_type, size)
+            for operation in operations or OPERATIONS:
+                if operation in funcs:
+                    cases.append(
+                        Case(release, resource_type, operation, funcs[operation])
+                    )
+    return cases
+
+
+def measure(
+    func: typing.Callable[[], typing.Any],
+    repeat: int = 5,
+    min_time: float = 0.2,
+) -> typing.Dict[str, typing.Any]:
+    """Timings are per call (seconds), number of loops per repeat
+    is calibrated so that each repeat takes at least ``min_time``."""
+    # warm up, i.e. compiled (per class) plans and caches
+    func()
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time / 10 or number >= 1e6:
+            break
+        number *= 10
+    number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+
+    gc.collect()
+    timings = [elapsed / number for elapsed in timer.repeat(repeat, number)]
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "max": max(timings),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def get_git_revision() -> typing.Optional[str]:
+    """ """
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(
+    cases: typing.Iterable[Case],
+    size: int = 10,
+    repeat: int = 5,
+    min_time: float = 0.2,
+    progress: typing.Callable[[str, typing.Dict[str, typing.Any]], None] = None,
+) -> typing.Dict[str, typing.Any]:
+    """ """
+    from fhir.resources import __version__
+
+    results = dict()
+    for case in cases:
+        result = measure(case.func, repeat=repeat, min_time=min_time)
+        result.update(
+            release=case.release,
+            resource_type=case.resource_type,
+            operation=case.operation,
+        )
+        results[case.name] = result
+        if progress is not None:
+            progress(case.name, result)
+
+    return {
+        "version": RESULT_FORMAT_VERSION,
+        "meta": {
+            "fhir.resources": __version__,
+            "git_revision": get_git_revision(),
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "size": size,
+            "repeat": repeat,
+            "min_time": min_time,
+        },
+        "results": results,
+    }
+
+
+def compare(
+    base: typing.Dict[str, typing.Any],
+    new: typing.Dict[str, typing.Any],
+    threshold: float = 0.1,
+    key: str = "min",
+) -> typing.List[typing.Dict[str, typing.Any]]:
+    """Benchmarks present in both results; ``ratio`` is new/base time,
+    ``status`` is ``slower`` or ``faster`` when ratio is beyond threshold."""
+    rows = list()
+    for name, base_result in base["results"].items():
+        if name not in new["results"]:
+            continue
+        ratio = new["results"][name][key] / base_result[key]
+        status = "same"
+        if ratio > 1 + threshold:
+            status = "slower"
+        elif ratio < 1 - threshold:
+            status = "faster"
+        rows.append(
+            {
+                "name": name,
+                "base": base_result[key],
+                "new": new["results"][name][key],
+                "ratio": ratio,
+                "status": status,
+            }
+        )
+    return rows
+
+
+def load_result(path: str) -> typing.Dict[str, typing.Any]:
+    """ """
+    with open(path, "r", encoding="utf-8") as fp:
+        return json.load(fp)
@@ -0,0 +1,135 @@
+# _*_ coding: utf-8 _*_
+"""Synthetic (locally generated) resources for benchmarks, so the suite
+runs offline. ``size`` controls the number of repeated elements
+(identifiers, components, questionnaire items, bundle entries)."""
+import typing
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+RELEASES = ("R4B", "STU3", "DSTU2")
+RESOURCE_TYPES = ("Patient", "Observation", "Questionnaire", "Bundle")
+
+
+def patient(release: str, size: int, index: int = 0) -> typing.Dict[str, typing.Any]:
+    """ """
+    family: typing.Union[str, typing.List[str]] = f"Family{index}"
+    if release == "DSTU2":
+        family = [family]
+    return {
+        "resourceType": "Patient",
+        "id": f"patient-{index}",
+        "meta": {"lastUpdated": "2022-05-28T10:15:30.123+02:00"},
+        "identifier": [
+            {"system": "http://example.org/mrn", "value": f"{index}-{i}"}
+            for i in range(size)
+        ],
+        "active": True,
+        "name": [{"use": "official", "family": family, "given": ["Given", "Middle"]}],
+        "telecom": [{"system": "phone", "value": "+31 20 1234567", "use": "home"}],
+        "gender": "female",
+        "birthDate": "1974-12-25",
+        "address": [
+            {
+                "line": ["Van Egmondkade 23"],
+                "city": "Amsterdam",
+                "postalCode": "1024 RJ",
+                "country": "NLD",
+            }
+        ],
+    }
+
+
+def _quantity(value: float) -> typing.Dict[str, typing.Any]:
+    """ """
+    return {
+        "value": value,
+        "unit": "mmHg",
+        "system": "http://unitsofmeasure.org",
+        "code": "mm[Hg]",
+    }
+
+
+def _concept(code: str) -> typing.Dict[str, typing.Any]:
+    """ """
+    return {
+        "coding": [{"system": "http://loinc.org", "code": code, "display": code}],
+        "text": code,
+    }
+
+
+def observation(
+    release: str, size: int, index: int = 0
+) -> typing.Dict[str, typing.Any]:
+    """ """
+    return {
+        "resourceType": "Observation",
+        "id": f"observation-{index}",
+        "status": "final",
+        "code": _concept("85354-9"),
+        "subject": {"reference": f"Patient/patient-{index}"},
+        "effectiveDateTime": "2022-05-28T10:15:30+02:00",
+        "issued": "2022-05-28T10:15:30.123+02:00",
+        "valueQuantity": _quantity(120.5),
+        "component": [
+            {"code": _concept(f"8480-{i}"), "valueQuantity": _quantity(80.0 + i)}
+            for i in range(size)
+        ],
+    }
+
+
+def questionnaire(
+    release: str, size: int, index: int = 0
+) -> typing.Dict[str, typing.Any]:
+    """ """
+    questions = [
+        {"linkId": f"1.{i}", "text": f"Question {i}?", "type": "string"}
+        for i in range(size)
+    ]
+    data: typing.Dict[str, typing.Any] = {
+        "resourceType": "Questionnaire",
+        "id": f"questionnaire-{index}",
+        "date": "2022-05-28",
+    }
+    if release == "DSTU2":
+        data["status"] = "published"
+        data["group"] = {"linkId": "1", "text": "Group", "question": questions}
+    else:
+        data["status"] = "active"
+        data["item"] = [
+            {"linkId": "1", "text": "Group", "type": "group", "item": questions}
+        ]
+    return data
+
+
+def bundle(release: str, size: int, index: int = 0) -> typing.Dict[str, typing.Any]:
+    """Collection of patients and observations, ``size`` entries."""
+    entries = list()
+    for i in range(size):
+        resource = (patient if i % 2 == 0 else observation)(release, 3, i)
+        entries.append(
+            {
+                "fullUrl": f"http://example.org/{resource['resourceType']}/{i}",
+                "resource": resource,
+            }
+        )
+    return {
+        "resourceType": "Bundle",
+        "id": f"bundle-{index}",
+        "type": "collection",
+        "entry": entries,
+    }
+
+
+GENERATORS: typing.Dict[str, typing.Callable[..., typing.Dict[str, typing.Any]]] = {
+    "Patient": patient,
+    "Observation": observation,
+    "Questionnaire": questionnaire,
+    "Bundle": bundle,
+}
+
+
+def generate(
+    release: str, resource_type: str, size: int = 10
+) -> typing.Dict[str, typing.Any]:
+    """ """
+    return GENERATORS[resource_type](release, size)
@@ -3,7 +3,7 @@ from pathlib import Path
 from typing import Any, Dict, Union
 
 from .fhirabstractmodel import FHIRAbstractModel
-from .fhirtypesvalidators import get_fhir_model_class
+from .fhirtypesvalidators import get_fhir_model_class, warmup
 
 __fhir_version__ = "1.0.2"
 
@@ -25,4 +25,4 @@ def construct_fhir_element(
     return klass.parse_obj(data)
 
 
-__all__ = ["get_fhir_model_class", "construct_fhir_element"]
+__all__ = ["get_fhir_model_class", "construct_fhir_element", "warmup"]
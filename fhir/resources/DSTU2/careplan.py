@@ -10,6 +10,8 @@ from typing import List as ListType
 
 from pydantic import Field, root_validator
 
+from fhir.resources.core.validators import validate_choice_fields
+
 from . import fhirtypes
 from .backboneelement import BackboneElement
 from .domainresource import DomainResource
@@ -375,30 +377,7 @@ class CarePlanActivityDetail(BackboneElement):
         choice of types, the authoring system must create a single element with a
         data type chosen from among the list of permitted data types.
         """
-        one_of_many_fields = {
-            "scheduled": ["scheduledPeriod", "scheduledString", "scheduledTiming"],
-            "product": ["productCodeableConcept", "productReference"],
-        }
-        for prefix, fields in one_of_many_fields.items():
-            assert cls.__fields__[fields[0]].field_info.extra["one_of_many"] == prefix
-            required = (
-                cls.__fields__[fields[0]].field_info.extra["one_of_many_required"]
-                is True
-            )
-            found = False
-            for field in fields:
-                if field in values and values[field] is not None:
-                    if found is True:
-                        raise ValueError(
-                            "Any of one field value is expected from "
-                            f"this list {fields}, but got multiple!"
-                        )
-                    else:
-                        found = True
-            if required is True and found is False:
-                raise ValueError(f"Expect any of field value from this list {fields}.")
-
-        return values
+        return validate_choice_fields(cls, values)
 
 
 class CarePlanParticipant(BackboneElement):
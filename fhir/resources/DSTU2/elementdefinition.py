@@ -10,6 +10,8 @@ from typing import List as ListType
 
 from pydantic import Field, root_validator
 
+from fhir.resources.core.validators import validate_choice_fields
+
 from . import backboneelement, element, fhirtypes
 
 
@@ -2749,194 +2751,7 @@ class ElementDefinition(backboneelement.BackboneElement):
         choice of types, the authoring system must create a single element with a
         data type chosen from among the list of permitted data types.
         """
-        one_of_many_fields = {
-            "defaultValue": [
-                "defaultValueAddress",
-                "defaultValueAnnotation",
-                "defaultValueAttachment",
-                "defaultValueBase64Binary",
-                "defaultValueBoolean",
-                "defaultValueCode",
-                "defaultValueCodeableConcept",
-                "defaultValueCoding",
-                "defaultValueContactPoint",
-                "defaultValueDate",
-                "defaultValueDateTime",
-                "defaultValueDecimal",
-                "defaultValueHumanName",
-                "defaultValueId",
-                "defaultValueIdentifier",
-                "defaultValueInstant",
-                "defaultValueInteger",
-                "defaultValueMarkdown",
-                "defaultValueMeta",
-                "defaultValueMoney",
-                "defaultValueOid",
-                "defaultValuePeriod",
-                "defaultValuePositiveInt",
-                "defaultValueQuantity",
-                "defaultValueRange",
-                "defaultValueRatio",
-                "defaultValueReference",
-                "defaultValueSampledData",
-                "defaultValueSignature",
-                "defaultValueString",
-                "defaultValueTime",
-                "defaultValueTiming",
-                "defaultValueUnsignedInt",
-                "defaultValueUri",
-            ],
-            "example": [
-                "exampleAddress",
-                "exampleAnnotation",
-                "exampleAttachment",
-                "exampleBase64Binary",
-                "exampleBoolean",
-                "exampleCode",
-                "exampleCodeableConcept",
-                "exampleCoding",
-                "exampleContactPoint",
-                "exampleDate",
-                "exampleDateTime",
-                "exampleDecimal",
-                "exampleHumanName",
-                "exampleId",
-                "exampleIdentifier",
-                "exampleInstant",
-                "exampleInteger",
-                "exampleMarkdown",
-                "exampleMeta",
-                "exampleMoney",
-                "exampleOid",
-                "examplePeriod",
-                "examplePositiveInt",
-                "exampleQuantity",
-                "exampleRange",
-                "exampleRatio",
-                "exampleReference",
-                "exampleSampledData",
-                "exampleSignature",
-                "exampleString",
-                "exampleTime",
-                "exampleTiming",
-                "exampleUnsignedInt",
-                "exampleUri",
-            ],
-            "fixed": [
-                "fixedAddress",
-                "fixedAnnotation",
-                "fixedAttachment",
-                "fixedBase64Binary",
-                "fixedBoolean",
-                "fixedCode",
-                "fixedCodeableConcept",
-                "fixedCoding",
-                "fixedContactPoint",
-                "fixedDate",
-                "fixedDateTime",
-                "fixedDecimal",
-                "fixedHumanName",
-                "fixedId",
-                "fixedIdentifier",
-                "fixedInstant",
-                "fixedInteger",
-                "fixedMarkdown",
-                "fixedMeta",
-                "fixedMoney",
-                "fixedOid",
-                "fixedPeriod",
-                "fixedPositiveInt",
-                "fixedQuantity",
-                "fixedRange",
-                "fixedRatio",
-                "fixedReference",
-                "fixedSampledData",
-                "fixedSignature",
-                "fixedString",
-                "fixedTime",
-                "fixedTiming",
-                "fixedUnsignedInt",
-                "fixedUri",
-            ],
-            "maxValue": [
-                "maxValueDate",
-                "maxValueDateTime",
-                "maxValueDecimal",
-                "maxValueInstant",
-                "maxValueInteger",
-                "maxValuePositiveInt",
-                "maxValueQuantity",
-                "maxValueTime",
-                "maxValueUnsignedInt",
-            ],
-            "minValue": [
-                "minValueDate",
-                "minValueDateTime",
-                "minValueDecimal",
-                "minValueInstant",
-                "minValueInteger",
-                "minValuePositiveInt",
-                "minValueQuantity",
-                "minValueTime",
-                "minValueUnsignedInt",
-            ],
-            "pattern": [
-                "patternAddress",
-                "patternAnnotation",
-                "patternAttachment",
-                "patternBase64Binary",
-                "patternBoolean",
-                "patternCode",
-                "patternCodeableConcept",
-                "patternCoding",
-                "patternContactPoint",
-                "patternDate",
-                "patternDateTime",
-                "patternDecimal",
-                "patternHumanName",
-                "patternId",
-                "patternIdentifier",
-                "patternInstant",
-                "patternInteger",
-                "patternMarkdown",
-                "patternMeta",
-                "patternMoney",
-                "patternOid",
-                "patternPeriod",
-                "patternPositiveInt",
-                "patternQuantity",
-                "patternRange",
-                "patternRatio",
-                "patternReference",
-                "patternSampledData",
-                "patternSignature",
-                "patternString",
-                "patternTime",
-                "patternTiming",
-                "patternUnsignedInt",
-                "patternUri",
-            ],
-        }
-        for prefix, fields in one_of_many_fields.items():
-            assert cls.__fields__[fields[0]].field_info.extra["one_of_many"] == prefix
-            required = (
-                cls.__fields__[fields[0]].field_info.extra["one_of_many_required"]
-                is True
-            )
-            found = False
-            for field in fields:
-                if field in values and values[field] is not None:
-                    if found is True:
-                        raise ValueError(
-                            "Any of one field value is expected from "
-                            f"this list {fields}, but got multiple!"
-                        )
-                    else:
-                        found = True
-            if required is True and found is False:
-                raise ValueError(f"Expect any of field value from this list {fields}.")
-
-        return values
+        return validate_choice_fields(cls, values)
 
 
 class ElementDefinitionBase(element.Element):
@@ -3050,28 +2865,7 @@ class ElementDefinitionBinding(element.Element):
         choice of types, the authoring system must create a single element with a
         data type chosen from among the list of permitted data types.
         """
-        one_of_many_fields = {"valueSet": ["valueSetUri", "valueSetReference"]}
-
-        for prefix, fields in one_of_many_fields.items():
-            assert cls.__fields__[fields[0]].field_info.extra["one_of_many"] == prefix
-            required = (
-                cls.__fields__[fields[0]].field_info.extra["one_of_many_required"]
-                is True
-            )
-            found = False
-            for field in fields:
-                if field in values and values[field] is not None:
-                    if found is True:
-                        raise ValueError(
-                            "Any of one field value is expected from "
-                            f"this list {fields}, but got multiple!"
-                        )
-                    else:
-                        found = True
-            if required is True and found is False:
-                raise ValueError(f"Expect any of field value from this list {fields}.")
-
-        return values
+        return validate_choice_fields(cls, values)
 
 
 class ElementDefinitionConstraint(element.Element):
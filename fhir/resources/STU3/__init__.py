@@ -3,22 +3,33 @@ from pathlib import Path
 from typing import Any, Dict, Union
 
 from fhir.resources.core.fhirabstractmodel import FHIRAbstractModel
+from fhir.resources.core.utils import load_file
 
-from .fhirtypesvalidators import get_fhir_model_class
+from .fhirtypesvalidators import get_fhir_model_class, warmup
 
 __fhir_version__ = "3.0.2"
 
 
 def construct_fhir_element(
-    element_type: str, data: Union[Dict[str, Any], str, bytes, Path]
+    element_type: str,
+    data: Union[Dict[str, Any], str, bytes, Path],
+    validate: bool = True,
 ) -> FHIRAbstractModel:
-
+    """:param validate: ``False`` means, data is trusted (already valid), so
+    model is constructed without validation, see ``construct_fhir``."""
     try:
         klass = get_fhir_model_class(element_type)
     except KeyError:
         raise LookupError(
             f"'{element_type}' is not valid FHIRModel (element type) name!"
         )
+    if validate is False:
+        if isinstance(data, (str, bytes)):
+            data = klass.__config__.json_loads(data)
+        elif isinstance(data, Path):
+            data = load_file(data, json_loads=klass.__config__.json_loads, cls=klass)
+        return klass.construct_fhir(data)
+
     if isinstance(data, (str, bytes)):
         return klass.parse_raw(data, content_type="application/json")
     elif isinstance(data, Path):
@@ -26,4 +37,4 @@ def construct_fhir_element(
     return klass.parse_obj(data)
 
 
-__all__ = ["get_fhir_model_class", "construct_fhir_element"]
+__all__ = ["get_fhir_model_class", "construct_fhir_element", "warmup"]
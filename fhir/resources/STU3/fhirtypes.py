@@ -19,6 +19,10 @@ from pydantic.types import (
 from pydantic.validators import bool_validator, parse_date, parse_datetime, parse_time
 
 from fhir.resources.core.fhirabstractmodel import FHIRAbstractModel
+from fhir.resources.core.utils.base64binary import validate_base64
+from fhir.resources.core.utils.dateparse import parse_date as fast_parse_date
+from fhir.resources.core.utils.dateparse import parse_datetime as fast_parse_datetime
+from fhir.resources.core.utils.dateparse import parse_time as fast_parse_time
 
 from .fhirtypesvalidators import run_validator_for_fhir_type
 
@@ -57,7 +61,7 @@ FHIR_PRIMITIVES = [
 class Primitive:
     """FHIR Primitive Data Type Base Class"""
 
-    __fhir_release__: str = "R4"
+    __fhir_release__: str = "STU3"
     __visit_name__: Optional[str] = None
     regex: Optional[Pattern[str]] = None
 
@@ -151,6 +155,11 @@ class Base64Binary(ConstrainedBytes, Primitive):
     regex = re.compile(r"^(\s*([0-9a-zA-Z+=]){4}\s*)+$")
     __visit_name__ = "base64Binary"
 
+    @classmethod
+    def __get_validators__(cls) -> "CallableGenerator":
+        """Linear validity check, instead of (backtracking) regex."""
+        yield validate_base64
+
     @classmethod
     def to_string(cls, value):
         """ """
@@ -462,6 +471,17 @@ class Date(datetime.date, Primitive):
         cls, value: Union[datetime.date, str, bytes, int, float]
     ) -> Union[datetime.date, str]:
         """ """
+        if isinstance(value, str):
+            result = fast_parse_date(value)
+            if result is not None:
+                return result
+        return cls._validate_regex(value)
+
+    @classmethod
+    def _validate_regex(
+        cls, value: Union[datetime.date, str, bytes, int, float]
+    ) -> Union[datetime.date, str]:
+        """Regex based validation, for input the fast parser doesn't handle."""
         if not isinstance(value, str):
             # default handler
             return parse_date(value)
@@ -517,6 +537,20 @@ class DateTime(datetime.datetime, Primitive):
         cls, value: Union[datetime.date, datetime.datetime, str, bytes, int, float]
     ) -> Union[datetime.datetime, datetime.date, str]:
         """ """
+        if isinstance(value, str):
+            if len(value) > 10:
+                result = fast_parse_datetime(value)
+            else:
+                result = fast_parse_date(value)
+            if result is not None:
+                return result
+        return cls._validate_regex(value)
+
+    @classmethod
+    def _validate_regex(
+        cls, value: Union[datetime.date, datetime.datetime, str, bytes, int, float]
+    ) -> Union[datetime.datetime, datetime.date, str]:
+        """Regex based validation, for input the fast parser doesn't handle."""
         if isinstance(value, datetime.date):
             return value
 
@@ -578,6 +612,15 @@ class Instant(datetime.datetime, Primitive):
     @classmethod
     def validate(cls, value):
         """ """
+        if isinstance(value, str):
+            result = fast_parse_datetime(value)
+            if result is not None and result.tzinfo is not None:
+                return result
+        return cls._validate_regex(value)
+
+    @classmethod
+    def _validate_regex(cls, value):
+        """Regex based validation, for input the fast parser doesn't handle."""
         if isinstance(value, str):
             if not cls.regex.match(value):
                 raise DateTimeError()
@@ -611,6 +654,15 @@ class Time(datetime.time, Primitive):
     @classmethod
     def validate(cls, value):
         """ """
+        if isinstance(value, str):
+            result = fast_parse_time(value)
+            if result is not None:
+                return result
+        return cls._validate_regex(value)
+
+    @classmethod
+    def _validate_regex(cls, value):
+        """Regex based validation, for input the fast parser doesn't handle."""
         if isinstance(value, str):
             if not cls.regex.match(value):
                 raise TimeError()
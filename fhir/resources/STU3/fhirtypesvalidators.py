@@ -1,6 +1,7 @@
 # _*_ coding: utf-8 _*_
 """Validators for ``pydantic`` Custom DataType"""
 import importlib
+import time
 import typing
 from pathlib import Path
 from typing import Union
@@ -11,6 +12,7 @@ from pydantic.types import StrBytes
 from pydantic.utils import ROOT_KEY
 
 from fhir.resources.core.fhirabstractmodel import FHIRAbstractModel
+from fhir.resources.core.utils.construct import get_construct_plan
 
 if typing.TYPE_CHECKING:
     from pydantic import BaseModel
@@ -533,6 +535,42 @@ def get_fhir_model_class(model_name: str) -> typing.Type[FHIRAbstractModel]:
     return klass
 
 
+def warmup(
+    resource_types: typing.Union[str, typing.Iterable[str]] = "all",
+    profile: bool = False,
+) -> typing.Dict[str, float]:
+    """Eagerly imports model classes (through ``MODEL_CLASSES``), which
+    otherwise are imported lazily on first use. Useful for preloading
+    (i.e. in the master process before fork, so memory is shared as copy-on-write).
+
+    :param resource_types: list of names or ``all``.
+
+    :param profile: if ``True``, import (class build) time in seconds
+        per module is returned.
+    """
+    if resource_types == "all":
+        resource_types = list(MODEL_CLASSES.keys())
+    elif isinstance(resource_types, str):
+        resource_types = [resource_types]
+    timings: typing.Dict[str, float] = dict()
+    klasses = list()
+    for model_name in resource_types:
+        klass, module_name = MODEL_CLASSES[model_name]
+        if klass is None:
+            started = time.perf_counter()
+            klass = get_fhir_model_class(model_name)
+            if profile:
+                elapsed = time.perf_counter() - started
+                module_name = module_name[1:]
+                timings[module_name] = timings.get(module_name, 0.0) + elapsed
+        klasses.append(klass)
+    for klass in klasses:
+        # per class compiled caches, also imports nested element classes.
+        klass.get_serialization_plan()
+        get_construct_plan(klass)
+    return timings
+
+
 def run_validator_for_fhir_type(model_type_cls, v, values, config, field):
     """ """
     cls = get_fhir_model_class(model_type_cls.__resource_type__)
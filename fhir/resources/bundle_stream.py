@@ -0,0 +1,383 @@
+# _*_ coding: utf-8 _*_
+"""Streaming reader and writer for (large) Bundle documents, entries are
+parsed (or written) one by one, while top-level Bundle fields (``type``,
+``total``, ``link``...) are handled as metadata. Memory use depends on the
+size of single entry, not the whole Bundle."""
+import codecs
+import json
+import pathlib
+import re
+import typing
+import uuid
+from collections import deque
+
+from fhir.resources.core.fhirabstractmodel import FHIRAbstractModel
+
+from .bundle import Bundle, BundleEntry, BundleLink
+from .fhirtypesvalidators import get_fhir_model_class
+from .ndjson import Source, StrPath, _open_source
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+FORMATS = ("json", "xml")
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class JSONBundleReader:
+    """Incremental reader of Bundle JSON document, only value of ``entry``
+    is decoded item by item, any other (top-level) value as whole."""
+
+    def __init__(self, stream: typing.IO, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """ """
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.raw_decode = json.JSONDecoder().raw_decode
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size: int) -> bool:
+        """Reads more data into buffer, ``False`` at end of stream."""
+        if self.eof:
+            return False
+        if self.pos > 0:
+            # consumed data is not needed anymore
+            self.buffer = self.buffer[self.pos :]
+            self.pos = 0
+        data = self.stream.read(size)
+        if isinstance(data, bytes):
+            text = self.decoder.decode(data, final=not data)
+        else:
+            text = data
+        if not data:
+            self.eof = True
+        self.buffer += text
+        return not self.eof or len(text) > 0
+
+    def peek(self) -> str:
+        """Next non whitespace character (not consumed), empty at the end."""
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or not self.fill(self.chunk_size):
+                return self.buffer[self.pos : self.pos + 1]
+
+    def expect(self, chars: str) -> str:
+        """ """
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(
+                f"Invalid Bundle JSON, expected any of {chars!r}, got {char!r}."
+            )
+        self.pos += 1
+        return char
+
+    def value(self) -> typing.Any:
+        """Next complete JSON value."""
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                obj, end = self.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # incomplete value (unless the stream is exhausted)
+                if not self.fill(size):
+                    raise
+            else:
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return obj
+                # number might be continued in next chunk
+                length = end - self.pos
+                if not self.fill(size):
+                    self.pos += length
+                    return obj
+            # grows, so that large value is not re-scanned too often
+            size *= 2
+
+    def read(
+        self, metadata: typing.Dict[str, typing.Any]
+    ) -> typing.Iterator[typing.Dict[str, typing.Any]]:
+        """Yields items of ``entry``, other members are stored in metadata."""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            if key == "entry":
+                self.expect("[")
+                if self.peek() == "]":
+                    self.pos += 1
+                else:
+                    while True:
+                        yield self.value()
+                        if self.expect(",]") == "]":
+                            break
+            else:
+                value = self.value()
+                if key == "resourceType" and value != "Bundle":
+                    raise ValueError(f"Expected resourceType 'Bundle', got {value!r}.")
+                metadata[key] = value
+            if self.expect(",}") == "}":
+                break
+
+
+def iter_xml_entries(
+    stream: typing.IO,
+    metadata: typing.Dict[str, typing.Any],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> typing.Iterator[typing.Dict[str, typing.Any]]:
+    """Same as ``JSONBundleReader.read`` for XML document, based on
+    ``fhir.resources.core.utils.xml.XMLStreamParser``."""
+    from fhir.resources.core.utils.xml import XMLStreamParser
+
+    entries: typing.Deque[typing.Dict[str, typing.Any]] = deque()
+
+    class BundleXMLParser(XMLStreamParser):
+        """ """
+
+        def add_value(self, parent, plan, value):
+            """ """
+            if len(self.stack) == 1 and plan.field_name == "entry":
+                entries.append(value)
+            else:
+                super().add_value(parent, plan, value)
+
+    parser = BundleXMLParser(Bundle)
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        parser.feed(chunk)
+        if parser.stack:
+            metadata.update(parser.stack[0].params)
+        while entries:
+            yield entries.popleft()
+    metadata.update(parser.close())
+    while entries:
+        yield entries.popleft()
+
+
+class BundleEntryIterator:
+    """Iterator of validated ``BundleEntry`` (or ``resource`` only).
+    Top-level Bundle fields are available as ``metadata`` (raw values),
+    as soon as they have been read, complete after the iteration is
+    exhausted (JSON object members might be in any order)."""
+
+    def __init__(
+        self,
+        source: Source,
+        format: str = "json",
+        *,
+        resource_only: bool = False,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ):
+        """ """
+        if format not in FORMATS:
+            raise ValueError(f"Unsupported format {format!r}, allowed {FORMATS}.")
+        self.format = format
+        self.resource_only = resource_only
+        self.metadata: typing.Dict[str, typing.Any] = {}
+        self._iterator = self._iter_entries(source, chunk_size)
+
+    def _iter_entries(self, source: Source, chunk_size: int):
+        """ """
+        stream, should_close = _open_source(source)
+        try:
+            if self.format == "json":
+                items = JSONBundleReader(stream, chunk_size).read(self.metadata)
+            else:
+                items = iter_xml_entries(stream, self.metadata, chunk_size)
+            for item in items:
+                entry = BundleEntry.parse_obj(item)
+                if self.resource_only:
+                    yield entry.resource
+                else:
+                    yield entry
+        finally:
+            if should_close:
+                stream.close()
+
+    def __iter__(self) -> "BundleEntryIterator":
+        """ """
+        return self
+
+    def __next__(self) -> typing.Any:
+        """ """
+        return next(self._iterator)
+
+    def close(self) -> None:
+        """Source is closed (if opened from path) without reading the rest."""
+        self._iterator.close()
+
+    @property
+    def type(self) -> typing.Optional[str]:
+        """ """
+        return self.metadata.get("type", None)
+
+    @property
+    def total(self) -> typing.Optional[int]:
+        """ """
+        total = self.metadata.get("total", None)
+        if total is None:
+            return None
+        return int(total)
+
+    @property
+    def link(self) -> typing.List[BundleLink]:
+        """ """
+        return [BundleLink.parse_obj(link) for link in self.metadata.get("link", [])]
+
+
+def iter_entries(
+    source: Source,
+    format: str = "json",
+    *,
+    resource_only: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> BundleEntryIterator:
+    """Lazily yields validated ``BundleEntry`` (or only its ``resource``
+    with ``resource_only``) of Bundle file (path) or stream, gzip compressed
+    input is detected transparently.
+
+    :param format: ``json`` or ``xml``.
+    """
+    return BundleEntryIterator(
+        source, format, resource_only=resource_only, chunk_size=chunk_size
+    )
+
+
+class BundleWriter:
+    """Writes Bundle document entry by entry, output is byte-identical to
+    ``Bundle(**fields, entry=[...]).json()`` (or ``.xml()``), but neither
+    whole Bundle model nor document is kept in memory. Entry's resource must
+    be already valid model, it is not validated again.
+
+        with BundleWriter(path, type="searchset", total=2) as writer:
+            writer.add_entry(patient, full_url="urn:uuid:...")
+            writer.add_entry(observation, search={"mode": "match"})
+    """
+
+    def __init__(
+        self,
+        stream: typing.Union[StrPath, typing.BinaryIO],
+        format: str = "json",
+        *,
+        exclude_comments: bool = False,
+        **fields: typing.Any,
+    ):
+        """:param fields: top-level Bundle fields (``type``, ``total``,
+        ``link``, ``signature``...), except ``entry``."""
+        if format not in FORMATS:
+            raise ValueError(f"Unsupported format {format!r}, allowed {FORMATS}.")
+        if "entry" in fields:
+            raise ValueError("'entry' must be written by ``add_entry``.")
+        self.format = format
+        self.exclude_comments = exclude_comments
+        self.bundle = Bundle.parse_obj(dict(fields, resourceType="Bundle"))
+        self.count = 0
+        self._builder = None
+        if format == "xml":
+            from fhir.resources.core.utils.xml import ElementBuilder
+
+            self._builder = ElementBuilder(with_comments=not exclude_comments)
+
+        # header and footer are what is around the (placeholder) entry
+        placeholder = BundleEntry(fullUrl=f"urn:uuid:{uuid.uuid4()}")
+        document = self.serialize(self.bundle.copy(update={"entry": [placeholder]}))
+        self._header, self._footer = document.split(self.serialize_entry(placeholder))
+
+        self._should_close = False
+        if isinstance(stream, (str, pathlib.Path)):
+            stream = open(stream, "wb")
+            self._should_close = True
+        self.stream = stream
+
+    def serialize(self, model: FHIRAbstractModel) -> bytes:
+        """ """
+        if self.format == "json":
+            return model.json(return_bytes=True, exclude_comments=self.exclude_comments)
+        return model.xml(return_bytes=True, exclude_comments=self.exclude_comments)
+
+    def serialize_entry(self, entry: BundleEntry) -> bytes:
+        """Entry as it is inside Bundle document."""
+        if self._builder is None:
+            return self.serialize(entry)
+        from lxml import etree  # type: ignore
+
+        holder = etree.Element("Bundle")
+        self._builder.add_model(holder, "entry", entry)
+        return b"".join(etree.tostring(child, encoding="utf-8") for child in holder)
+
+    def add_entry(
+        self,
+        resource: typing.Union[FHIRAbstractModel, typing.Dict[str, typing.Any]] = None,
+        *,
+        full_url: str = None,
+        search: typing.Any = None,
+        request: typing.Any = None,
+        response: typing.Any = None,
+        **fields: typing.Any,
+    ) -> None:
+        """Writes single entry. Entry's own fields (other than resource)
+        are validated, ``resource`` as dict is parsed."""
+        if self.stream is None:
+            raise ValueError("BundleWriter is already closed.")
+        values = {
+            "fullUrl": full_url,
+            "search": search,
+            "request": request,
+            "response": response,
+        }
+        values.update(fields)
+        entry = BundleEntry.parse_obj(
+            {key: val for key, val in values.items() if val is not None}
+        )
+        if isinstance(resource, dict):
+            resource = get_fhir_model_class(resource["resourceType"]).parse_obj(
+                resource
+            )
+        if resource is not None:
+            entry = entry.copy(update={"resource": resource})
+
+        if self.count == 0:
+            self.stream.write(self._header)
+        elif self.format == "json":
+            self.stream.write(b",")
+        self.stream.write(self.serialize_entry(entry))
+        self.count += 1
+
+    def close(self) -> None:
+        """Writes rest of the document."""
+        if self.stream is None:
+            return
+        try:
+            if self.count == 0:
+                self.stream.write(self.serialize(self.bundle))
+            else:
+                self.stream.write(self._footer)
+        finally:
+            self._close_stream()
+
+    def _close_stream(self) -> None:
+        """ """
+        if self._should_close:
+            self.stream.close()  # type: ignore
+        self.stream = None
+
+    def __enter__(self) -> "BundleWriter":
+        """ """
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        """Incomplete document is not finished on error."""
+        if exc_type is None:
+            self.close()
+        elif self.stream is not None:
+            self._close_stream()
+
+
+__all__ = ["iter_entries", "BundleEntryIterator", "BundleWriter"]
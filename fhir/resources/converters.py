@@ -0,0 +1,787 @@
+# _*_ coding: utf-8 _*_
+"""Conversion of models between FHIR releases ``DSTU2``, ``STU3`` and ``R4B``
+(the root package), directly from model to model, without JSON round-trip.
+
+    converter = Converter("STU3", "R4B")
+    for resource in converter.convert_many(stu3_resources):
+        ...
+    patient = convert(dstu2_patient, "R4B")
+
+Conversion runs step by step between neighbouring releases
+(``DSTU2`` <-> ``STU3`` <-> ``R4B``), each step is a single traversal over
+model attributes. Elements are matched by name, renamed or retyped elements
+are described by the declarative per-type tables ``MAPPINGS`` (reverse
+direction renames are derived). Untouched sub-trees are built without
+validation (the source model is valid already), only values produced by
+the retype functions are validated against target field and required
+elements of each target are checked (``ConversionError``). Elements having
+no counterpart in target release are dropped and counted in
+``Converter.lost`` (or raise ``ConversionError`` in strict mode)."""
+import importlib
+import typing
+from collections import Counter
+
+from pydantic import Extra
+from pydantic.error_wrappers import ValidationError
+from pydantic.fields import SHAPE_LIST
+
+from fhir.resources.core.fhirabstractmodel import FHIRAbstractModel
+from fhir.resources.core.utils.common import normalize_fhir_type_class
+from fhir.resources.core.utils.construct import (
+    get_defaults,
+    get_fhir_model_class_getter,
+)
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+RELEASES = ("DSTU2", "STU3", "R4B")
+PACKAGES = {
+    "DSTU2": "fhir.resources.DSTU2",
+    "STU3": "fhir.resources.STU3",
+    "R4B": "fhir.resources",
+}
+
+# new element name (renamed), ``None`` (no counterpart, dropped) or
+# (new element name, function) for retyped element. The function gets
+# the source value (list for list element) and the ``ConversionStep``,
+# returns value (python data and/or target models) for the target element.
+Rule = typing.Union[None, str, typing.Tuple[str, typing.Callable]]
+
+# kind of plan entry
+KIND_COPY = 0  # primitive value, taken as it is
+KIND_MODEL = 1  # nested model, converted to target class
+KIND_RESOURCE = 2  # Resource, dispatched on model's resource type
+KIND_FUNCTION = 3  # retyped, converted by function and validated
+KIND_DICT = 4  # model to raw data (primitive extension to DSTU2)
+KIND_DROP = 5  # no counterpart
+
+object_setattr = object.__setattr__
+
+
+class ConversionError(ValueError):
+    """ """
+
+
+class TypeMap(typing.NamedTuple):
+    """Mapping of one type (resource, data type or backbone element) for
+    a conversion step, ``elements`` are keyed by source (JSON) name."""
+
+    name: typing.Optional[str] = None
+    elements: typing.Dict[str, Rule] = {}
+    # values for target's required elements, those have no source
+    defaults: typing.Dict[str, typing.Any] = {}
+
+
+class PlanEntry(typing.NamedTuple):
+    """ """
+
+    name: str
+    target: typing.Optional[str]
+    kind: int
+    arg: typing.Any
+    source_list: bool
+    target_list: bool
+    label: str
+
+
+Plan = typing.Tuple[typing.Tuple[PlanEntry, ...], typing.Dict[str, typing.Any]]
+
+
+def get_release(model_or_class) -> str:
+    """ """
+    klass = model_or_class if isinstance(model_or_class, type) else type(model_or_class)
+    module = klass.__module__
+    for release in ("DSTU2", "STU3"):
+        if module.startswith(PACKAGES[release] + "."):
+            return release
+    if module.startswith("fhir.resources."):
+        return "R4B"
+    raise ConversionError(f"``{klass.__name__}`` is not a FHIR model class.")
+
+
+# -- retype functions (value, step) -> value
+
+
+def annotations(value, step):
+    """string -> Annotation list"""
+    return [{"text": value}]
+
+
+def annotation_text(value, step):
+    """Annotation list -> string"""
+    return "\n".join(item.text for item in value if item.text) or None
+
+
+def codeable_concept(system: str):
+    """code -> CodeableConcept of ``system``"""
+
+    def _convert(value, step):
+        return {"coding": [{"system": system, "code": value}]}
+
+    return _convert
+
+
+def concept_code(value, step):
+    """CodeableConcept -> code"""
+    for coding in value.coding or ():
+        if coding.code is not None:
+            return coding.code
+    return None
+
+
+def coding(value, step):
+    """code -> Coding"""
+    return {"code": value}
+
+
+def coding_code(value, step):
+    """Coding -> code"""
+    return value.code
+
+
+def family_name(value, step):
+    """DSTU2 family name parts -> family name"""
+    return " ".join(part for part in value if part) or None
+
+
+def family_parts(value, step):
+    """family name -> DSTU2 family name parts"""
+    return [value]
+
+
+def wrap(key: str, is_list: bool = False):
+    """model -> BackboneElement ``{key: model}``"""
+
+    def _convert(value, step):
+        if is_list:
+            return [{key: step.convert(item)} for item in value]
+        return {key: step.convert(value)}
+
+    return _convert
+
+
+def unwrap(key: str, is_list: bool = False):
+    """BackboneElement ``{key: model}`` -> model"""
+
+    def _convert(value, step):
+        if is_list:
+            return [
+                step.convert(getattr(item, key))
+                for item in value
+                if getattr(item, key) is not None
+            ] or None
+        value = getattr(value, key)
+        if value is None:
+            return None
+        return step.convert(value)
+
+    return _convert
+
+
+def reference(value, step):
+    """Relative reference to renamed resource type."""
+    type_name, sep, rest = value.partition("/")
+    if sep and type_name in step.type_names:
+        return f"{step.type_names[type_name]}/{rest}"
+    return value
+
+
+REFERENCE = TypeMap(elements={"reference": ("reference", reference)})
+
+MAPPINGS: typing.Dict[typing.Tuple[str, str], typing.Dict[str, TypeMap]] = {
+    ("DSTU2", "STU3"): {
+        "Reference": REFERENCE,
+        "HumanName": TypeMap(elements={"family": ("family", family_name)}),
+        "Patient": TypeMap(elements={"careProvider": "generalPractitioner"}),
+        "Observation": TypeMap(
+            elements={"comments": "comment", "encounter": "context"}
+        ),
+        "Condition": TypeMap(
+            elements={
+                "patient": "subject",
+                "encounter": "context",
+                "dateRecorded": "assertedDate",
+                "notes": ("note", annotations),
+            }
+        ),
+        "Encounter": TypeMap(
+            elements={
+                "patient": "subject",
+                "class": ("class", coding),
+                "indication": ("diagnosis", wrap("condition", True)),
+            }
+        ),
+        "MedicationOrder": TypeMap(
+            name="MedicationRequest",
+            elements={
+                "patient": "subject",
+                "encounter": "context",
+                "dateWritten": "authoredOn",
+                "prescriber": ("requester", wrap("agent")),
+                "note": ("note", annotations),
+            },
+            defaults={"intent": "order"},
+        ),
+        "MedicationOrderDispenseRequest": TypeMap(
+            name="MedicationRequestDispenseRequest"
+        ),
+        "MedicationOrderSubstitution": TypeMap(name="MedicationRequestSubstitution"),
+    },
+    ("STU3", "R4B"): {
+        "Reference": REFERENCE,
+        "Binary": TypeMap(elements={"content": "data"}),
+        "Observation": TypeMap(
+            elements={
+                "comment": ("note", annotations),
+                "context": "encounter",
+                "related": None,
+            }
+        ),
+        "Condition": TypeMap(
+            elements={
+                "context": "encounter",
+                "assertedDate": "recordedDate",
+                "clinicalStatus": (
+                    "clinicalStatus",
+                    codeable_concept(
+                        "http://terminology.hl7.org/CodeSystem/condition-clinical"
+                    ),
+                ),
+                "verificationStatus": (
+                    "verificationStatus",
+                    codeable_concept(
+                        "http://terminology.hl7.org/CodeSystem/condition-ver-status"
+                    ),
+                ),
+            }
+        ),
+        "AllergyIntolerance": TypeMap(
+            elements={
+                "assertedDate": "recordedDate",
+                "clinicalStatus": (
+                    "clinicalStatus",
+                    codeable_concept(
+                        "http://terminology.hl7.org/CodeSystem/"
+                        "allergyintolerance-clinical"
+                    ),
+                ),
+                "verificationStatus": (
+                    "verificationStatus",
+                    codeable_concept(
+                        "http://terminology.hl7.org/CodeSystem/"
+                        "allergyintolerance-verification"
+                    ),
+                ),
+            }
+        ),
+        "Encounter": TypeMap(
+            elements={"incomingReferral": "basedOn", "reason": "reasonCode"}
+        ),
+        "EncounterDiagnosis": TypeMap(elements={"role": "use"}),
+        "MedicationRequest": TypeMap(
+            elements={
+                "context": "encounter",
+                "requester": ("requester", unwrap("agent")),
+            }
+        ),
+        "DiagnosticReport": TypeMap(
+            elements={
+                "context": "encounter",
+                "codedDiagnosis": "conclusionCode",
+                "image": "media",
+                "performer": ("performer", unwrap("actor", True)),
+            }
+        ),
+        "Procedure": TypeMap(
+            elements={"context": "encounter", "notDoneReason": "statusReason"}
+        ),
+        "ProcedurePerformer": TypeMap(elements={"role": "function"}),
+    },
+}
+
+# retype functions of reverse direction, renames are derived
+REVERSE_MAPPINGS: typing.Dict[typing.Tuple[str, str], typing.Dict[str, TypeMap]] = {
+    ("STU3", "DSTU2"): {
+        "Reference": REFERENCE,
+        "HumanName": TypeMap(elements={"family": ("family", family_parts)}),
+        "Condition": TypeMap(elements={"note": ("notes", annotation_text)}),
+        "Encounter": TypeMap(
+            elements={
+                "class": ("class", coding_code),
+                "diagnosis": ("indication", unwrap("condition", True)),
+            }
+        ),
+        "MedicationRequest": TypeMap(
+            elements={
+                "requester": ("prescriber", unwrap("agent")),
+                "note": ("note", annotation_text),
+            }
+        ),
+    },
+    ("R4B", "STU3"): {
+        "Reference": REFERENCE,
+        "Observation": TypeMap(elements={"note": ("comment", annotation_text)}),
+        "Condition": TypeMap(
+            elements={
+                "clinicalStatus": ("clinicalStatus", concept_code),
+                "verificationStatus": ("verificationStatus", concept_code),
+            }
+        ),
+        "AllergyIntolerance": TypeMap(
+            elements={
+                "clinicalStatus": ("clinicalStatus", concept_code),
+                "verificationStatus": ("verificationStatus", concept_code),
+            }
+        ),
+        "MedicationRequest": TypeMap(
+            elements={"requester": ("requester", wrap("agent"))}
+        ),
+        "DiagnosticReport": TypeMap(
+            elements={"performer": ("performer", wrap("actor", True))}
+        ),
+    },
+}
+
+
+def _reverse(
+    types: typing.Dict[str, TypeMap], overrides: typing.Dict[str, TypeMap]
+) -> typing.Dict[str, TypeMap]:
+    """Reverse renames of ``types`` and merge with ``overrides``."""
+    reverse: typing.Dict[str, TypeMap] = dict()
+    for name, type_map in types.items():
+        elements = {
+            target: source
+            for source, target in type_map.elements.items()
+            if isinstance(target, str)
+        }
+        reverse[type_map.name or name] = TypeMap(
+            name if type_map.name else None, elements
+        )
+    for name, type_map in overrides.items():
+        current = reverse.get(name, TypeMap())
+        elements = dict(current.elements)
+        elements.update(type_map.elements)
+        reverse[name] = TypeMap(
+            type_map.name or current.name, elements, type_map.defaults
+        )
+    return reverse
+
+
+for (_source, _target), _types in list(MAPPINGS.items()):
+    MAPPINGS[(_target, _source)] = _reverse(
+        _types, REVERSE_MAPPINGS[(_target, _source)]
+    )
+
+_PLANS: typing.Dict[typing.Tuple[str, str, type, type], Plan] = dict()
+# target class -> (field name, primitive extension names, alias)
+_REQUIRED: typing.Dict[
+    type, typing.Tuple[typing.Tuple[str, typing.Tuple[str, ...], str], ...]
+] = dict()
+
+
+def _is_model(type_) -> bool:
+    """ """
+    return getattr(type_, "__resource_type__", None) is not None
+
+
+def get_required_fields(
+    klass: typing.Type[FHIRAbstractModel],
+) -> typing.Tuple[typing.Tuple[str, typing.Tuple[str, ...], str], ...]:
+    """Required elements of model class, required primitive element
+    might have primitive extension (``_name``) instead of value."""
+    try:
+        return _REQUIRED[klass]
+    except KeyError:
+        pass
+    required = list()
+    for field in klass.__fields__.values():
+        if field.required:
+            # DSTU2 keeps primitive extension as raw data
+            required.append((field.name, ("_" + field.alias,), field.alias))
+        elif field.field_info.extra.get("element_required", False):
+            required.append((field.name, (field.name + "__ext",), field.alias))
+    _REQUIRED[klass] = tuple(required)
+    return _REQUIRED[klass]
+
+
+def _validate(field, value, klass):
+    """ """
+    value, errors = field.validate(value, {}, loc=field.alias, cls=klass)
+    if errors:
+        raise ValidationError([errors], klass)
+    return value
+
+
+class ConversionStep:
+    """Conversion between two neighbouring releases."""
+
+    def __init__(
+        self,
+        source: str,
+        target: str,
+        lost: typing.Counter[str] = None,
+        strict: bool = False,
+    ):
+        """ """
+        self.source = source
+        self.target = target
+        self.types = MAPPINGS[(source, target)]
+        self.type_names = {
+            name: type_map.name
+            for name, type_map in self.types.items()
+            if type_map.name is not None
+        }
+        self.lost: typing.Counter[str] = Counter() if lost is None else lost
+        self.strict = strict
+        self.get_fhir_model_class = importlib.import_module(
+            ".fhirtypesvalidators", package=PACKAGES[target]
+        ).get_fhir_model_class
+
+    def drop(self, label: str):
+        """ """
+        if self.strict:
+            raise ConversionError(
+                f"``{label}`` has no counterpart in {self.target} release."
+            )
+        self.lost[label] += 1
+
+    def get_target_class(
+        self, klass: typing.Type[FHIRAbstractModel]
+    ) -> typing.Optional[typing.Type[FHIRAbstractModel]]:
+        """ """
+        name = klass.get_resource_type()
+        try:
+            return self.get_fhir_model_class(self.type_names.get(name, name))
+        except KeyError:
+            return None
+
+    def _get_kind(self, field, target_field) -> typing.Tuple[int, typing.Any]:
+        """ """
+        type_ = normalize_fhir_type_class(field.type_)
+        target_type = normalize_fhir_type_class(target_field.type_)
+        if _is_model(type_) is not _is_model(target_type):
+            return KIND_DROP, None
+        if not _is_model(type_):
+            return KIND_COPY, None
+        resource_type = target_type.__resource_type__
+        if resource_type in ("Resource", "Element"):
+            return KIND_RESOURCE, None
+        return (
+            KIND_MODEL,
+            get_fhir_model_class_getter(target_type)(resource_type),
+        )
+
+    def compile(self, klass, target_klass) -> Plan:
+        """ """
+        type_name = klass.get_resource_type()
+        type_map = self.types.get(type_name, TypeMap())
+        target_fields = {
+            field.alias: field for field in target_klass.__fields__.values()
+        }
+        allow_extra = target_klass.__config__.extra == Extra.allow
+        entries = list()
+        for field in klass.__fields__.values():
+            if field.name == "resource_type":
+                continue
+            func = None
+            rule = self.get_rule(type_map, field.alias)
+            if isinstance(rule, tuple):
+                rule, func = rule
+            target_field = target_fields.get(rule) if rule else None
+            label = f"{type_name}.{field.alias}"
+            if target_field is None:
+                if rule and allow_extra and field.name.endswith("__ext"):
+                    # DSTU2 keeps primitive extension as raw data
+                    entry = PlanEntry(field.name, rule, KIND_DICT, None, 0, 0, label)
+                else:
+                    entry = PlanEntry(field.name, None, KIND_DROP, None, 0, 0, label)
+                entries.append(entry)
+                continue
+            if func is not None:
+                kind, arg = KIND_FUNCTION, (func, target_field)
+            else:
+                kind, arg = self._get_kind(field, target_field)
+            entries.append(
+                PlanEntry(
+                    field.name,
+                    target_field.name,
+                    kind,
+                    arg,
+                    field.shape == SHAPE_LIST,
+                    target_field.shape == SHAPE_LIST,
+                    label,
+                )
+            )
+        defaults = {
+            target_fields[alias].name: _validate(
+                target_fields[alias], value, target_klass
+            )
+            for alias, value in type_map.defaults.items()
+        }
+        return tuple(entries), defaults
+
+    @staticmethod
+    def get_rule(type_map: TypeMap, alias: str) -> Rule:
+        """Rule of element, primitive extension (``_name``) follows
+        its element's new name."""
+        try:
+            return type_map.elements[alias]
+        except KeyError:
+            pass
+        if alias.startswith("_") and alias[1:] in type_map.elements:
+            rule = type_map.elements[alias[1:]]
+            if isinstance(rule, tuple):
+                rule = rule[0]
+            return rule and "_" + rule
+        return alias
+
+    def get_plan(self, klass, target_klass) -> Plan:
+        """ """
+        key = (self.source, self.target, klass, target_klass)
+        try:
+            return _PLANS[key]
+        except KeyError:
+            plan = _PLANS[key] = self.compile(klass, target_klass)
+            return plan
+
+    def convert_resource(self, model) -> typing.Optional[FHIRAbstractModel]:
+        """Resource (i.e. contained or Bundle entry) of any type."""
+        target_klass = self.get_target_class(model.__class__)
+        if target_klass is None:
+            self.drop(model.__class__.get_resource_type())
+            return None
+        return self.convert(model, target_klass)
+
+    def convert(
+        self,
+        model: FHIRAbstractModel,
+        target_klass: typing.Type[FHIRAbstractModel] = None,
+    ) -> FHIRAbstractModel:
+        """ """
+        klass = model.__class__
+        if target_klass is None:
+            target_klass = self.get_target_class(klass)
+            if target_klass is None:
+                raise ConversionError(
+                    f"``{klass.get_resource_type()}`` has no counterpart "
+                    f"in {self.target} release."
+                )
+        try:
+            entries, defaults = _PLANS[(self.source, self.target, klass, target_klass)]
+        except KeyError:
+            entries, defaults = self.get_plan(klass, target_klass)
+
+        source = model.__dict__
+        values = get_defaults(target_klass).copy()
+        fields_set = set()
+        for entry in entries:
+            value = source[entry.name]
+            if value is None:
+                continue
+            kind = entry.kind
+            if kind == KIND_COPY:
+                if entry.source_list:
+                    value = list(value)
+            elif kind == KIND_MODEL:
+                if entry.source_list:
+                    value = [
+                        None if item is None else self.convert(item, entry.arg)
+                        for item in value
+                    ]
+                else:
+                    value = self.convert(value, entry.arg)
+            elif kind == KIND_RESOURCE:
+                if entry.source_list:
+                    value = [
+                        item
+                        for item in map(self.convert_resource, value)
+                        if item is not None
+                    ]
+                else:
+                    value = self.convert_resource(value)
+                    if value is None:
+                        continue
+            elif kind == KIND_FUNCTION:
+                func, field = entry.arg
+                result = func(value, self)
+                if result is None:
+                    self.drop(entry.label)
+                    continue
+                if result is not value:
+                    result = _validate(field, result, target_klass)
+                self._set(values, entry.target, result, entry.label)
+                fields_set.add(entry.target)
+                continue
+            elif kind == KIND_DICT:
+                if isinstance(value, list):
+                    value = [None if item is None else item.dict() for item in value]
+                else:
+                    value = value.dict()
+                values[entry.target] = value
+                fields_set.add(entry.target)
+                continue
+            else:
+                self.drop(entry.label)
+                continue
+
+            if entry.source_list is not entry.target_list:
+                if not entry.target_list:
+                    if len(value) == 0:
+                        continue
+                    if len(value) > 1:
+                        self.drop(entry.label)
+                    value = value[0]
+                else:
+                    value = [value]
+            self._set(values, entry.target, value, entry.label)
+            fields_set.add(entry.target)
+
+        if len(source) > len(entries) + 1:
+            self._convert_extra(klass, target_klass, source, values, fields_set)
+
+        for name, value in defaults.items():
+            if values[name] is None:
+                values[name] = value
+                fields_set.add(name)
+
+        for name, ext_names, alias in get_required_fields(target_klass):
+            if values[name] is None or values[name] == []:
+                if any(values.get(ext_name, None) for ext_name in ext_names):
+                    continue
+                raise ConversionError(
+                    f"``{target_klass.get_resource_type()}.{alias}`` is required "
+                    f"in {self.target} release, but has no value."
+                )
+
+        target = target_klass.__new__(target_klass)
+        object_setattr(target, "__dict__", values)
+        object_setattr(target, "__fields_set__", fields_set)
+        if target_klass.__private_attributes__:
+            target._init_private_attributes()
+        return target
+
+    def _set(self, values, name, value, label):
+        """Several source elements might go to the same (list) element."""
+        current = values[name]
+        if current is not None:
+            if not (isinstance(current, list) and isinstance(value, list)):
+                self.drop(label)
+                return
+            value = current + value
+        values[name] = value
+
+    def _convert_extra(self, klass, target_klass, source, values, fields_set):
+        """DSTU2 keeps primitive extensions (``_name``) as raw data,
+        those are validated against target's ``FHIRPrimitiveExtension``."""
+        type_name = klass.get_resource_type()
+        type_map = self.types.get(type_name, TypeMap())
+        target_fields = {
+            field.alias: field for field in target_klass.__fields__.values()
+        }
+        allow_extra = target_klass.__config__.extra == Extra.allow
+        for key, value in source.items():
+            if key in klass.__fields__ or value is None:
+                continue
+            label = f"{type_name}.{key}"
+            alias = self.get_rule(type_map, key)
+            field = target_fields.get(alias) if alias else None
+            if field is not None:
+                try:
+                    value = _validate(field, value, target_klass)
+                except ValidationError:
+                    self.drop(label)
+                    continue
+                values[field.name] = value
+                fields_set.add(field.name)
+            elif allow_extra and alias:
+                values[alias] = value
+                fields_set.add(alias)
+            else:
+                self.drop(label)
+
+
+def get_steps(
+    source: str, target: str, lost: typing.Counter[str] = None, strict: bool = False
+) -> typing.List[ConversionStep]:
+    """ """
+    for release in (source, target):
+        if release not in RELEASES:
+            raise ConversionError(
+                f"Unknown release ``{release}``, expected one of {RELEASES}."
+            )
+    start = RELEASES.index(source)
+    end = RELEASES.index(target)
+    direction = 1 if end > start else -1
+    return [
+        ConversionStep(RELEASES[index], RELEASES[index + direction], lost, strict)
+        for index in range(start, end, direction)
+    ]
+
+
+class Converter:
+    """Converts models of ``source`` release to ``target`` release,
+    ``lost`` counts dropped elements (``Type.element``) so far."""
+
+    def __init__(self, source: str, target: str, strict: bool = False):
+        """ """
+        self.source = source
+        self.target = target
+        self.lost: typing.Counter[str] = Counter()
+        self.steps = get_steps(source, target, self.lost, strict)
+
+    def convert(self, model: FHIRAbstractModel) -> FHIRAbstractModel:
+        """ """
+        release = get_release(model)
+        if release != self.source:
+            raise ConversionError(
+                f"Expected model of {self.source} release, but got {release}."
+            )
+        for step in self.steps:
+            model = step.convert(model)
+        return model
+
+    def convert_many(
+        self, models: typing.Iterable[FHIRAbstractModel]
+    ) -> typing.Iterator[FHIRAbstractModel]:
+        """ """
+        for model in models:
+            yield self.convert(model)
+
+
+def convert(
+    model: FHIRAbstractModel, target: str, strict: bool = False
+) -> FHIRAbstractModel:
+    """Converts ``model`` (of any release) to ``target`` release."""
+    source = get_release(model)
+    if source == target:
+        return model
+    return Converter(source, target, strict).convert(model)
+
+
+def convert_many(
+    models: typing.Iterable[FHIRAbstractModel], target: str, strict: bool = False
+) -> typing.Iterator[FHIRAbstractModel]:
+    """Converts ``models`` (of mixed releases as well) to ``target`` release."""
+    converters: typing.Dict[str, Converter] = dict()
+    for model in models:
+        source = get_release(model)
+        if source == target:
+            yield model
+            continue
+        try:
+            converter = converters[source]
+        except KeyError:
+            converter = converters[source] = Converter(source, target, strict)
+        yield converter.convert(model)
+
+
+__all__ = [
+    "ConversionError",
+    "ConversionStep",
+    "Converter",
+    "MAPPINGS",
+    "TypeMap",
+    "convert",
+    "convert_many",
+    "get_release",
+]
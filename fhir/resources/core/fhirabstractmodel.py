@@ -18,10 +18,22 @@ from pydantic.parse import Protocol
 from pydantic.utils import ROOT_KEY, sequence_like
 
 from .utils import is_primitive_type, load_file, load_str_bytes, xml_dumps, yaml_dumps
+from .utils.construct import construct_model
+from .utils.content import (
+    CACHE_ATTRIBUTE,
+    FROZEN_ATTRIBUTE,
+    content_hash,
+    deep_copy_model,
+    models_equal,
+)
+from .utils.frozen import evolve_model, freeze_model, is_frozen
+from .validators import get_reference_targets, validate_reference_targets
 
 try:
     import orjson
 
+    from .utils.jsonwriter import json_dumps_model
+
     def json_dumps(v, *, default, option=0, return_bytes=False):
         params = {"default": default}
         if option > 0:
@@ -55,6 +67,10 @@ __author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
 
 logger = logging.getLogger(__name__)
 FHIR_COMMENTS_FIELD_NAME = "fhir_comments"
+# (field key, output key, primitive flag, ext key, output ext key)
+SerializationPlanEntry = typing.Tuple[
+    str, str, bool, typing.Optional[str], typing.Optional[str]
+]
 
 
 class WrongResourceType(PydanticValueError):
@@ -65,6 +81,9 @@ class WrongResourceType(PydanticValueError):
 class FHIRAbstractModel(BaseModel, abc.ABC):
     """Abstract base model class for all FHIR elements."""
 
+    # (mutation epoch, content hash) and frozen flag
+    __slots__ = (CACHE_ATTRIBUTE, FROZEN_ATTRIBUTE)
+
     resource_type: str = ...  # type: ignore
 
     fhir_comments: typing.Union[str, typing.List[str]] = Field(
@@ -104,6 +123,100 @@ class FHIRAbstractModel(BaseModel, abc.ABC):
 
         BaseModel.__init__(__pydantic_self__, **data)
 
+    def __setattr__(self, name, value):
+        """ """
+        if getattr(self, FROZEN_ATTRIBUTE, False):
+            raise TypeError(
+                f'"{self.__class__.__name__}" is frozen and does not support '
+                "item assignment, use ``evolve``."
+            )
+        BaseModel.__setattr__(self, name, value)
+
+    def __hash__(self) -> int:
+        """Only frozen model is hashable."""
+        if not getattr(self, FROZEN_ATTRIBUTE, False):
+            raise TypeError(
+                f"unhashable type: '{self.__class__.__name__}', use ``freeze``."
+            )
+        return hash(self.content_hash())
+
+    def __getstate__(self) -> typing.Dict[str, typing.Any]:
+        """ """
+        state = BaseModel.__getstate__(self)
+        if getattr(self, FROZEN_ATTRIBUTE, False):
+            state[FROZEN_ATTRIBUTE] = True
+        return state
+
+    def __setstate__(self, state: typing.Dict[str, typing.Any]) -> None:
+        """ """
+        BaseModel.__setstate__(self, state)
+        if state.get(FROZEN_ATTRIBUTE, False):
+            object.__setattr__(self, FROZEN_ATTRIBUTE, True)
+
+    def __eq__(self, other: typing.Any) -> bool:
+        """Structural equality (``fhir_comments`` are ignored),
+        short-circuits on identity, frozen models compare cached
+        content hash."""
+        if self is other:
+            return True
+        if not isinstance(other, FHIRAbstractModel):
+            return BaseModel.__eq__(self, other)
+        return models_equal(self, other)
+
+    def __deepcopy__(self, memo=None):
+        """ """
+        return deep_copy_model(self)
+
+    def content_hash(self) -> str:
+        """Hex digest of the model content in canonical FHIR order,
+        ``fhir_comments`` are ignored. Cached only for frozen model."""
+        return content_hash(self)
+
+    def deep_copy(self: "Model") -> "Model":
+        """Fast copy of the full model graph, without validation.
+        Copy of frozen model is mutable."""
+        return deep_copy_model(self)
+
+    def copy(
+        self: "Model",
+        *,
+        include: typing.Any = None,
+        exclude: typing.Any = None,
+        update: typing.Dict[str, typing.Any] = None,
+        deep: bool = False,
+    ) -> "Model":
+        """Copy of frozen model is mutable, made from ``deep_copy``
+        (lists are plain ``list``)."""
+        if getattr(self, FROZEN_ATTRIBUTE, False):
+            return BaseModel.copy(
+                deep_copy_model(self), include=include, exclude=exclude, update=update
+            )
+        return BaseModel.copy(
+            self, include=include, exclude=exclude, update=update, deep=deep
+        )
+
+    def freeze(self: "Model") -> "Model":
+        """Immutable, hashable copy of the model graph, which is safe to
+        share across threads. Frozen sub-elements are shared, not copied."""
+        return freeze_model(self)
+
+    def is_frozen(self) -> bool:
+        """ """
+        return is_frozen(self)
+
+    def evolve(self: "Model", **changes: typing.Any) -> "Model":
+        """New frozen model with ``changes`` (by element name or alias), only
+        changed elements are validated and copied, others are shared."""
+        return evolve_model(self, changes)
+
+    @root_validator(skip_on_failure=True, allow_reuse=True)
+    def check_reference_targets(
+        cls, values: typing.Dict[str, typing.Any]
+    ) -> typing.Dict[str, typing.Any]:
+        """Opt-in, see ``fhir.resources.core.validators.
+        set_reference_targets_validation``."""
+        return validate_reference_targets(cls, values)
+
     @classmethod
     def add_root_validator(
         cls: typing.Type["Model"],
@@ -214,6 +327,54 @@ class FHIRAbstractModel(BaseModel, abc.ABC):
             f.alias: fname for fname, f in cls.__fields__.items() if f.alias in aliases
         }
 
+    @classmethod
+    @lru_cache(maxsize=None, typed=True)
+    def get_serialization_plan(
+        cls: typing.Type["FHIRAbstractModel"],
+    ) -> typing.Tuple[SerializationPlanEntry, ...]:
+        """Compiled (once per class) serialization plan, with preserving
+        original sequence order of elements. Each entry is a tuple of
+        (field key, output key, primitive flag, ext key, output ext key),
+        ext key & output ext key are ``None`` if the element doesn't have
+        any primitive extension field."""
+        alias_maps = cls.get_alias_mapping()
+        plan = list()
+        seen = set()
+        for prop_name in cls.elements_sequence():
+            if prop_name in seen:
+                # some element names are listed more than once.
+                continue
+            seen.add(prop_name)
+            field_key = alias_maps[prop_name]
+            field = cls.__fields__[field_key]
+            is_primitive = is_primitive_type(field)
+            ext_key = ext_alias = None
+            if is_primitive:
+                ext_field = cls.__fields__.get(f"{field_key}__ext", None)
+                if ext_field is not None:
+                    ext_key, ext_alias = ext_field.name, ext_field.alias
+            plan.append((field_key, field.alias, is_primitive, ext_key, ext_alias))
+        return tuple(plan)
+
+    @classmethod
+    def reference_targets(
+        cls: typing.Type["FHIRAbstractModel"],
+    ) -> typing.Dict[str, typing.FrozenSet[str]]:
+        """Allowed target resource types of ``Reference`` fields (by field
+        name), from ``enum_reference_types`` metadata, computed once per
+        class. ``Resource`` means any resource type."""
+        return get_reference_targets(cls)
+
+    @classmethod
+    def construct_fhir(
+        cls: typing.Type["Model"], data: typing.Dict[str, typing.Any]
+    ) -> "Model":
+        """Trusted fast path, builds full nested model tree from already valid
+        data (i.e. read back from own store) without validation.
+        Nested ``Resource`` (``BundleEntry.resource``, ``contained``) is
+        dispatched on ``resourceType``. Invalid data is not detected!"""
+        return construct_model(cls, data)
+
     @classmethod
     def get_json_encoder(cls) -> typing.Callable[[typing.Any], typing.Any]:
         """ """
@@ -370,6 +531,20 @@ class FHIRAbstractModel(BaseModel, abc.ABC):
 
             dumps_kwargs["return_bytes"] = return_bytes
 
+            if option == 0 and not self.__custom_root_type__:
+                # write straight from model graph to bytes,
+                # without building intermediate dict.
+                result = json_dumps_model(
+                    self,
+                    by_alias=by_alias,
+                    exclude_none=exclude_none,
+                    exclude_comments=exclude_comments,
+                    default=encoder or self.__json_encoder__,
+                )
+                if return_bytes is False:
+                    return result.decode()
+                return result
+
         data = self.dict(
             by_alias=by_alias,
             exclude_none=exclude_none,
@@ -432,15 +607,18 @@ class FHIRAbstractModel(BaseModel, abc.ABC):
         if self.__class__.has_resource_base():
             yield "resourceType", self.resource_type
 
-        alias_maps = self.get_alias_mapping()
-        for prop_name in self.elements_sequence():
-            field_key = alias_maps[prop_name]
-
-            field = self.__fields__[field_key]
-            is_primitive = is_primitive_type(field)
-            v = self.__dict__.get(field_key, None)
-            dict_key = by_alias and field.alias or field_key
-            if v is not None:
+        fields_values = self.__dict__
+        for (
+            field_key,
+            alias,
+            is_primitive,
+            ext_key,
+            ext_alias,
+        ) in self.get_serialization_plan():
+            v = fields_values.get(field_key, None)
+            dict_key = by_alias and alias or field_key
+            if v is not None and (not is_primitive or isinstance(v, list)):
+                # primitive (non list) value is returned as it is.
                 v = self._fhir_get_value(
                     v,
                     by_alias=by_alias,
@@ -452,11 +630,10 @@ class FHIRAbstractModel(BaseModel, abc.ABC):
                 yield dict_key, v
 
             # looking for comments or primitive extension for primitive data type
-            if is_primitive:
-                ext_key = f"{field_key}__ext"
-                ext_val = self.__dict__.get(ext_key, None)
+            if ext_key is not None:
+                ext_val = fields_values.get(ext_key, None)
                 if ext_val is not None:
-                    dict_key_ = by_alias and self.__fields__[ext_key].alias or ext_key
+                    dict_key_ = by_alias and ext_alias or ext_key
                     ext_val = self._fhir_get_value(
                         ext_val,
                         by_alias=by_alias,
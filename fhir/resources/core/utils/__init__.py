@@ -10,59 +10,109 @@ from pydantic.types import StrBytes
 
 from .common import is_primitive_type  # noqa: F401
 
-try:
-    from .yaml import yaml_dumps, yaml_loads
-except ImportError:
-
-    def raise_yaml_import_error():
-        raise ImportError(
-            "YAML library not found! Make sure ``fhir.resources`` is "
-            "added into your project dependency with extra ´´yaml´´. "
-            "for example ``fhir.resources[yaml]``."
-        )
 
-    def yaml_dumps(
-        data,
-        *,
-        stream=None,
-        indent=None,
-        width=None,
-        line_break=None,
-        sort_keys=False,
-        encoding="utf-8",
-        return_bytes=True,
-    ):
+def raise_yaml_import_error():
+    raise ImportError(
+        "YAML library not found! Make sure ``fhir.resources`` is "
+        "added into your project dependency with extra ´´yaml´´. "
+        "for example ``fhir.resources[yaml]``."
+    )
+
+
+def raise_lxml_import_error():
+    raise ImportError(
+        "LXML library not found! Make sure ``fhir.resources`` is "
+        "added into your project dependency with extra ´´xml´´. "
+        "for example ``fhir.resources[xml]``."
+    )
+
+
+# optional libraries (PyYAML, lxml) are imported on first use,
+# which keeps ``import fhir.resources`` cheap.
+def yaml_dumps(
+    data,
+    *,
+    stream=None,
+    indent=None,
+    width=None,
+    line_break=None,
+    sort_keys=False,
+    encoding="utf-8",
+    return_bytes=True,
+):
+    try:
+        from .yaml import yaml_dumps as _yaml_dumps
+    except ImportError:
         raise_yaml_import_error()
+    return _yaml_dumps(
+        data,
+        stream=stream,
+        indent=indent,
+        width=width,
+        line_break=line_break,
+        sort_keys=sort_keys,
+        encoding=encoding,
+        return_bytes=return_bytes,
+    )
 
-    def yaml_loads(stream, loader=None):
+
+def yaml_loads(stream, loader=None):
+    try:
+        from .yaml import yaml_loads as _yaml_loads
+    except ImportError:
         raise_yaml_import_error()
+    return _yaml_loads(stream, loader=loader)
 
 
-try:
-    from .xml import xml_dumps, xml_loads
-except ImportError:
+@no_type_check
+def xml_dumps(
+    model: "FHIRAbstractModel",  # noqa: F821
+    *,
+    pretty_print=False,
+    xml_declaration=True,
+    with_comments=True,
+    strip_text=False,
+):
+    try:
+        from .xml import xml_dumps as _xml_dumps
+    except ImportError:
+        raise_lxml_import_error()
+    return _xml_dumps(
+        model,
+        pretty_print=pretty_print,
+        xml_declaration=xml_declaration,
+        with_comments=with_comments,
+        strip_text=strip_text,
+    )
 
-    def raise_lxml_import_error():
-        raise ImportError(
-            "LXML library not found! Make sure ``fhir.resources`` is "
-            "added into your project dependency with extra ´´xml´´. "
-            "for example ``fhir.resources[xml]``."
-        )
 
-    @no_type_check
-    def xml_dumps(
-        model: "FHIRAbstractModel",  # noqa: F821
-        *,
-        pretty_print=False,
-        xml_declaration=True,
-        with_comments=True,
-        strip_text=False,
-    ):
+@no_type_check
+def xml_dump(model, stream, *, xml_declaration=True, with_comments=True):
+    try:
+        from .xml import xml_dump as _xml_dump
+    except ImportError:
         raise_lxml_import_error()
+    return _xml_dump(
+        model, stream, xml_declaration=xml_declaration, with_comments=with_comments
+    )
 
-    @no_type_check
-    def xml_loads(cls, b, xmlparser=None):
+
+@no_type_check
+def xml_loads(cls, b, xmlparser=None):
+    try:
+        from .xml import xml_loads as _xml_loads
+    except ImportError:
+        raise_lxml_import_error()
+    return _xml_loads(cls, b, xmlparser=xmlparser)
+
+
+@no_type_check
+def xml_iterparse(cls, source):
+    try:
+        from .xml import xml_iterparse as _xml_iterparse
+    except ImportError:
         raise_lxml_import_error()
+    return _xml_iterparse(cls, source)
 
 
 __author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
@@ -88,12 +138,12 @@ def load_str_bytes(
         elif content_type.endswith("xml"):
             if "cls" not in extra:
                 raise ValueError("'cls:FHIRAbstractModel' is required parameter.")
-            params = {}
-            if "xmlparser" in extra:
-                params["xmlparser"] = extra["xmlparser"]
             if TYPE_CHECKING:
                 b = cast(bytes, b)
-            obj = xml_loads(extra["cls"], b, **params)
+            if "xmlparser" in extra:
+                return xml_loads(extra["cls"], b, xmlparser=extra["xmlparser"])
+            # model kwargs, validated once by caller
+            obj = xml_iterparse(extra["cls"], b)
             return obj
     obj = default_load_str_bytes(
         b,
@@ -131,10 +181,13 @@ def load_file(
     ):
         if "cls" not in extra:
             raise ValueError("'cls:FHIRAbstractModel' is required parameter.")
-        params = {}
         if "xmlparser" in extra:
-            params["xmlparser"] = extra["xmlparser"]
-        obj = xml_loads(extra["cls"], path.read_bytes(), **params)
+            obj = xml_loads(
+                extra["cls"], path.read_bytes(), xmlparser=extra["xmlparser"]
+            )
+        else:
+            # file is read in chunks
+            obj = xml_iterparse(extra["cls"], path)
     else:
         obj = default_load_file(
             path,
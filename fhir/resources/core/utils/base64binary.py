@@ -0,0 +1,95 @@
+# _*_ coding: utf-8 _*_
+"""Value type of FHIR ``base64Binary`` primitive (i.e. ``Binary.data``,
+``Attachment.data``). Encoded buffer is kept as it is, validity is checked
+by linear scan (no regex) and decoding happens only on demand."""
+import binascii
+import typing
+
+from pydantic.errors import BytesError, PydanticValueError
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+BASE64_ALPHABET = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/="
+WHITESPACE = b" \t\n\r\f\v"
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class Base64Error(PydanticValueError):
+    """ """
+
+    code = "base64"
+    msg_template = "value is not valid base64 encoded data"
+
+
+class Base64Bytes(bytes):
+    """Base64 encoded bytes (as received), serialized back unchanged."""
+
+    def decoded(self) -> bytes:
+        """Decoded (raw) bytes."""
+        return binascii.a2b_base64(self)
+
+    def iter_decoded(
+        self, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> typing.Iterator[bytes]:
+        """Decoded bytes in chunks of (about) ``chunk_size``, only one chunk
+        is kept in memory at once."""
+        step = max(4, chunk_size // 3 * 4)
+        view = memoryview(self)
+        remainder = b""
+        for start in range(0, len(view), step):
+            encoded = remainder + view[start : start + step].tobytes()
+            if has_whitespace(encoded):
+                encoded = encoded.translate(None, WHITESPACE)
+            # decode only complete (4 chars) groups
+            end = len(encoded) - len(encoded) % 4
+            remainder = encoded[end:]
+            if end > 0:
+                yield binascii.a2b_base64(encoded[:end])
+        if remainder:
+            yield binascii.a2b_base64(remainder)
+
+
+def has_whitespace(value: bytes) -> bool:
+    """ """
+    for char in WHITESPACE:
+        if char in value:
+            return True
+    return False
+
+
+def is_base64(value: bytes) -> bool:
+    """Only base64 alphabet (and whitespace), padding (at most two ``=``)
+    only at the end and encoded length is multiple of four. Value is scanned
+    once (in C), only whitespace and invalid characters are left behind."""
+    residual = value.translate(None, BASE64_ALPHABET)
+    if residual and residual.translate(None, WHITESPACE):
+        return False
+    if (len(value) - len(residual)) % 4 != 0:
+        return False
+    if b"=" in value:
+        data = value.rstrip(WHITESPACE + b"=")
+        if b"=" in data or value.count(b"=") > 2:
+            return False
+    return True
+
+
+def validate_base64(value: typing.Any) -> Base64Bytes:
+    """ """
+    if value.__class__ is Base64Bytes:
+        return value
+    if isinstance(value, str):
+        try:
+            value = Base64Bytes(value, "ascii")
+        except UnicodeEncodeError:
+            raise Base64Error()
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        value = Base64Bytes(value)
+    else:
+        raise BytesError()
+
+    if not is_base64(value):
+        raise Base64Error()
+    return value
+
+
+__all__ = ["Base64Bytes", "Base64Error", "validate_base64", "is_base64"]
@@ -0,0 +1,271 @@
+# _*_ coding: utf-8 _*_
+"""Trusted (validation less) construction of the full nested model tree,
+for payloads those are already validated (i.e. read back from own store).
+Only cheap type coercion is done (which is required for serialization),
+no regex, constraints or root validators are run."""
+import decimal
+import importlib
+import typing
+
+from pydantic.error_wrappers import ErrorWrapper, ValidationError
+from pydantic.errors import ExtraError
+from pydantic.fields import SHAPE_LIST
+
+from .base64binary import Base64Bytes
+from .common import normalize_fhir_type_class
+
+if typing.TYPE_CHECKING:
+    from fhir.resources.core.fhirabstractmodel import FHIRAbstractModel
+    from pydantic.fields import ModelField
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+# kind of construct plan entry
+KIND_VALUE = 0  # taken as it is
+KIND_COERCE = 1  # cheap coercion function
+KIND_MODEL = 2  # nested FHIR model
+KIND_POLYMORPHIC = 3  # Resource/Element, dispatched on ``resourceType``
+KIND_VALIDATE = 4  # fallback, pydantic field validation
+
+# (field key, kind, argument, list flag)
+ConstructPlanEntry = typing.Tuple[str, int, typing.Any, bool]
+ConstructPlan = typing.Dict[str, ConstructPlanEntry]
+
+_CONSTRUCT_PLANS: typing.Dict[type, ConstructPlan] = dict()
+_DEFAULTS: typing.Dict[type, typing.Dict[str, typing.Any]] = dict()
+RESOURCE_TYPE_KEYS = ("resourceType", "resource_type")
+
+object_setattr = object.__setattr__
+
+
+def _to_int(value):
+    """ """
+    if value.__class__ is int:
+        return value
+    return int(value)
+
+
+def _to_decimal(value):
+    """ """
+    if isinstance(value, decimal.Decimal):
+        return value
+    return decimal.Decimal(str(value).strip())
+
+
+def _to_bytes(value):
+    """ """
+    if value.__class__ is Base64Bytes:
+        return value
+    if isinstance(value, str):
+        return Base64Bytes(value, "utf8")
+    return Base64Bytes(value)
+
+
+def _validate_with(type_):
+    """FHIR date/time types keep partial values as str,
+    so type's own validate is used."""
+    validate = type_.validate
+
+    def _validate(value):
+        if isinstance(value, str):
+            return validate(value)
+        return value
+
+    return _validate
+
+
+PRIMITIVE_COERCIONS: typing.Dict[str, typing.Optional[typing.Callable]] = {
+    "boolean": None,
+    "string": None,
+    "code": None,
+    "id": None,
+    "uri": None,
+    "url": None,
+    "canonical": None,
+    "oid": None,
+    "markdown": None,
+    "xhtml": None,
+    "integer": _to_int,
+    "unsignedInt": _to_int,
+    "positiveInt": _to_int,
+    "decimal": _to_decimal,
+    "base64Binary": _to_bytes,
+}
+DATETIME_TYPES = ("date", "dateTime", "instant", "time")
+
+
+def get_fhir_model_class_getter(type_) -> typing.Callable[[str], type]:
+    """``get_fhir_model_class`` of the FHIR release, the type belongs to."""
+    package = type_.__module__.rpartition(".")[0]
+    mod = importlib.import_module(".fhirtypesvalidators", package=package)
+    return mod.get_fhir_model_class
+
+
+def _plan_entry(field: "ModelField") -> ConstructPlanEntry:
+    """ """
+    type_ = normalize_fhir_type_class(field.type_)
+    is_list = field.shape == SHAPE_LIST
+
+    if type_ is bool or type_ is str:
+        return field.name, KIND_VALUE, None, is_list
+
+    if getattr(type_, "is_primitive", lambda: False)():
+        type_name = type_.fhir_type_name()
+        if type_name in DATETIME_TYPES:
+            return field.name, KIND_COERCE, _validate_with(type_), is_list
+        if type_name in PRIMITIVE_COERCIONS:
+            coerce = PRIMITIVE_COERCIONS[type_name]
+            if coerce is None:
+                return field.name, KIND_VALUE, None, is_list
+            return field.name, KIND_COERCE, coerce, is_list
+        return field.name, KIND_VALIDATE, field, is_list
+
+    resource_type = getattr(type_, "__resource_type__", None)
+    if resource_type is None:
+        return field.name, KIND_VALIDATE, field, is_list
+
+    get_fhir_model_class = get_fhir_model_class_getter(type_)
+    if type_.__resource_type__ in ("Resource", "Element"):
+        return (
+            field.name,
+            KIND_POLYMORPHIC,
+            (get_fhir_model_class, get_fhir_model_class(resource_type)),
+            is_list,
+        )
+    return field.name, KIND_MODEL, get_fhir_model_class(resource_type), is_list
+
+
+def get_construct_plan(klass: typing.Type["FHIRAbstractModel"]) -> ConstructPlan:
+    """Mapping of input keys (both alias and field name) to plan entry,
+    compiled once per class."""
+    try:
+        return _CONSTRUCT_PLANS[klass]
+    except KeyError:
+        pass
+    plan: ConstructPlan = dict()
+    for field in klass.__fields__.values():
+        if field.name == "resource_type":
+            continue
+        if field.name == "fhir_comments":
+            entry: ConstructPlanEntry = (field.name, KIND_VALUE, None, False)
+        else:
+            entry = _plan_entry(field)
+        plan[field.alias] = entry
+        plan[field.name] = entry
+    _CONSTRUCT_PLANS[klass] = plan
+    return plan
+
+
+def get_defaults(
+    klass: typing.Type["FHIRAbstractModel"],
+) -> typing.Dict[str, typing.Any]:
+    """ """
+    try:
+        return _DEFAULTS[klass]
+    except KeyError:
+        pass
+    defaults = {name: field.get_default() for name, field in klass.__fields__.items()}
+    _DEFAULTS[klass] = defaults
+    return defaults
+
+
+def _construct_polymorphic(arg, value):
+    """ """
+    if not isinstance(value, dict):
+        return value
+    get_fhir_model_class, default_klass = arg
+    resource_type = value.get("resourceType", None)
+    if resource_type is None:
+        return construct_model(default_klass, value)
+    return construct_model(get_fhir_model_class(resource_type), value)
+
+
+def _construct_value(klass, key, kind, arg, value):
+    """ """
+    if kind == KIND_MODEL:
+        if isinstance(value, dict):
+            return construct_model(arg, value)
+        return value
+    if kind == KIND_COERCE:
+        return arg(value)
+    if kind == KIND_POLYMORPHIC:
+        return _construct_polymorphic(arg, value)
+    # KIND_VALIDATE
+    value, errors = arg.validate(value, {}, loc=key, cls=klass)
+    if errors:
+        raise ValidationError([errors], klass)
+    return value
+
+
+def _wrong_resource_type_error(klass, resource_type) -> ValidationError:
+    """ """
+    from fhir.resources.core.fhirabstractmodel import WrongResourceType
+
+    error = (
+        f"``{klass.__module__}.{klass.__name__}`` "
+        f"expects resource type ``{klass.get_resource_type()}``, "
+        f"but got ``{resource_type}``. "
+        "Make sure resource type name is correct and right "
+        "ModelClass has been chosen."
+    )
+    return ValidationError(
+        [ErrorWrapper(WrongResourceType(error=error), loc="resource_type")], klass
+    )
+
+
+def construct_model(
+    klass: typing.Type["FHIRAbstractModel"], data: typing.Dict[str, typing.Any]
+) -> "FHIRAbstractModel":
+    """Builds model instance (with nested models) from already valid data,
+    without running validation."""
+    try:
+        plan = _CONSTRUCT_PLANS[klass]
+        values = _DEFAULTS[klass].copy()
+    except KeyError:
+        plan = get_construct_plan(klass)
+        values = get_defaults(klass).copy()
+    fields_set = set()
+
+    for key, value in data.items():
+        try:
+            field_key, kind, arg, is_list = plan[key]
+        except KeyError:
+            if key in RESOURCE_TYPE_KEYS:
+                if value != values["resource_type"]:
+                    raise _wrong_resource_type_error(klass, value)
+                continue
+            raise ValidationError([ErrorWrapper(ExtraError(), loc=key)], klass)
+
+        if value is None:
+            pass
+        elif kind == KIND_MODEL:
+            # most common, so inlined
+            if is_list:
+                value = [
+                    construct_model(arg, item) if isinstance(item, dict) else item
+                    for item in value
+                ]
+            elif isinstance(value, dict):
+                value = construct_model(arg, value)
+        elif kind == KIND_VALUE:
+            if is_list:
+                value = list(value)
+        elif is_list:
+            value = [
+                None if item is None else _construct_value(klass, key, kind, arg, item)
+                for item in value
+            ]
+        else:
+            value = _construct_value(klass, key, kind, arg, value)
+        values[field_key] = value
+        fields_set.add(field_key)
+
+    model = klass.__new__(klass)
+    object_setattr(model, "__dict__", values)
+    object_setattr(model, "__fields_set__", fields_set)
+    if klass.__private_attributes__:
+        model._init_private_attributes()
+    return model
+
+
+__all__ = ["construct_model", "get_construct_plan"]
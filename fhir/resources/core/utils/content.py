@@ -0,0 +1,226 @@
+# _*_ coding: utf-8 _*_
+"""Content hash (structural identity), structural equality and fast deep
+copy of the model graph. Content is compared over elements in canonical FHIR
+order (as of serialization plan), ``fhir_comments`` are ignored. Content hash
+is cached only on frozen model, mutable model (its lists might be mutated in
+place) is hashed and compared on each call."""
+import datetime
+import decimal
+import hashlib
+import typing
+
+from pydantic.fields import SHAPE_SINGLETON
+
+from .common import normalize_fhir_type_class
+
+if typing.TYPE_CHECKING:
+    from fhir.resources.core.fhirabstractmodel import FHIRAbstractModel
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+# names of the slots on ``FHIRAbstractModel``, cache keeps content hash
+# of frozen model.
+CACHE_ATTRIBUTE = "_content_hash_cache"
+FROZEN_ATTRIBUTE = "_frozen"
+SEPARATOR = "\x1f"
+
+object_setattr = object.__setattr__
+_COPY_PLANS: typing.Dict[type, typing.Tuple[typing.Tuple[str, bool], ...]] = dict()
+
+
+def get_cached_hash(model: "FHIRAbstractModel") -> typing.Optional[str]:
+    """ """
+    if not getattr(model, FROZEN_ATTRIBUTE, False):
+        return None
+    return getattr(model, CACHE_ATTRIBUTE, None)
+
+
+def _write_value(value: typing.Any, out: typing.List[str]):
+    """ """
+    klass = value.__class__
+    if klass is str:
+        out.append(repr(value))
+    elif klass is bool:
+        out.append("true" if value else "false")
+    elif isinstance(value, list):
+        out.append("[")
+        for item in value:
+            if item is None:
+                out.append("null")
+            else:
+                _write_value(item, out)
+        out.append("]")
+    elif hasattr(value, "get_serialization_plan"):
+        _write_model(value, out)
+    elif isinstance(value, str):
+        out.append(repr(str(value)))
+    elif isinstance(value, int):
+        out.append(f"i{value}")
+    elif isinstance(value, decimal.Decimal):
+        out.append(f"d{value}")
+    elif isinstance(value, (datetime.date, datetime.time)):
+        out.append(f"t{value.isoformat()}")
+    elif isinstance(value, bytes):
+        out.append(repr(bytes(value)))
+    else:
+        out.append(repr(value))
+
+
+def _write_model(model: "FHIRAbstractModel", out: typing.List[str]):
+    """ """
+    values = model.__dict__
+    out.append("{")
+    out.append(model.resource_type)
+    for field_key, alias, _, ext_key, ext_alias in model.get_serialization_plan():
+        value = values[field_key]
+        if value is not None and (not isinstance(value, list) or value):
+            out.append(alias)
+            _write_value(value, out)
+        if ext_key is not None:
+            value = values[ext_key]
+            if value is not None and (not isinstance(value, list) or value):
+                out.append(ext_alias)
+                _write_value(value, out)
+    out.append("}")
+
+
+def content_hash(model: "FHIRAbstractModel") -> str:
+    """Hex digest of the model content, cached for frozen model."""
+    value = get_cached_hash(model)
+    if value is not None:
+        return value
+    out: typing.List[str] = list()
+    _write_model(model, out)
+    value = hashlib.blake2b(
+        SEPARATOR.join(out).encode("utf-8", "surrogatepass"), digest_size=16
+    ).hexdigest()
+    if getattr(model, FROZEN_ATTRIBUTE, False):
+        object_setattr(model, CACHE_ATTRIBUTE, value)
+    return value
+
+
+def _is_empty(value: typing.Any) -> bool:
+    """ """
+    return value is None or (isinstance(value, list) and not value)
+
+
+def _values_equal(value: typing.Any, other: typing.Any) -> bool:
+    """Same as comparing content hash tokens (see ``_write_value``)."""
+    if value is other:
+        return True
+    if isinstance(value, list):
+        if not isinstance(other, list) or len(value) != len(other):
+            return False
+        for item, other_item in zip(value, other):
+            if item is None or other_item is None:
+                if item is not other_item:
+                    return False
+            elif not _values_equal(item, other_item):
+                return False
+        return True
+    if hasattr(value, "get_serialization_plan"):
+        return hasattr(other, "get_serialization_plan") and models_equal(value, other)
+    if isinstance(value, str):
+        return isinstance(other, str) and str(value) == str(other)
+    if value.__class__ is not other.__class__:
+        return False
+    if isinstance(value, decimal.Decimal):
+        return str(value) == str(other)
+    return value == other
+
+
+def models_equal(model: "FHIRAbstractModel", other: "FHIRAbstractModel") -> bool:
+    """Structural equality, stops on the first difference. Content hash
+    is compared for frozen models (cached) and models of different class."""
+    if model is other:
+        return True
+    if model.__class__ is not other.__class__ or (
+        getattr(model, FROZEN_ATTRIBUTE, False)
+        and getattr(other, FROZEN_ATTRIBUTE, False)
+    ):
+        return content_hash(model) == content_hash(other)
+    values = model.__dict__
+    other_values = other.__dict__
+    for field_key, _, _, ext_key, _ in model.get_serialization_plan():
+        value = values[field_key]
+        other_value = other_values[field_key]
+        if _is_empty(value):
+            if not _is_empty(other_value):
+                return False
+        elif _is_empty(other_value) or not _values_equal(value, other_value):
+            return False
+        if ext_key is not None:
+            value = values[ext_key]
+            other_value = other_values[ext_key]
+            if _is_empty(value):
+                if not _is_empty(other_value):
+                    return False
+            elif _is_empty(other_value) or not _values_equal(value, other_value):
+                return False
+    return True
+
+
+def get_copy_plan(klass: type) -> typing.Tuple[typing.Tuple[str, bool], ...]:
+    """Fields those might hold mutable values (models or lists),
+    as (field name, model flag), compiled once per class."""
+    try:
+        return _COPY_PLANS[klass]
+    except KeyError:
+        pass
+    plan = list()
+    for field in klass.__fields__.values():
+        type_ = normalize_fhir_type_class(field.type_)
+        is_model = getattr(type_, "__resource_type__", None) is not None
+        if is_model or field.shape != SHAPE_SINGLETON:
+            plan.append((field.name, is_model))
+    _COPY_PLANS[klass] = tuple(plan)
+    return _COPY_PLANS[klass]
+
+
+def _copy_value(value: typing.Any) -> typing.Any:
+    """ """
+    if isinstance(value, list):
+        return [None if item is None else _copy_value(item) for item in value]
+    if hasattr(value, "__fields_set__"):
+        return deep_copy_model(value)
+    # primitive values are immutable
+    return value
+
+
+def deep_copy_model(model: "FHIRAbstractModel") -> "FHIRAbstractModel":
+    """Copy of the full model graph without validation, copy of frozen
+    model is mutable (lists are plain ``list``)."""
+    klass = model.__class__
+    values = model.__dict__.copy()
+    try:
+        plan = _COPY_PLANS[klass]
+    except KeyError:
+        plan = get_copy_plan(klass)
+    for name, is_model in plan:
+        value = values[name]
+        if value is None:
+            continue
+        if isinstance(value, list):
+            if is_model:
+                values[name] = [
+                    None if item is None else deep_copy_model(item) for item in value
+                ]
+            else:
+                values[name] = list(value)
+        elif is_model:
+            values[name] = deep_copy_model(value)
+        else:
+            values[name] = _copy_value(value)
+    copied = klass.__new__(klass)
+    object_setattr(copied, "__dict__", values)
+    object_setattr(copied, "__fields_set__", set(model.__fields_set__))
+    if klass.__private_attributes__:
+        for name in klass.__private_attributes__:
+            try:
+                object_setattr(copied, name, _copy_value(getattr(model, name)))
+            except AttributeError:
+                pass
+    return copied
+
+
+__all__ = ["content_hash", "deep_copy_model", "models_equal"]
@@ -0,0 +1,169 @@
+# _*_ coding: utf-8 _*_
+"""Regex free parsers for the fixed width ISO forms of FHIR ``date``,
+``dateTime``, ``instant`` and ``time`` primitives.
+Each parser returns ``None`` for input it doesn't handle (unusual or invalid),
+caller must then fall back to the regex based validation, which stays
+the single source of truth for errors."""
+import datetime
+import typing
+from functools import lru_cache
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+
+@lru_cache(maxsize=None)
+def parse_timezone(value: str) -> typing.Optional[datetime.tzinfo]:
+    """``Z`` or ``(+|-)hh:mm`` (max 14:00) as FHIR allows.
+    The same tzinfo is produced as pydantic's ``parse_datetime``."""
+    if value == "Z":
+        return datetime.timezone.utc
+    if (
+        len(value) != 6
+        or value[0] not in "+-"
+        or value[3] != ":"
+        or not _is_digits(value[1:3] + value[4:6])
+    ):
+        return None
+    hours = int(value[1:3])
+    minutes = int(value[4:6])
+    if not ((hours < 14 and minutes < 60) or (hours == 14 and minutes == 0)):
+        return None
+    offset = 60 * hours + minutes
+    if value[0] == "-":
+        offset = -offset
+    return datetime.timezone(datetime.timedelta(minutes=offset))
+
+
+try:
+    # python 3.7+, implemented in C
+    _naive_datetime = datetime.datetime.fromisoformat
+except AttributeError:  # pragma: no cover
+
+    def _naive_datetime(value: str) -> datetime.datetime:  # type: ignore
+        """``YYYY-MM-DDThh:mm:ss`` (already checked) to datetime."""
+        return datetime.datetime(
+            int(value[0:4]),
+            int(value[5:7]),
+            int(value[8:10]),
+            int(value[11:13]),
+            int(value[14:16]),
+            int(value[17:19]),
+        )
+
+
+def _is_digits(value: str) -> bool:
+    """ASCII digits only, as ``str.isdigit`` also accepts other scripts."""
+    return value.isdigit() and len(value.encode()) == len(value)
+
+
+def _parse_fraction(fraction: str) -> int:
+    """Microsecond from 1 to 6 digits, otherwise ``-1``."""
+    if not 0 < len(fraction) < 7 or not _is_digits(fraction):
+        return -1
+    return int(fraction.ljust(6, "0"))
+
+
+def parse_date(value: str) -> typing.Union[datetime.date, str, None]:
+    """``YYYY``, ``YYYY-MM`` (kept as str) or ``YYYY-MM-DD``."""
+    length = len(value)
+    if length == 4:
+        if _is_digits(value):
+            return value
+    elif length == 7:
+        if value[4] == "-" and _is_digits(value[0:4] + value[5:7]):
+            if int(value[5:7]) > 12:
+                return None
+            return value
+    elif length == 10:
+        if (
+            value[4] == "-"
+            and value[7] == "-"
+            and _is_digits(value[0:4] + value[5:7] + value[8:10])
+        ):
+            try:
+                return datetime.date(int(value[0:4]), int(value[5:7]), int(value[8:10]))
+            except ValueError:
+                return None
+    return None
+
+
+def parse_datetime(value: str) -> typing.Optional[datetime.datetime]:
+    """``YYYY-MM-DDThh:mm:ss[.ffffff][Z|(+|-)hh:mm]``,
+    without time zone, naive datetime is returned."""
+    length = len(value)
+    if (
+        length < 19
+        or value[4] != "-"
+        or value[7] != "-"
+        or value[10] != "T"
+        or value[13] != ":"
+        or value[16] != ":"
+    ):
+        return None
+    digits = (
+        value[0:4]
+        + value[5:7]
+        + value[8:10]
+        + value[11:13]
+        + value[14:16]
+        + value[17:19]
+    )
+    if not _is_digits(digits):
+        return None
+
+    # time zone is at fixed position from the end
+    if value[-1] == "Z":
+        position = length - 1
+    elif length > 24 and value[-6] in "+-":
+        position = length - 6
+    else:
+        position = length
+
+    microsecond = 0
+    if position > 19:
+        if value[19] != ".":
+            return None
+        microsecond = _parse_fraction(value[20:position])
+        if microsecond < 0:
+            return None
+
+    tzinfo = None
+    if position < length:
+        tzinfo = parse_timezone(value[position:])
+        if tzinfo is None:
+            return None
+    try:
+        result = _naive_datetime(value[0:19])
+    except ValueError:
+        return None
+    if microsecond or tzinfo is not None:
+        result = result.replace(microsecond=microsecond, tzinfo=tzinfo)
+    return result
+
+
+def parse_time(value: str) -> typing.Optional[datetime.time]:
+    """``hh:mm:ss[.ffffff]``, time zone is not allowed."""
+    length = len(value)
+    if (
+        length < 8
+        or value[2] != ":"
+        or value[5] != ":"
+        or not _is_digits(value[0:2] + value[3:5] + value[6:8])
+    ):
+        return None
+    microsecond = 0
+    if length > 8:
+        if value[8] != ".":
+            return None
+        microsecond = _parse_fraction(value[9:])
+        if microsecond < 0:
+            return None
+    try:
+        return datetime.time(
+            int(value[0:2]), int(value[3:5]), int(value[6:8]), microsecond
+        )
+    except ValueError:
+        return None
+
+
+__all__ = ["parse_date", "parse_datetime", "parse_time", "parse_timezone"]
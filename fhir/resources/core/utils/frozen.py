@@ -0,0 +1,155 @@
+# _*_ coding: utf-8 _*_
+"""Frozen (immutable, hashable) models with structural sharing.
+``freeze_model`` copies the model graph once (already frozen sub-elements
+are shared), list values become ``FrozenList``. ``evolve_model`` validates
+only the changed elements and shares all others with the source model,
+so a frozen model can be safely shared across threads and cache layers."""
+import typing
+
+from pydantic.error_wrappers import ErrorWrapper, ValidationError
+from pydantic.utils import ROOT_KEY
+
+from .content import FROZEN_ATTRIBUTE, get_copy_plan
+
+if typing.TYPE_CHECKING:
+    from fhir.resources.core.fhirabstractmodel import FHIRAbstractModel
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+object_setattr = object.__setattr__
+
+
+class FrozenList(list):
+    """Immutable (and hashable) list, still ``isinstance`` of ``list``,
+    so serializers work as usual."""
+
+    __slots__ = ()
+
+    def _immutable(self, *args, **kwargs):
+        """ """
+        raise TypeError(f"``{self.__class__.__name__}`` is immutable.")
+
+    append = extend = insert = remove = pop = clear = _immutable
+    sort = reverse = __setitem__ = __delitem__ = _immutable
+    __iadd__ = __imul__ = _immutable
+
+    def __hash__(self):
+        """ """
+        return hash(tuple(self))
+
+    def __reduce__(self):
+        """ """
+        return self.__class__, (list(self),)
+
+
+def is_frozen(model: "FHIRAbstractModel") -> bool:
+    """ """
+    return getattr(model, FROZEN_ATTRIBUTE, False)
+
+
+def _freeze_list(value: list, is_model: bool) -> FrozenList:
+    """ """
+    if not is_model:
+        if value.__class__ is FrozenList:
+            return value
+        return FrozenList(value)
+    items = [None if item is None else freeze_model(item) for item in value]
+    if value.__class__ is FrozenList and all(
+        item is item_ for item, item_ in zip(items, value)
+    ):
+        return value
+    return FrozenList(items)
+
+
+def _freeze_value(value: typing.Any, is_model: bool) -> typing.Any:
+    """ """
+    if isinstance(value, list):
+        return _freeze_list(value, is_model)
+    if is_model:
+        return freeze_model(value)
+    return value
+
+
+def _new_frozen(
+    klass: type,
+    values: typing.Dict[str, typing.Any],
+    fields_set: typing.Set[str],
+) -> "FHIRAbstractModel":
+    """ """
+    model = klass.__new__(klass)
+    object_setattr(model, "__dict__", values)
+    object_setattr(model, "__fields_set__", fields_set)
+    if klass.__private_attributes__:
+        model._init_private_attributes()
+    object_setattr(model, FROZEN_ATTRIBUTE, True)
+    return model
+
+
+def freeze_model(model: "FHIRAbstractModel") -> "FHIRAbstractModel":
+    """Frozen copy of the model graph, frozen model is returned as it is."""
+    if getattr(model, FROZEN_ATTRIBUTE, False):
+        return model
+    klass = model.__class__
+    values = model.__dict__.copy()
+    for name, is_model in get_copy_plan(klass):
+        value = values[name]
+        if value is not None:
+            values[name] = _freeze_value(value, is_model)
+    return _new_frozen(klass, values, set(model.__fields_set__))
+
+
+def evolve_model(
+    model: "FHIRAbstractModel", changes: typing.Dict[str, typing.Any]
+) -> "FHIRAbstractModel":
+    """New frozen model with ``changes`` (by field name or alias), only
+    changed elements are validated (same as assignment validation),
+    unchanged elements are shared with ``model``."""
+    model = freeze_model(model)
+    klass = model.__class__
+    aliases = klass.get_alias_mapping()
+    values = model.__dict__.copy()
+    fields_set = set(model.__fields_set__)
+    fields = list()
+    for key, value in changes.items():
+        name = key if key in klass.__fields__ else aliases.get(key, None)
+        if name is None:
+            raise ValueError(f'"{klass.__name__}" object has no field "{key}"')
+        fields.append(klass.__fields__[name])
+        values[name] = value
+
+    for validator in klass.__pre_root_validators__:
+        try:
+            values = validator(klass, values)
+        except (ValueError, TypeError, AssertionError) as exc:
+            raise ValidationError([ErrorWrapper(exc, loc=ROOT_KEY)], klass)
+    for field in fields:
+        others = {key: value for key, value in values.items() if key != field.name}
+        value, error = field.validate(
+            values[field.name], others, loc=field.name, cls=klass
+        )
+        if error:
+            raise ValidationError([error], klass)
+        values[field.name] = value
+        fields_set.add(field.name)
+
+    errors = list()
+    for skip_on_failure, validator in klass.__post_root_validators__:
+        if skip_on_failure and errors:
+            continue
+        try:
+            values = validator(klass, values)
+        except (ValueError, TypeError, AssertionError) as exc:
+            errors.append(ErrorWrapper(exc, loc=ROOT_KEY))
+    if errors:
+        raise ValidationError(errors, klass)
+
+    # root validators might replace values of other fields too
+    source = model.__dict__
+    for name, is_model in get_copy_plan(klass):
+        value = values[name]
+        if value is not None and value is not source[name]:
+            values[name] = _freeze_value(value, is_model)
+    return _new_frozen(klass, values, fields_set)
+
+
+__all__ = ["FrozenList", "evolve_model", "freeze_model", "is_frozen"]
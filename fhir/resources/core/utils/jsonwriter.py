@@ -0,0 +1,235 @@
+# _*_ coding: utf-8 _*_
+"""Direct (model graph to UTF-8 bytes) JSON writer, without building
+the intermediate ``OrderedDict`` tree via ``FHIRAbstractModel.dict``.
+Output is identical to ``orjson.dumps(model.dict(...))``."""
+import typing
+
+import orjson
+
+if typing.TYPE_CHECKING:
+    from fhir.resources.core.fhirabstractmodel import FHIRAbstractModel
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+FHIR_COMMENTS_KEY = b'"fhir_comments":'
+# (field key, encoded key, primitive flag, ext key, encoded ext key)
+EncodedPlanEntry = typing.Tuple[
+    str, bytes, bool, typing.Optional[str], typing.Optional[bytes]
+]
+EncodedPlan = typing.Tuple[EncodedPlanEntry, ...]
+
+_ENCODED_PLANS: typing.Dict[
+    typing.Tuple[type, bool], typing.Optional[EncodedPlan]
+] = dict()
+
+
+def _encode_key(key: str) -> bytes:
+    """ """
+    return orjson.dumps(key) + b":"
+
+
+def get_encoded_plan(klass: type, by_alias: bool) -> typing.Optional[EncodedPlan]:
+    """Serialization plan of the model class with already encoded keys.
+    ``None`` is returned if the class is not FHIR model class."""
+    try:
+        return _ENCODED_PLANS[(klass, by_alias)]
+    except KeyError:
+        pass
+    get_plan = getattr(klass, "get_serialization_plan", None)
+    plan: typing.Optional[EncodedPlan] = None
+    if get_plan is not None and not getattr(klass, "__custom_root_type__", False):
+        plan = tuple(
+            (
+                field_key,
+                _encode_key(by_alias and alias or field_key),
+                is_primitive,
+                ext_key,
+                ext_key and _encode_key(by_alias and ext_alias or ext_key) or None,
+            )
+            for field_key, alias, is_primitive, ext_key, ext_alias in get_plan()
+        )
+    _ENCODED_PLANS[(klass, by_alias)] = plan
+    return plan
+
+
+class FHIRJSONWriter:
+    """Walks the model graph, according to the compiled serialization plan
+    and writes JSON straight into the buffer. Empty element (or list)
+    is discarded by truncating the buffer back, so there is no need to
+    know the result in advance."""
+
+    __slots__ = ("by_alias", "exclude_none", "exclude_comments", "default")
+
+    def __init__(
+        self,
+        *,
+        by_alias: bool = True,
+        exclude_none: bool = True,
+        exclude_comments: bool = False,
+        default: typing.Callable[[typing.Any], typing.Any] = None,
+    ):
+        """ """
+        self.by_alias = by_alias
+        self.exclude_none = exclude_none
+        self.exclude_comments = exclude_comments
+        self.default = default
+
+    def dumps(self, model: "FHIRAbstractModel") -> bytes:
+        """ """
+        buf = bytearray()
+        self.write(buf, model)
+        return bytes(buf)
+
+    def write(self, buf: bytearray, model: "FHIRAbstractModel") -> None:
+        """Writes the model as JSON object into the buffer."""
+        plan = get_encoded_plan(model.__class__, self.by_alias)
+        if plan is None:
+            buf += self._dumps(self._get_value(model))
+            return
+        self._write_model(buf, model, plan)
+
+    def _dumps(self, value: typing.Any) -> bytes:
+        """ """
+        return orjson.dumps(value, default=self.default)
+
+    def _get_value(self, value: typing.Any) -> typing.Any:
+        """Fallback, for anything other than FHIR model or list."""
+        from fhir.resources.core.fhirabstractmodel import FHIRAbstractModel
+
+        return FHIRAbstractModel._fhir_get_value(
+            value,
+            by_alias=self.by_alias,
+            exclude_none=self.exclude_none,
+            exclude_comments=self.exclude_comments,
+        )
+
+    def _write_model(
+        self, buf: bytearray, model: "FHIRAbstractModel", plan: EncodedPlan
+    ) -> int:
+        """Returns number of members have been written."""
+        exclude_none = self.exclude_none
+        fields_values = model.__dict__
+        count = 0
+        buf += b"{"
+        if model.__class__.has_resource_base():
+            buf += b'"resourceType":' + self._dumps(model.resource_type)
+            count += 1
+
+        for field_key, key, is_primitive, ext_key, ext_key_ in plan:
+            value = fields_values.get(field_key, None)
+            if value is None:
+                if exclude_none is False:
+                    if count > 0:
+                        buf += b","
+                    buf += key + b"null"
+                    count += 1
+            else:
+                mark = len(buf)
+                if count > 0:
+                    buf += b","
+                buf += key
+                if is_primitive and (
+                    not isinstance(value, list)
+                    or len(value) > 0
+                    or exclude_none is False
+                ):
+                    # primitive value(s) are written as it is.
+                    buf += self._dumps(value)
+                    count += 1
+                elif self._write_value(buf, value, exclude_none):
+                    count += 1
+                else:
+                    del buf[mark:]
+
+            if ext_key is None:
+                continue
+            # primitive extension
+            ext_value = fields_values.get(ext_key, None)
+            if ext_value is None:
+                continue
+            mark = len(buf)
+            if count > 0:
+                buf += b","
+            buf += ext_key_
+            # empty primitive extension is always discarded.
+            if self._write_value(buf, ext_value, True):
+                count += 1
+            else:
+                del buf[mark:]
+
+        # looking for comments
+        comments = fields_values.get("fhir_comments", None)
+        if comments is not None and not self.exclude_comments:
+            if count > 0:
+                buf += b","
+            buf += FHIR_COMMENTS_KEY + self._dumps(comments)
+            count += 1
+        buf += b"}"
+        return count
+
+    def _write_value(
+        self, buf: bytearray, value: typing.Any, discard_empty: bool
+    ) -> bool:
+        """Returns ``False`` if value is not written (empty)."""
+        if isinstance(value, list):
+            if len(value) == 0:
+                if discard_empty:
+                    return False
+                buf += b"[]"
+                return True
+            buf += b"["
+            for idx, item in enumerate(value):
+                if idx > 0:
+                    buf += b","
+                if item is None:
+                    buf += b"null"
+                    continue
+                plan = get_encoded_plan(item.__class__, self.by_alias)
+                if plan is None:
+                    buf += self._dumps(self._get_value(item))
+                    continue
+                mark = len(buf)
+                if (
+                    self._write_model(buf, item, plan) == 0
+                    and self.exclude_none is True
+                ):
+                    # empty element becomes null
+                    del buf[mark:]
+                    buf += b"null"
+            buf += b"]"
+            return True
+
+        plan = get_encoded_plan(value.__class__, self.by_alias)
+        if plan is None:
+            value = self._get_value(value)
+            if value is None:
+                return False
+            if discard_empty and isinstance(value, (dict, list)) and len(value) == 0:
+                return False
+            buf += self._dumps(value)
+            return True
+
+        if self._write_model(buf, value, plan) == 0 and discard_empty:
+            return False
+        return True
+
+
+def json_dumps_model(
+    model: "FHIRAbstractModel",
+    *,
+    by_alias: bool = True,
+    exclude_none: bool = True,
+    exclude_comments: bool = False,
+    default: typing.Callable[[typing.Any], typing.Any] = None,
+) -> bytes:
+    """Serialize FHIR model directly to JSON (UTF-8 bytes)."""
+    writer = FHIRJSONWriter(
+        by_alias=by_alias,
+        exclude_none=exclude_none,
+        exclude_comments=exclude_comments,
+        default=default or model.__json_encoder__,
+    )
+    return writer.dumps(model)
+
+
+__all__ = ["FHIRJSONWriter", "json_dumps_model"]
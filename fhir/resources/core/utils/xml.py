@@ -4,6 +4,7 @@ import logging
 import typing
 from collections import OrderedDict, deque
 from copy import copy
+from functools import lru_cache
 from pathlib import Path
 
 from lxml import etree  # type: ignore
@@ -1012,6 +1013,608 @@ class Node:
         return self.to_string(pretty_print=False)
 
 
+PLAN_PRIMITIVE = 1
+PLAN_XHTML = 2
+PLAN_MODEL = 3
+PLAN_RESOURCE = 4
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class ChildPlan(typing.NamedTuple):
+    """How a child element (by name) is stored into parent model kwargs."""
+
+    field_name: str
+    is_list: bool
+    kind: int
+    klass: typing.Optional[typing.Type["FHIRAbstractModel"]]
+
+
+@lru_cache(maxsize=None)
+def get_child_plan(klass: typing.Type["FHIRAbstractModel"], name: str) -> ChildPlan:
+    """ """
+    field_name = klass.get_alias_mapping()[name]
+    field = klass.__fields__[field_name]
+    if field.shape == SHAPE_LIST:
+        is_list = True
+    elif field.shape == SHAPE_SINGLETON:
+        is_list = False
+    else:
+        raise NotImplementedError
+
+    if is_primitive_type(field):
+        if get_fhir_type_name(field.type_) == "xhtml":
+            return ChildPlan(field_name, is_list, PLAN_XHTML, None)
+        return ChildPlan(field_name, is_list, PLAN_PRIMITIVE, None)
+
+    klass_ = get_fhir_model_class(field, False)
+    if klass_.get_resource_type() == "Resource":
+        return ChildPlan(field_name, is_list, PLAN_RESOURCE, klass_)
+    return ChildPlan(field_name, is_list, PLAN_MODEL, klass_)
+
+
+@lru_cache(maxsize=None)
+def get_fhir_release(klass: typing.Type["FHIRAbstractModel"]) -> str:
+    """ """
+    # tiny hack to get FHIR release
+    return klass.__fields__["id"].type_.__fhir_release__
+
+
+@lru_cache(maxsize=None)
+def get_extension_class(fhir_release: str) -> typing.Type["FHIRAbstractModel"]:
+    """Class of extension inside primitive element."""
+    primitive_ext_klass = get_fhir_root_module(fhir_release).get_fhir_model_class(
+        "FHIRPrimitiveExtension"
+    )
+    return get_fhir_model_class(primitive_ext_klass.__fields__["extension"], False)
+
+
+def local_name(tag: str) -> str:
+    """Tag name without namespace"""
+    if tag[0] == "{":
+        return tag[tag.index("}") + 1 :]
+    return tag
+
+
+def join_comments(comments: typing.List[str]) -> typing.Union[str, typing.List[str]]:
+    """ """
+    if len(comments) == 1:
+        return comments[0]
+    return comments
+
+
+class ModelFrame:
+    """Open (complex type) element, kwargs of model are collected."""
+
+    __slots__ = ("klass", "plan", "comments", "pending", "params", "ext_values")
+
+    def __init__(
+        self,
+        klass: typing.Type["FHIRAbstractModel"],
+        plan: typing.Optional[ChildPlan],
+        comments: typing.Optional[typing.List[str]],
+    ):
+        """ """
+        self.klass = klass
+        self.plan = plan
+        self.comments = comments
+        # comments for next child element
+        self.pending: typing.Optional[typing.List[str]] = None
+        self.params: typing.Dict[str, typing.Any] = {}
+        # primitive extensions of list type fields, by list index
+        self.ext_values: typing.Dict[str, typing.Dict[int, typing.Any]] = {}
+
+    def add(self, plan: ChildPlan, value: typing.Any, ext: typing.Any = None):
+        """Same as ``Node.to_fhir`` does for each child"""
+        field_name = plan.field_name
+        params = self.params
+        if not plan.is_list:
+            params[field_name] = value
+            if ext is not None:
+                params[f"{field_name}__ext"] = ext
+            return
+
+        values = params.setdefault(field_name, [])
+        values.append(value)
+        if ext is not None:
+            self.ext_values.setdefault(field_name, {})[len(values) - 1] = ext
+        elif value is None and len(values) == 1 and field_name not in self.ext_values:
+            # list of only empty values is dropped
+            del params[field_name]
+
+    def finish(self) -> typing.Dict[str, typing.Any]:
+        """ """
+        params = self.params
+        if self.comments:
+            params["fhir_comments"] = join_comments(self.comments)
+
+        # treatment for list type primitive ext
+        for field_name, exts in self.ext_values.items():
+            params[f"{field_name}__ext"] = [
+                exts.get(idx, None) for idx in range(len(params[field_name]))
+            ]
+        return params
+
+
+class ResourceFrame(ModelFrame):
+    """Element of ``Resource`` type field, the first child element
+    is the contained resource."""
+
+    __slots__ = ("resource",)
+
+    def __init__(self, klass, plan, comments):
+        """ """
+        super().__init__(klass, plan, comments)
+        self.resource: typing.Optional[typing.Dict[str, typing.Any]] = None
+
+    def finish(self) -> typing.Dict[str, typing.Any]:
+        """ """
+        if self.resource is not None:
+            return self.resource
+        return super().finish()
+
+
+class PrimitiveFrame:
+    """Open primitive element, children are extensions."""
+
+    __slots__ = ("plan", "value", "comments", "pending", "extensions", "children")
+
+    def __init__(
+        self,
+        plan: ChildPlan,
+        value: StrNone,
+        comments: typing.Optional[typing.List[str]],
+    ):
+        """ """
+        self.plan = plan
+        self.value = value
+        self.comments = comments
+        self.pending: typing.Optional[typing.List[str]] = None
+        self.extensions: typing.List[typing.Dict[str, typing.Any]] = []
+        self.children = 0
+
+    def primitive_extension(self) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        """ """
+        if self.children == 0 and not self.comments:
+            return None
+        params: typing.Dict[str, typing.Any] = {}
+        if self.comments:
+            params["fhir_comments"] = join_comments(self.comments)
+        if self.children > 0:
+            params["extension"] = self.extensions
+        return params
+
+
+class XMLStreamParser:
+    """Single pass XML to model kwargs, from (``start``, ``end``, ``comment``)
+    events of lxml pull parser, without intermediate ``Node`` tree.
+    Same semantic as ``Node.from_element(...).to_fhir(klass)``, but nested
+    values are plain dict, so the model is validated once (at the top).
+    Finished elements are removed from the tree, so memory use (other than
+    the collected kwargs) doesn't depend on the document size."""
+
+    def __init__(self, klass: typing.Type["FHIRAbstractModel"]):
+        """ """
+        self.klass = klass
+        self.parser = etree.XMLPullParser(events=("start", "end", "comment"))
+        self.stack: typing.List[typing.Union[ModelFrame, PrimitiveFrame]] = []
+        self.result: typing.Optional[typing.Dict[str, typing.Any]] = None
+        # depth inside skipped subtree (xhtml or ignored)
+        self._skip = 0
+        self._skipped: typing.Optional[typing.Tuple[typing.Any, ...]] = None
+        # xhtml element waits for its tail text until next event
+        self._xhtml: typing.Optional[typing.Tuple[typing.Any, ...]] = None
+
+    def feed(self, data: StrBytes) -> None:
+        """ """
+        self.parser.feed(data)
+        self.process_events()
+
+    def close(self) -> typing.Dict[str, typing.Any]:
+        """Model kwargs of root element."""
+        self.parser.close()
+        self.process_events()
+        if self.result is None:
+            raise ValueError("XML document is incomplete.")
+        return self.result
+
+    def process_events(self) -> None:
+        """ """
+        for event, element in self.parser.read_events():
+            if self._xhtml is not None:
+                self.finish_xhtml()
+            if self._skip > 0:
+                if event == "start":
+                    self._skip += 1
+                elif event == "end":
+                    self._skip -= 1
+                    if self._skip == 0:
+                        self.end_skipped(element)
+                continue
+            if event == "start":
+                self.start(element)
+            elif event == "end":
+                self.end(element)
+            elif self.stack:
+                # comment
+                frame = self.stack[-1]
+                if frame.pending is None:
+                    frame.pending = []
+                frame.pending.append(element.text or "")
+
+    def skip(self, element: etree._Element, parent=None, plan=None, as_xhtml=True):
+        """Subtree is not parsed, with plan it becomes xhtml value."""
+        self._skip = 1
+        self._skipped = (parent, plan, element, as_xhtml)
+
+    def start(self, element: etree._Element) -> None:
+        """ """
+        name = local_name(element.tag)
+        if not self.stack:
+            self.stack.append(self.new_frame(self.klass, None, None, element))
+            return
+
+        parent = self.stack[-1]
+        comments, parent.pending = parent.pending, None
+
+        if isinstance(parent, PrimitiveFrame):
+            parent.children += 1
+            if element.nsmap.get(None) == XHTML_NS:
+                self.skip(element)
+                return
+            klass = get_extension_class(get_fhir_release(self.klass))
+            self.stack.append(self.new_frame(klass, None, comments, element))
+            return
+
+        if isinstance(parent, ResourceFrame):
+            if parent.resource is not None or element.nsmap.get(None) == XHTML_NS:
+                self.skip(element)
+                return
+            klass = get_fhir_root_module(
+                get_fhir_release(parent.klass)
+            ).get_fhir_model_class(name)
+            self.stack.append(self.new_frame(klass, None, comments, element))
+            return
+
+        if element.nsmap.get(None) == XHTML_NS:
+            # comments are for next child
+            parent.pending = comments
+            self.skip(element, parent, get_child_plan(parent.klass, name))
+            return
+
+        plan = get_child_plan(parent.klass, name)
+        if plan.kind == PLAN_PRIMITIVE:
+            self.stack.append(PrimitiveFrame(plan, element.get("value"), comments))
+        elif plan.kind == PLAN_XHTML:
+            parent.pending = comments
+            self.skip(element, parent, plan, as_xhtml=False)
+        elif plan.kind == PLAN_RESOURCE:
+            self.stack.append(ResourceFrame(plan.klass, plan, comments))
+        else:
+            self.stack.append(self.new_frame(plan.klass, plan, comments, element))
+
+    @staticmethod
+    def new_frame(klass, plan, comments, element: etree._Element) -> ModelFrame:
+        """ """
+        frame = ModelFrame(klass, plan, comments)
+        if klass.get_resource_type() == "Extension":
+            for name, val in element.attrib.items():
+                if name != "value":
+                    frame.params[name] = val
+        return frame
+
+    def end(self, element: etree._Element) -> None:
+        """ """
+        frame = self.stack.pop()
+        if isinstance(frame, PrimitiveFrame):
+            self.stack[-1].add(frame.plan, frame.value, frame.primitive_extension())
+        else:
+            value = frame.finish()
+            if not self.stack:
+                self.result = value
+            else:
+                parent = self.stack[-1]
+                if isinstance(parent, PrimitiveFrame):
+                    parent.extensions.append(value)
+                elif frame.plan is None:
+                    # resource inside ``Resource`` type element
+                    value["resourceType"] = frame.klass.get_resource_type()
+                    parent.resource = value
+                else:
+                    self.add_value(parent, frame.plan, value)
+        self.release(element)
+
+    def add_value(
+        self, parent: ModelFrame, plan: ChildPlan, value: typing.Dict[str, typing.Any]
+    ) -> None:
+        """Complex type value of parent's field, subclass may consume
+        it instead (i.e. ``Bundle.entry`` one by one)."""
+        parent.add(plan, value)
+
+    def end_skipped(self, element: etree._Element) -> None:
+        """ """
+        parent, plan, _, as_xhtml = self._skipped
+        self._skipped = None
+        if plan is None:
+            self.release(element)
+        elif as_xhtml:
+            # tail text is known at next event
+            self._xhtml = (parent, plan, element)
+        else:
+            # namespaces declared by ancestors are not repeated
+            exists_ns = [
+                Namespace(prefix, location)
+                for prefix, location in element.getparent().nsmap.items()
+            ]
+            value = Node.from_element(element, exists_ns=exists_ns).to_string(
+                pretty_print=False, xml_declaration=False
+            )
+            ext = None
+            comments = parent.pending
+            if comments:
+                parent.pending = None
+                ext = {"fhir_comments": join_comments(comments)}
+            parent.add(plan, value, ext)
+            self.release(element)
+
+    def finish_xhtml(self) -> None:
+        """ """
+        parent, plan, element = self._xhtml
+        self._xhtml = None
+        parent.add(plan, etree.tostring(element))
+        self.release(element)
+
+    @staticmethod
+    def release(element: etree._Element) -> None:
+        """Finished element and its previous siblings are not needed anymore."""
+        element.clear()
+        parent = element.getparent()
+        if parent is not None:
+            while element.getprevious() is not None:
+                del parent[0]
+
+
+def xml_iterparse(
+    cls: typing.Type["FHIRAbstractModel"],
+    source: typing.Union[StrBytes, Path, typing.BinaryIO],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> typing.Dict[str, typing.Any]:
+    """Model kwargs (not validated yet) from XML document,
+    file (path or file object) is read in chunks."""
+    parser = XMLStreamParser(cls)
+    if isinstance(source, (str, bytes)):
+        parser.feed(source)
+    elif isinstance(source, Path):
+        with source.open("rb") as fp:
+            for chunk in iter(lambda: fp.read(chunk_size), b""):
+                parser.feed(chunk)
+    else:
+        for chunk in iter(lambda: source.read(chunk_size), b""):
+            parser.feed(chunk)
+    return parser.close()
+
+
+class ElementPlan(typing.NamedTuple):
+    """How a field value is written as XML element(s)."""
+
+    name: str
+    alias: str
+    ext_key: typing.Optional[str]
+    kind: int
+    extension: bool
+    to_string: typing.Optional[typing.Callable[[typing.Any], str]]
+
+
+def bool_to_string(value: bool) -> str:
+    """ """
+    return value is True and "true" or "false"
+
+
+@lru_cache(maxsize=None)
+def get_element_plans(
+    klass: typing.Type["FHIRAbstractModel"],
+) -> typing.Tuple[ElementPlan, ...]:
+    """Fields in ``elements_sequence`` order, computed once per class."""
+    plans = list()
+    alias_maps = klass.get_alias_mapping()
+    for prop_name in klass.elements_sequence():
+        field = klass.__fields__[alias_maps[prop_name]]
+        ext_key, to_string = None, None
+        if is_primitive_type(field):
+            ext_key = f"{field.name}__ext"
+            if field.type_ is bool:
+                to_string = bool_to_string
+            else:
+                to_string = getattr(field.type_, "to_string", None)
+                if to_string is None:
+                    to_string = normalize_fhir_type_class(field.type_).to_string
+            if get_fhir_type_name(field.type_) == "xhtml":
+                kind = PLAN_XHTML
+            else:
+                kind = PLAN_PRIMITIVE
+        elif get_fhir_type_name(field.type_) == "Resource":
+            kind = PLAN_RESOURCE
+        else:
+            kind = PLAN_MODEL
+        plans.append(
+            ElementPlan(
+                field.name,
+                field.alias,
+                ext_key,
+                kind,
+                get_fhir_type_name(field.type_) == "Extension",
+                to_string,
+            )
+        )
+    return tuple(plans)
+
+
+class ElementBuilder:
+    """Model to ``etree`` elements in one pass, same output
+    as ``Node.from_fhir_obj(model).to_xml()`` without ``Node`` layer."""
+
+    __slots__ = ("with_comments",)
+
+    def __init__(self, with_comments: bool = True):
+        """ """
+        self.with_comments = with_comments
+
+    def add_comments(
+        self,
+        parent: etree._Element,
+        comments: typing.Union[str, typing.List[str], None],
+    ) -> None:
+        """ """
+        if not comments or not self.with_comments:
+            return
+        if isinstance(comments, str):
+            comments = [comments]
+        for cm in comments:
+            parent.append(etree.Comment(cm))
+
+    def add_primitive(
+        self,
+        parent: etree._Element,
+        plan: ElementPlan,
+        value: typing.Any,
+        ext: typing.Any,
+    ) -> None:
+        """ """
+        if isinstance(value, list):
+            if ext and not isinstance(ext, list):
+                ext = [ext]
+            if ext is None:
+                ext = []
+            if len(value) < len(ext):
+                LOG.warning(f"Some {(len(ext) - len(value))} extension(s) are ignored.")
+            for idx, val in enumerate(value):
+                ext_ = idx < len(ext) and ext[idx] or None
+                if ext_ is None and val is None:
+                    continue
+                self.add_primitive(parent, plan, val, ext_)
+            return
+
+        if value is not None:
+            if ext is not None:
+                self.add_comments(parent, ext.__dict__.get("fhir_comments", None))
+            text = plan.to_string(value)
+            if text:
+                element = etree.SubElement(parent, plan.alias, value=text)
+            else:
+                element = etree.SubElement(parent, plan.alias)
+            if ext is not None:
+                self.add_primitive_extension(element, ext)
+            return
+
+        # comments of all extensions go before element
+        element = parent.makeelement(plan.alias)
+        if ext is not None:
+            for ext_ in not isinstance(ext, list) and [ext] or ext:
+                if ext_ is None:
+                    continue
+                self.add_comments(parent, ext_.__dict__.get("fhir_comments", None))
+                self.add_primitive_extension(element, ext_)
+        parent.append(element)
+
+    def add_primitive_extension(self, element: etree._Element, ext: typing.Any):
+        """ """
+        extensions = ext.__dict__.get("extension", None)
+        if not extensions:
+            return
+        for extension in extensions:
+            self.add_model(element, "extension", extension, extension=True)
+
+    def add_model(
+        self,
+        parent: etree._Element,
+        alias: str,
+        value: "FHIRAbstractModel",
+        extension: bool = False,
+        resource: bool = False,
+    ) -> None:
+        """ """
+        self.add_comments(parent, value.__dict__.get("fhir_comments", None))
+        element = etree.SubElement(parent, alias)
+        if resource:
+            element = etree.SubElement(element, value.resource_type)
+        for plan in get_element_plans(value.__class__):
+            self.add_field(element, plan, value.__dict__, extension, True)
+
+    def add_field(
+        self,
+        element: etree._Element,
+        plan: ElementPlan,
+        data: typing.Dict[str, typing.Any],
+        extension: bool,
+        nested: bool,
+    ) -> None:
+        """ """
+        value = data.get(plan.name, None)
+        if nested and value:
+            if extension and plan.alias in ("url", "id"):
+                element.set(plan.alias, value)
+                return
+            if plan.kind == PLAN_XHTML:
+                # xxx: fhir-xhtml.xsd validation
+                xhtml_element = etree.fromstring(value)
+                if xhtml_element.nsmap[None] != XHTML_NS:
+                    raise ValueError
+                element.append(xhtml_element)
+                return
+
+        if plan.ext_key is not None:
+            ext = data.get(plan.ext_key, None)
+            if ext is None and value is None:
+                return
+            self.add_primitive(element, plan, value, ext)
+        elif value is None:
+            return
+        elif isinstance(value, list):
+            for value_ in value:
+                self.add_model(
+                    element,
+                    plan.alias,
+                    value_,
+                    plan.extension,
+                    plan.kind == PLAN_RESOURCE,
+                )
+        else:
+            self.add_model(
+                element, plan.alias, value, plan.extension, plan.kind == PLAN_RESOURCE
+            )
+
+    def build(self, model: "FHIRAbstractModel") -> etree._Element:
+        """Root element of resource."""
+        root = etree.Element(model.resource_type, nsmap={None: ROOT_NS})
+        for plan in get_element_plans(model.__class__):
+            self.add_field(root, plan, model.__dict__, False, False)
+        return root
+
+    def iter_children(
+        self, model: "FHIRAbstractModel"
+    ) -> typing.Iterator[etree._Element]:
+        """Children (and comments) of root element, one by one."""
+        holder = etree.Element(model.resource_type)
+        data = model.__dict__
+        for plan in get_element_plans(model.__class__):
+            value = data.get(plan.name, None)
+            if plan.ext_key is None and isinstance(value, list):
+                # i.e. Bundle.entry
+                for value_ in value:
+                    self.add_model(
+                        holder,
+                        plan.alias,
+                        value_,
+                        plan.extension,
+                        plan.kind == PLAN_RESOURCE,
+                    )
+                    yield from holder
+                    holder.clear()
+            else:
+                self.add_field(holder, plan, data, False, False)
+                yield from holder
+                holder.clear()
+
+
 def xml_dumps(
     model: "FHIRAbstractModel",
     *,
@@ -1021,22 +1624,53 @@ def xml_dumps(
     strip_text=False,
 ):
     """ """
-    node = Node.from_fhir_obj(model)
-    return node.to_string(
-        pretty_print=pretty_print,
-        xml_declaration=xml_declaration,
-        with_comments=with_comments,
-        strip_text=strip_text,
-    )
+    element = ElementBuilder(with_comments=with_comments).build(model)
+    params = {"encoding": "utf-8", "method": "xml", "pretty_print": pretty_print}
+    if xml_declaration:
+        params["xml_declaration"] = '<?xml version="1.0" encoding="UTF-8"?>'
+    params["strip_text"] = strip_text
+
+    return etree.tostring(element, **params)
+
+
+def xml_dump(
+    model: "FHIRAbstractModel",
+    stream: typing.Union[str, Path, typing.BinaryIO],
+    *,
+    xml_declaration=True,
+    with_comments=True,
+) -> None:
+    """Writes the same document as ``xml_dumps`` into binary file object
+    (or path) incrementally, only one child element of root is built at once,
+    (i.e. single ``Bundle.entry``)."""
+    if isinstance(stream, Path):
+        stream = str(stream)
+    builder = ElementBuilder(with_comments=with_comments)
+    with etree.xmlfile(stream, encoding="utf-8") as xf:
+        if xml_declaration:
+            xf.write_declaration()
+        children = builder.iter_children(model)
+        first = next(children, None)
+        if first is None:
+            # self-closing, same as ``xml_dumps``
+            xf.write(etree.Element(model.resource_type, nsmap={None: ROOT_NS}))
+            return
+        with xf.element(model.resource_type, nsmap={None: ROOT_NS}):
+            xf.write(first)
+            for element in children:
+                xf.write(element)
 
 
 def xml_loads(
     cls: typing.Type["FHIRAbstractModel"], b: bytes, xmlparser: etree.XMLParser = None
 ) -> "FHIRAbstractModel":
     """ """
+    if xmlparser is None:
+        return cls(**xml_iterparse(cls, b))
+    # i.e. schema validation
     root = etree.fromstring(b, parser=xmlparser)
     node = Node.from_element(root)
     return node.to_fhir(cls)
 
 
-__all__ = ["xml_dumps", "xml_loads"]
+__all__ = ["xml_dumps", "xml_dump", "xml_loads", "xml_iterparse"]
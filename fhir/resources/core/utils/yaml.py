@@ -7,6 +7,8 @@ from yaml import YAMLError, dump, load
 from yaml.representer import Representer as BaseRepresenter
 from yaml.representer import SafeRepresenter
 
+from .base64binary import Base64Bytes
+
 try:
     from yaml import CLoader as Loader, CDumper as Dumper
 except ImportError:
@@ -37,6 +39,7 @@ BaseRepresenter.add_representer(Decimal, Representer.represent_decimal)
 # (tag:yaml.org,2002:python/object/apply:collections.OrderedDict)
 BaseRepresenter.add_representer(OrderedDict, SafeRepresenter.represent_dict)
 BaseRepresenter.add_representer(datetime.datetime, Representer.represent_datetime)
+BaseRepresenter.add_representer(Base64Bytes, SafeRepresenter.represent_binary)
 
 
 def yaml_loads(stream, loader=None):
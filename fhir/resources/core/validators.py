@@ -0,0 +1,270 @@
+# _*_ coding: utf-8 _*_
+"""Shared implementation of the root validators, those are bound
+by generated model classes (all FHIR releases)."""
+import re
+import typing
+from contextlib import contextmanager
+from functools import lru_cache
+
+from pydantic.error_wrappers import ErrorWrapper, ValidationError
+from pydantic.errors import MissingError, NoneIsNotAllowedError
+
+from .utils.common import normalize_fhir_type_class
+
+if typing.TYPE_CHECKING:
+    from pydantic import BaseModel
+    from pydantic.fields import ModelField
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+# (prefix, fields set, fields in declaration order, required flag)
+ChoiceGroup = typing.Tuple[str, typing.FrozenSet[str], typing.List[str], bool]
+# (alias, primitive extension alias)
+RequiredFields = typing.Sequence[typing.Tuple[str, str]]
+# field name -> allowed target resource types
+ReferenceTargets = typing.Dict[str, typing.FrozenSet[str]]
+_missing = object()
+# opt-in, see ``reference_targets_validation``
+_REFERENCE_TARGETS_VALIDATION = [False]
+# resource type of relative (``Patient/123``) or RESTful absolute reference
+REFERENCE_TYPE_PREFIX = re.compile(
+    r"(?:^|/)([A-Z][A-Za-z]+)/[A-Za-z0-9\-.]{1,64}(?:/_history/[A-Za-z0-9\-.]{1,64})?$"
+)
+STRUCTURE_DEFINITION_URL = "http://hl7.org/fhir/StructureDefinition/"
+
+
+@lru_cache(maxsize=None, typed=True)
+def get_choice_groups(
+    klass: typing.Type["BaseModel"],
+) -> typing.Tuple[typing.Tuple[ChoiceGroup, ...], typing.FrozenSet[str], bool]:
+    """Choice type (``nnn[x]``) groups of the model class, computed once from
+    ``one_of_many`` & ``one_of_many_required`` field's metadata.
+    Returns (groups, all choice fields, any group is required)."""
+    groups: typing.Dict[str, typing.List[str]] = dict()
+    required: typing.Dict[str, bool] = dict()
+    for name, field in klass.__fields__.items():
+        prefix = field.field_info.extra.get("one_of_many", None)
+        if prefix is None:
+            continue
+        if prefix not in groups:
+            groups[prefix] = list()
+            required[prefix] = (
+                field.field_info.extra.get("one_of_many_required", False) is True
+            )
+        groups[prefix].append(name)
+
+    choice_groups = tuple(
+        (prefix, frozenset(fields), fields, required[prefix])
+        for prefix, fields in groups.items()
+    )
+    all_fields = frozenset(name for fields in groups.values() for name in fields)
+    return choice_groups, all_fields, any(required.values())
+
+
+def validate_choice_fields(
+    cls: typing.Type["BaseModel"], values: typing.Dict[str, typing.Any]
+) -> typing.Dict[str, typing.Any]:
+    """https://www.hl7.org/fhir/formats.html#choice
+    Only one field (not None) from each choice group is allowed,
+    a group might be required."""
+    groups, all_fields, any_required = get_choice_groups(cls)
+    present = all_fields.intersection(values.keys())
+    if not present and not any_required:
+        return values
+
+    for _, fields_set, fields, required in groups:
+        found = False
+        if present:
+            for name in fields_set.intersection(present):
+                if values[name] is None:
+                    continue
+                if found is True:
+                    raise ValueError(
+                        "Any of one field value is expected from "
+                        f"this list {fields}, but got multiple!"
+                    )
+                found = True
+        if required is True and found is False:
+            raise ValueError(f"Expect any of field value from this list {fields}.")
+    return values
+
+
+@lru_cache(maxsize=None, typed=True)
+def get_fields_by_alias(
+    klass: typing.Type["BaseModel"],
+) -> typing.Dict[str, "ModelField"]:
+    """ """
+    return {field.alias: field for field in klass.__fields__.values()}
+
+
+def _fallback():
+    return ""
+
+
+def validate_required_primitive_elements(
+    cls: typing.Type["BaseModel"],
+    values: typing.Dict[str, typing.Any],
+    required_fields: RequiredFields,
+) -> typing.Dict[str, typing.Any]:
+    """https://www.hl7.org/fhir/extensibility.html#Special-Case
+    Required primitive element must have value, or primitive extension
+    (which explains why the value is not present).
+
+    :param required_fields: sequence of (alias, primitive extension alias).
+    """
+    for alias, _ in required_fields:
+        if values.get(alias, None) is None:
+            break
+    else:
+        # all required elements have value
+        return values
+
+    fields = get_fields_by_alias(cls)
+    errors: typing.List["ErrorWrapper"] = []
+    for alias, ext_alias in required_fields:
+        value = values.get(alias, _missing)
+        if value is not _missing and value is not None:
+            continue
+        ext_value = values.get(ext_alias, _missing)
+        missing_ext = True
+        if ext_value is not _missing and ext_value is not None:
+            if isinstance(ext_value, dict):
+                missing_ext = len(ext_value.get("extension", [])) == 0
+            elif (
+                getattr(ext_value.__class__, "get_resource_type", _fallback)()
+                == "FHIRPrimitiveExtension"
+            ):
+                if ext_value.extension and len(ext_value.extension) > 0:
+                    missing_ext = False
+            else:
+                validate_pass = True
+                for validator in fields[ext_alias].type_.__get_validators__():
+                    try:
+                        ext_value = validator(v=ext_value)
+                    except ValidationError as exc:
+                        errors.append(ErrorWrapper(exc, loc=ext_alias))
+                        validate_pass = False
+                if not validate_pass:
+                    continue
+                # validated value is kept, so field validation doesn't
+                # need to parse it again.
+                values = dict(values)
+                values[ext_alias] = ext_value
+                if ext_value.extension and len(ext_value.extension) > 0:
+                    missing_ext = False
+        if missing_ext:
+            if value is _missing:
+                errors.append(ErrorWrapper(MissingError(), loc=alias))
+            else:
+                errors.append(ErrorWrapper(NoneIsNotAllowedError(), loc=alias))
+    if len(errors) > 0:
+        raise ValidationError(errors, cls)  # type: ignore
+
+    return values
+
+
+@lru_cache(maxsize=None, typed=True)
+def get_reference_targets(klass: typing.Type["BaseModel"]) -> ReferenceTargets:
+    """Allowed target resource types of ``Reference`` fields, computed once
+    from ``enum_reference_types`` field's metadata. ``Resource`` means any
+    resource type. ``canonical`` fields (those have the same metadata)
+    are not included."""
+    targets = dict()
+    for name, field in klass.__fields__.items():
+        types_ = field.field_info.extra.get("enum_reference_types", None)
+        if not types_:
+            continue
+        type_ = normalize_fhir_type_class(field.type_)
+        if getattr(type_, "__resource_type__", None) != "Reference":
+            continue
+        targets[name] = frozenset(types_)
+    return targets
+
+
+@lru_cache(maxsize=None, typed=True)
+def get_checked_reference_targets(
+    klass: typing.Type["BaseModel"],
+) -> typing.Tuple[typing.Tuple[str, typing.FrozenSet[str]], ...]:
+    """``get_reference_targets`` without fields those allow any resource."""
+    return tuple(
+        (name, types_)
+        for name, types_ in get_reference_targets(klass).items()
+        if "Resource" not in types_
+    )
+
+
+def set_reference_targets_validation(enabled: bool) -> bool:
+    """Enables (or disables) the check of reference targets for all models,
+    returns the previous state."""
+    previous = _REFERENCE_TARGETS_VALIDATION[0]
+    _REFERENCE_TARGETS_VALIDATION[0] = enabled is True
+    return previous
+
+
+@contextmanager
+def reference_targets_validation(enabled: bool = True):
+    """Context manager of ``set_reference_targets_validation``, note that
+    the state is process wide (not per thread)."""
+    previous = set_reference_targets_validation(enabled)
+    try:
+        yield
+    finally:
+        set_reference_targets_validation(previous)
+
+
+def _check_reference_target(
+    field_name: str, reference: typing.Any, types_: typing.FrozenSet[str]
+) -> None:
+    """ """
+    values = reference.__dict__
+    type_ = values.get("type", None)
+    if type_:
+        if type_.startswith(STRUCTURE_DEFINITION_URL):
+            type_ = type_[len(STRUCTURE_DEFINITION_URL) :]
+        # absolute URL of logical model is not checked
+        if ":" not in type_ and type_ not in types_:
+            raise ValueError(
+                f"Reference type '{type_}' is not allowed for field "
+                f"'{field_name}', expected any of {sorted(types_)}."
+            )
+    value = values.get("reference", None)
+    if value and value[0] != "#":
+        matched = REFERENCE_TYPE_PREFIX.search(value)
+        if matched is not None and matched.group(1) not in types_:
+            raise ValueError(
+                f"Reference '{value}' is not allowed for field "
+                f"'{field_name}', expected any of {sorted(types_)}."
+            )
+
+
+def validate_reference_targets(
+    cls: typing.Type["BaseModel"], values: typing.Dict[str, typing.Any]
+) -> typing.Dict[str, typing.Any]:
+    """Resource type of ``Reference.type`` and of literal ``reference``
+    (relative or RESTful URL) must be listed in the field's
+    ``enum_reference_types``. Only when enabled by
+    ``set_reference_targets_validation``, otherwise no-op."""
+    if _REFERENCE_TARGETS_VALIDATION[0] is False:
+        return values
+    for field_name, types_ in get_checked_reference_targets(cls):
+        value = values.get(field_name, None)
+        if value is None:
+            continue
+        if isinstance(value, list):
+            for item in value:
+                if item is not None:
+                    _check_reference_target(field_name, item, types_)
+        else:
+            _check_reference_target(field_name, value, types_)
+    return values
+
+
+__all__ = [
+    "validate_choice_fields",
+    "get_choice_groups",
+    "validate_required_primitive_elements",
+    "get_reference_targets",
+    "validate_reference_targets",
+    "set_reference_targets_validation",
+    "reference_targets_validation",
+]
@@ -0,0 +1,1235 @@
+# _*_ coding: utf-8 _*_
+"""Compiled FHIRPath (subset) evaluation directly over model attributes,
+without ``.dict()`` conversion. Expression is parsed once, element paths
+(aliases, choice types ``value[x]``) are resolved against the model classes
+ahead of time and compiled expressions are cached by (expression, type).
+
+    expr = compile("Observation.value.ofType(Quantity).value", Observation)
+    values = expr(observation)
+
+Supported: path navigation, indexer, literals (string, number, boolean,
+``@`` date/time), ``$this``, ``%resource``/``%context`` (and variables),
+operators ``=``, ``!=``, ``~``, ``!~``, ``<``, ``>``, ``<=``, ``>=``, ``|``,
+``and``, ``or``, ``xor``, ``implies``, ``is``, ``as`` and functions
+``where``, ``select``, ``exists``, ``all``, ``empty``, ``first``, ``last``,
+``count``, ``not``, ``ofType``, ``as``, ``is``, ``resolve``, ``extension``,
+``hasValue``, ``startsWith``, ``endsWith``, ``contains``, ``matches``,
+``length``. http://hl7.org/fhirpath/"""
+import datetime
+import decimal
+import re
+import typing
+from functools import lru_cache
+
+from pydantic.fields import SHAPE_LIST
+
+from fhir.resources.core.fhirabstractmodel import FHIRAbstractModel
+from fhir.resources.core.utils.common import normalize_fhir_type_class
+from fhir.resources.core.utils.construct import get_fhir_model_class_getter
+from fhir.resources.core.utils.dateparse import parse_date, parse_datetime, parse_time
+from fhir.resources.core.validators import get_choice_groups
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+Collection = typing.List[typing.Any]
+# model class, primitive type name (i.e. ``code``) or ``None`` (unknown)
+StaticType = typing.Union[type, str, None]
+# ``None`` means unknown (dynamic) types
+StaticTypes = typing.Optional[typing.Tuple[StaticType, ...]]
+Evaluator = typing.Callable[[Collection, "Environment"], Collection]
+
+TOKENS = re.compile(
+    r"""
+    (?P<space>\s+|//[^\n]*|/\*.*?\*/)
+    |(?P<string>'(?:[^'\\]|\\.)*')
+    |(?P<datetime>@[0-9T][0-9T:.+\-Z]*)
+    |(?P<number>\d+(?:\.\d+)?)
+    |(?P<identifier>[A-Za-z_][A-Za-z0-9_]*|`[^`]+`)
+    |(?P<variable>[$%](?:[A-Za-z_][A-Za-z0-9_]*|`[^`]+`|'[^']+'))
+    |(?P<operator><=|>=|!=|!~|[.()\[\],=<>|~{}\-])
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+# partial date/dateTime, kept as str (see ``parse_datetime_literal``)
+PARTIAL_DATETIME = re.compile(r"^\d{4}(?:-\d{2}(?:-\d{2}(?:T\d{2}(?::\d{2})?)?)?)?$")
+STRING_ESCAPES = {
+    "'": "'",
+    '"': '"',
+    "`": "`",
+    "\\": "\\",
+    "/": "/",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+# binding power of infix operators
+BINARY_OPERATORS = {
+    "implies": 1,
+    "or": 2,
+    "xor": 2,
+    "and": 3,
+    "=": 5,
+    "!=": 5,
+    "~": 5,
+    "!~": 5,
+    "<": 6,
+    ">": 6,
+    "<=": 6,
+    ">=": 6,
+    "|": 7,
+    "is": 8,
+    "as": 8,
+}
+STRING_TYPES = frozenset(
+    [
+        "string",
+        "code",
+        "id",
+        "uri",
+        "url",
+        "canonical",
+        "markdown",
+        "oid",
+        "uuid",
+        "xhtml",
+        "String",
+    ]
+)
+# python value class -> type names, partial date (time) is kept as str
+PYTHON_TYPE_NAMES: typing.Dict[type, typing.FrozenSet[str]] = {
+    bool: frozenset(["boolean", "Boolean"]),
+    int: frozenset(["integer", "positiveInt", "unsignedInt", "Integer"]),
+    decimal.Decimal: frozenset(["decimal", "Decimal"]),
+    str: STRING_TYPES | frozenset(["date", "dateTime", "Date", "DateTime"]),
+    datetime.datetime: frozenset(["dateTime", "instant", "DateTime"]),
+    datetime.date: frozenset(["date", "Date"]),
+    datetime.time: frozenset(["time", "Time"]),
+    bytes: frozenset(["base64Binary"]),
+}
+CONSTANTS = {
+    "ucum": "http://unitsofmeasure.org",
+    "sct": "http://snomed.info/sct",
+    "loinc": "http://loinc.org",
+}
+ROOT_VARIABLES = ("resource", "context", "rootResource")
+ABSTRACT_RESOURCE_TYPES = ("Resource", "DomainResource", "Element", "BackboneElement")
+# members of primitive value, kept by primitive extension (``_birthDate``)
+PRIMITIVE_ELEMENT_MEMBERS = ("extension", "id")
+
+
+class FHIRPathError(ValueError):
+    """Invalid expression (syntax, unknown element or function)
+    or evaluation error."""
+
+
+class Token(typing.NamedTuple):
+    """ """
+
+    kind: str
+    value: str
+    position: int
+
+
+class MemberField(typing.NamedTuple):
+    """Field of element name, ``check`` means runtime type check is needed
+    (nested resource of unknown type)."""
+
+    name: str
+    is_list: bool
+    type: StaticType
+    check: bool = False
+
+
+class Environment(typing.NamedTuple):
+    """ """
+
+    resource: typing.Any
+    index: typing.Any
+    variables: typing.Dict[str, typing.Any]
+
+
+class Compiled(typing.NamedTuple):
+    """Compiled (sub) expression, ``member`` is (input, element name) of
+    path navigation, so that following ``ofType``/``as`` is fused with it."""
+
+    func: Evaluator
+    types: StaticTypes
+    member: typing.Optional[typing.Tuple["Compiled", str]] = None
+
+
+def tokenize(expression: str) -> typing.List[Token]:
+    """ """
+    tokens = list()
+    position = 0
+    length = len(expression)
+    while position < length:
+        matched = TOKENS.match(expression, position)
+        if matched is None:
+            raise FHIRPathError(
+                f"Invalid character {expression[position]!r} at {position} "
+                f"in {expression!r}."
+            )
+        kind = matched.lastgroup
+        if kind != "space":
+            tokens.append(Token(kind, matched.group(), position))  # type: ignore
+        position = matched.end()
+    tokens.append(Token("end", "", length))
+    return tokens
+
+
+def unescape(value: str) -> str:
+    """String literal (or delimited identifier) without quotes."""
+    value = value[1:-1]
+    if "\\" not in value:
+        return value
+    result = list()
+    chars = iter(value)
+    for char in chars:
+        if char != "\\":
+            result.append(char)
+            continue
+        char = next(chars, "")
+        if char == "u":
+            code = "".join(next(chars, "") for _ in range(4))
+            result.append(chr(int(code, 16)))
+        else:
+            result.append(STRING_ESCAPES.get(char, char))
+    return "".join(result)
+
+
+def parse_datetime_literal(value: str) -> typing.Any:
+    """``@2020``, ``@2020-01-01``, ``@2020-01-01T10:00:00Z``, ``@T10:00:00``"""
+    value = value[1:]
+    if value.startswith("T"):
+        result = parse_time(value[1:])
+    elif "T" in value:
+        result = parse_datetime(value)
+    else:
+        result = parse_date(value)
+    if result is None:
+        # partial values are compared as string
+        return value
+    return result
+
+
+class Parser:
+    """Pratt parser, syntax tree is made of tuples:
+    ``("literal", values)``, ``("identifier", name)``, ``("variable", name)``,
+    ``("member", target, name)``, ``("call", target, name, arguments)``,
+    ``("index", target, index)``, ``("binary", operator, left, right)``,
+    ``("type", operator, left, type name)``. ``target`` is ``None`` for
+    invocation on the input collection."""
+
+    def __init__(self, expression: str):
+        """ """
+        self.expression = expression
+        self.tokens = tokenize(expression)
+        self.position = 0
+
+    def error(self, message: str, token: Token) -> FHIRPathError:
+        """ """
+        return FHIRPathError(f"{message} at {token.position} in {self.expression!r}.")
+
+    def peek(self) -> Token:
+        """ """
+        return self.tokens[self.position]
+
+    def next(self) -> Token:
+        """ """
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def expect(self, value: str) -> Token:
+        """ """
+        token = self.next()
+        if token.value != value or token.kind not in ("operator", "identifier"):
+            raise self.error(f"Expected {value!r}, got {token.value!r}", token)
+        return token
+
+    def parse(self) -> tuple:
+        """ """
+        node = self.expression_(0)
+        token = self.peek()
+        if token.kind != "end":
+            raise self.error(f"Unexpected {token.value!r}", token)
+        return node
+
+    def expression_(self, power: int) -> tuple:
+        """ """
+        left = self.term()
+        while True:
+            token = self.peek()
+            if token.kind == "operator" and token.value in (".", "["):
+                left = self.postfix(left)
+                continue
+            if token.kind not in ("operator", "identifier"):
+                break
+            operator_power = BINARY_OPERATORS.get(token.value, None)
+            if operator_power is None or operator_power <= power:
+                break
+            self.next()
+            if token.value in ("is", "as"):
+                left = ("type", token.value, left, self.type_specifier())
+            else:
+                left = ("binary", token.value, left, self.expression_(operator_power))
+        return left
+
+    def postfix(self, left: tuple) -> tuple:
+        """ """
+        token = self.next()
+        if token.value == "[":
+            index = self.expression_(0)
+            self.expect("]")
+            return ("index", left, index)
+        name_token = self.next()
+        if name_token.kind != "identifier":
+            raise self.error(f"Expected identifier, got {name_token.value!r}", token)
+        return self.invocation(left, name_token)
+
+    def invocation(self, target: typing.Optional[tuple], token: Token) -> tuple:
+        """ """
+        name = token.value
+        if name[0] == "`":
+            name = unescape(name)
+        elif self.peek().value == "(":
+            self.next()
+            arguments = list()
+            if self.peek().value != ")":
+                while True:
+                    arguments.append(self.expression_(0))
+                    if self.peek().value != ",":
+                        break
+                    self.next()
+            self.expect(")")
+            return ("call", target, name, tuple(arguments))
+        if target is None:
+            return ("identifier", name)
+        return ("member", target, name)
+
+    def type_specifier(self) -> str:
+        """``Quantity``, ``FHIR.Quantity`` or ``System.String``"""
+        token = self.next()
+        if token.kind != "identifier":
+            raise self.error(f"Expected type name, got {token.value!r}", token)
+        name = unescape(token.value) if token.value[0] == "`" else token.value
+        if self.peek().value == "." and self.tokens[self.position + 1].kind == (
+            "identifier"
+        ):
+            self.next()
+            return f"{name}.{self.next().value}"
+        return name
+
+    def term(self) -> tuple:
+        """ """
+        token = self.next()
+        kind = token.kind
+        if kind == "string":
+            return ("literal", [unescape(token.value)])
+        if kind == "number":
+            return ("literal", [number_literal(token.value)])
+        if kind == "datetime":
+            return ("literal", [parse_datetime_literal(token.value)])
+        if kind == "variable":
+            name = token.value[1:]
+            if name[0] in "`'":
+                name = unescape(name)
+            return ("variable", token.value[0] + name)
+        if kind == "identifier":
+            if token.value in ("true", "false"):
+                return ("literal", [token.value == "true"])
+            return self.invocation(None, token)
+        if token.value == "(":
+            node = self.expression_(0)
+            self.expect(")")
+            return node
+        if token.value == "{":
+            self.expect("}")
+            return ("literal", [])
+        if token.value == "-" and self.peek().kind == "number":
+            return ("literal", [-number_literal(self.next().value)])
+        raise self.error(f"Unexpected {token.value or 'end'!r}", token)
+
+
+def number_literal(value: str) -> typing.Union[int, decimal.Decimal]:
+    """ """
+    if "." in value:
+        return decimal.Decimal(value)
+    return int(value)
+
+
+def strip_namespace(type_name: str) -> str:
+    """ """
+    if type_name.startswith("FHIR."):
+        return type_name[5:]
+    if type_name.startswith("System."):
+        return type_name[7:]
+    return type_name
+
+
+@lru_cache(maxsize=None)
+def get_type_names(klass: type) -> typing.FrozenSet[str]:
+    """Type name of model class and its base types (i.e. ``Age`` is
+    also ``Quantity``, ``Patient`` is ``DomainResource``)."""
+    names = set()
+    for cls in klass.__mro__:
+        if not isinstance(cls, type) or not issubclass(cls, FHIRAbstractModel):
+            continue
+        field = cls.__fields__.get("resource_type", None)
+        if field is not None and isinstance(field.default, str):
+            names.add(field.default)
+    return frozenset(names)
+
+
+def is_type(value: typing.Any, type_name: str) -> bool:
+    """Runtime type check of value, primitive value is matched by its
+    python class (i.e. str is any of string, code, uri...)."""
+    if isinstance(value, FHIRAbstractModel):
+        return type_name in get_type_names(value.__class__)
+    for klass in value.__class__.__mro__:
+        names = PYTHON_TYPE_NAMES.get(klass, None)
+        if names is not None:
+            return type_name in names
+    return False
+
+
+def matches_static_type(type_: StaticType, type_name: str) -> bool:
+    """ """
+    if isinstance(type_, type):
+        return type_name in get_type_names(type_)
+    if type_name in ("String", "string") and type_ in STRING_TYPES:
+        return True
+    return type_ == type_name
+
+
+def get_field_type(field) -> StaticType:
+    """Model class of complex field, name of primitive type, ``None`` for
+    nested resource (type is known only at runtime)."""
+    type_ = normalize_fhir_type_class(field.type_)
+    if type_ is bool:
+        return "boolean"
+    resource_type = getattr(type_, "__resource_type__", None)
+    if resource_type is None:
+        fhir_type_name = getattr(type_, "fhir_type_name", None)
+        if fhir_type_name is None:
+            return "string"
+        return fhir_type_name()
+    if resource_type in ("Resource", "Element"):
+        return None
+    return get_fhir_model_class_getter(type_)(resource_type)
+
+
+@lru_cache(maxsize=None)
+def get_member_fields(klass: type, name: str) -> typing.Tuple[MemberField, ...]:
+    """Fields of element name (alias), choice type element (``value``)
+    gives all its typed fields (``valueQuantity``, ``valueString``...)."""
+    if not issubclass(klass, FHIRAbstractModel):
+        return ()
+    field_name = klass.get_alias_mapping().get(name, None)
+    if field_name is not None:
+        field_names = [field_name]
+    else:
+        field_names = []
+        for prefix, _, fields, _ in get_choice_groups(klass)[0]:
+            if prefix == name:
+                field_names = fields
+                break
+    members = list()
+    for field_name in field_names:
+        field = klass.__fields__[field_name]
+        members.append(
+            MemberField(field_name, field.shape == SHAPE_LIST, get_field_type(field))
+        )
+    return tuple(members)
+
+
+def get_model_class(type_name: str, types: StaticTypes) -> StaticType:
+    """Model class of type name (from the release of known types),
+    primitive type name as it is."""
+    type_name = strip_namespace(type_name)
+    if type_name[0].islower():
+        return type_name
+    for type_ in types or ():
+        if isinstance(type_, type):
+            try:
+                return get_fhir_model_class_getter(type_)(type_name)
+            except (KeyError, ValueError):
+                return None
+    return None
+
+
+def to_boolean(collection: Collection) -> typing.Optional[bool]:
+    """Singleton evaluation of collection, ``None`` for empty."""
+    if not collection:
+        return None
+    if len(collection) > 1:
+        raise FHIRPathError(
+            f"Expected single value in boolean context, got {len(collection)}."
+        )
+    value = collection[0]
+    if value is True or value is False:
+        return value
+    return True
+
+
+def get_singleton(collection: Collection) -> typing.Any:
+    """ """
+    if len(collection) > 1:
+        raise FHIRPathError(f"Expected single value, got {len(collection)}.")
+    return collection[0] if collection else None
+
+
+def _is_temporal_pair(a: typing.Any, b: typing.Any) -> bool:
+    """Date/time values of different kind or partial date/time values
+    (kept as str) of different precision."""
+    if isinstance(a, str) and isinstance(b, str):
+        return (
+            len(a) != len(b)
+            and PARTIAL_DATETIME.match(a) is not None
+            and PARTIAL_DATETIME.match(b) is not None
+        )
+    if a.__class__ is b.__class__:
+        return False
+    temporal = (datetime.date, datetime.time)
+    return (isinstance(a, temporal) and isinstance(b, (str,) + temporal)) or (
+        isinstance(b, temporal) and isinstance(a, str)
+    )
+
+
+def _equals(left: Collection, right: Collection) -> typing.Optional[bool]:
+    """Date/time values of different precision give empty (``None``),
+    unless those already differ at common precision."""
+    if not left or not right:
+        return None
+    if len(left) != len(right):
+        return False
+    uncertain = False
+    for a, b in zip(left, right):
+        if _is_temporal_pair(a, b):
+            a, b = _date_string(a), _date_string(b)
+            if len(a) != len(b):
+                common = min(len(a), len(b))
+                if a[:common] != b[:common]:
+                    return False
+                uncertain = True
+                continue
+        try:
+            if a != b:
+                return False
+        except TypeError:
+            return False
+    if uncertain:
+        return None
+    return True
+
+
+def _equivalent(left: Collection, right: Collection) -> bool:
+    """ """
+    if not left and not right:
+        return True
+    if len(left) != len(right):
+        return False
+    for a, b in zip(left, right):
+        if isinstance(a, str) and isinstance(b, str):
+            if " ".join(a.lower().split()) != " ".join(b.lower().split()):
+                return False
+        elif a != b:
+            return False
+    return True
+
+
+def _compare(operator: str, left: Collection, right: Collection):
+    """ """
+    if not left or not right:
+        return None
+    a, b = get_singleton(left), get_singleton(right)
+    if a.__class__ is not b.__class__ and isinstance(a, (str, datetime.date)):
+        if isinstance(b, (str, datetime.date)):
+            # partial date (str) against date/datetime, at common precision
+            a, b = _date_string(a), _date_string(b)
+            common = min(len(a), len(b))
+            if len(a) != len(b) and a[:common] == b[:common]:
+                return None
+            a, b = a[:common], b[:common]
+    try:
+        if operator == "<":
+            return a < b
+        if operator == ">":
+            return a > b
+        if operator == "<=":
+            return a <= b
+        return a >= b
+    except TypeError:
+        # different types or uncertain (naive vs aware datetime)
+        return None
+
+
+def _date_string(value: typing.Any) -> str:
+    """ """
+    if isinstance(value, str):
+        return value
+    return value.isoformat()
+
+
+def _union(left: Collection, right: Collection) -> Collection:
+    """ """
+    result: Collection = list()
+    for value in left + right:
+        for existing in result:
+            if existing is value or existing == value:
+                break
+        else:
+            result.append(value)
+    return result
+
+
+def _logical(operator: str, left, right) -> typing.Optional[bool]:
+    """Three-valued logic, ``None`` is empty."""
+    if operator == "and":
+        if left is False or right is False:
+            return False
+        if left is None or right is None:
+            return None
+        return True
+    if operator == "or":
+        if left is True or right is True:
+            return True
+        if left is None or right is None:
+            return None
+        return False
+    if operator == "xor":
+        if left is None or right is None:
+            return None
+        return left != right
+    # implies
+    if left is False or right is True:
+        return True
+    if left is None:
+        return None
+    return right
+
+
+class Compiler:
+    """Compiles syntax tree into closures, with static types of the
+    (sub) expressions derived from the model classes."""
+
+    def __init__(self, expression: str):
+        """ """
+        self.expression = expression
+
+    def error(self, message: str) -> FHIRPathError:
+        """ """
+        return FHIRPathError(f"{message} in {self.expression!r}.")
+
+    def compile(self, node: tuple, types: StaticTypes) -> Compiled:
+        """``types`` are static types of the input collection."""
+        kind = node[0]
+        if kind == "literal":
+            values = node[1]
+            return Compiled(lambda focus, env: list(values), self.literal_types(values))
+        if kind == "identifier":
+            name = node[1]
+            if name[0].isupper():
+                return self.type_filter(Compiled(_identity, types), name, types)
+            return self.member(Compiled(_identity, types), name)
+        if kind == "variable":
+            return self.variable(node[1], types)
+        if kind == "member":
+            return self.member(self.compile(node[1], types), node[2])
+        if kind == "call":
+            if node[1] is None:
+                target = Compiled(_identity, types)
+            else:
+                target = self.compile(node[1], types)
+            return self.call(target, node[2], node[3], types)
+        if kind == "index":
+            return self.index(self.compile(node[1], types), node[2], types)
+        if kind == "type":
+            return self.type_operator(node[1], self.compile(node[2], types), node[3])
+        return self.binary(
+            node[1], self.compile(node[2], types), self.compile(node[3], types)
+        )
+
+    @staticmethod
+    def literal_types(values: Collection) -> StaticTypes:
+        """ """
+        types = list()
+        for value in values:
+            if value.__class__ is bool:
+                types.append("boolean")
+            elif value.__class__ is str:
+                types.append("string")
+            else:
+                types.append(None)
+        return tuple(types)
+
+    def variable(self, name: str, types: StaticTypes) -> Compiled:
+        """ """
+        if name == "$this":
+            return Compiled(_identity, types)
+        if name[0] == "$":
+            raise self.error(f"Unsupported variable {name!r}")
+        name = name[1:]
+        if name in ROOT_VARIABLES:
+            return Compiled(lambda focus, env: [env.resource], None)
+        if name in CONSTANTS:
+            value = CONSTANTS[name]
+            return Compiled(lambda focus, env: [value], ("string",))
+
+        def evaluate_variable(focus, env):
+            try:
+                value = env.variables[name]
+            except KeyError:
+                raise FHIRPathError(f"Undefined variable '%{name}'.")
+            if isinstance(value, list):
+                return list(value)
+            return [] if value is None else [value]
+
+        return Compiled(evaluate_variable, None)
+
+    def member(self, target: Compiled, name: str, type_name: str = None) -> Compiled:
+        """Path navigation, with ``type_name`` only fields of the type are
+        taken (fused ``ofType``)."""
+        plans: typing.Dict[type, typing.Tuple[MemberField, ...]] = dict()
+        out_types: typing.List[StaticType] = list()
+        unknown = target.types is None
+
+        def get_fields(klass):
+            fields = get_member_fields(klass, name)
+            if type_name is None:
+                return fields
+            return tuple(
+                field._replace(check=True) if field.type is None else field
+                for field in fields
+                if field.type is None or matches_static_type(field.type, type_name)
+            )
+
+        if not unknown:
+            classes = [tp for tp in target.types if isinstance(tp, type)]
+            found = False
+            for klass in classes:
+                if get_member_fields(klass, name):
+                    found = True
+                fields = get_fields(klass)
+                plans[klass] = fields
+                for field in fields:
+                    if field.type is None:
+                        unknown = True
+                    out_types.append(field.type)
+            if classes and not found:
+                names = ", ".join(sorted(k.get_resource_type() for k in classes))
+                raise self.error(f"Unknown element '{name}' of {names}")
+        target_func = target.func
+
+        def evaluate_member(focus, env):
+            result = list()
+            for item in target_func(focus, env):
+                klass = item.__class__
+                fields = plans.get(klass, None)
+                if fields is None:
+                    fields = plans[klass] = get_fields(klass)
+                if not fields:
+                    continue
+                values = item.__dict__
+                for field_name, is_list, _, check in fields:
+                    value = values.get(field_name, None)
+                    if value is None:
+                        continue
+                    if is_list:
+                        for val in value:
+                            if val is not None and (
+                                not check or is_type(val, type_name)  # type: ignore
+                            ):
+                                result.append(val)
+                    elif not check or is_type(value, type_name):  # type: ignore
+                        result.append(value)
+            return result
+
+        compiled = Compiled(
+            evaluate_member,
+            None if unknown else tuple(out_types),
+            None if type_name is not None else (target, name),
+        )
+        if name in PRIMITIVE_ELEMENT_MEMBERS and target.member is not None:
+            return self.primitive_member(compiled, target.member, name, type_name)
+        return compiled
+
+    def primitive_member(
+        self,
+        compiled: Compiled,
+        parent: typing.Tuple[Compiled, str],
+        name: str,
+        type_name: typing.Optional[str],
+    ) -> Compiled:
+        """``extension``/``id`` of primitive value, which are kept by the
+        primitive extension field (``_birthDate``) of the parent."""
+        parent_func = parent[0].func
+        parent_name = parent[1]
+        member_func = compiled.func
+
+        def evaluate_primitive_member(focus, env):
+            result = member_func(focus, env)
+            for item in parent_func(focus, env):
+                values = item.__dict__
+                for field_name, is_list, field_type, _ in get_member_fields(
+                    item.__class__, parent_name
+                ):
+                    if isinstance(field_type, type) or field_type is None:
+                        continue
+                    ext = values.get(field_name + "__ext", None)
+                    if ext is None:
+                        continue
+                    for ext_item in ext if is_list else (ext,):
+                        if ext_item is None:
+                            continue
+                        value = ext_item.__dict__.get(name, None)
+                        if value is None:
+                            continue
+                        for val in value if isinstance(value, list) else (value,):
+                            if type_name is None or is_type(val, type_name):
+                                result.append(val)
+            return result
+
+        return Compiled(evaluate_primitive_member, None, compiled.member)
+
+    def type_filter(self, target: Compiled, type_name: str, types: StaticTypes):
+        """Items of type (``ofType``), leading type name of path
+        (``Patient.name``) is the same."""
+        if target.member is not None:
+            return self.member(target.member[0], target.member[1], type_name)
+        type_name = strip_namespace(type_name)
+        target_func = target.func
+        type_ = get_model_class(type_name, target.types or types)
+        out_types = None if type_ is None else (type_,)
+        if target.types and all(
+            isinstance(tp, type)
+            and tp.get_resource_type() not in ABSTRACT_RESOURCE_TYPES
+            and type_name not in get_type_names(tp)
+            for tp in target.types
+        ):
+            # i.e. ``Practitioner.name`` branch of expression against Patient
+            return Compiled(_empty, out_types)
+
+        def evaluate_type_filter(focus, env):
+            return [
+                item for item in target_func(focus, env) if is_type(item, type_name)
+            ]
+
+        return Compiled(evaluate_type_filter, out_types)
+
+    def type_operator(self, operator: str, target: Compiled, type_name: str):
+        """ """
+        type_name = strip_namespace(type_name)
+        filtered = self.type_filter(target, type_name, target.types)
+        if operator == "as":
+            return filtered
+        target_func = target.func
+        if target.member is None:
+
+            def evaluate_is(focus, env):
+                collection = target_func(focus, env)
+                if len(collection) != 1:
+                    return []
+                return [is_type(collection[0], type_name)]
+
+            return Compiled(evaluate_is, ("boolean",))
+
+        # typed fields of choice element, i.e. ``value is Quantity``
+        filtered_func = filtered.func
+
+        def evaluate_is_member(focus, env):
+            if len(target_func(focus, env)) != 1:
+                return []
+            return [len(filtered_func(focus, env)) == 1]
+
+        return Compiled(evaluate_is_member, ("boolean",))
+
+    def index(self, target: Compiled, node: tuple, types: StaticTypes) -> Compiled:
+        """ """
+        index_func = self.compile(node, types).func
+        target_func = target.func
+
+        def evaluate_index(focus, env):
+            index = get_singleton(index_func(focus, env))
+            collection = target_func(focus, env)
+            if index is None or index >= len(collection) or index < 0:
+                return []
+            return [collection[index]]
+
+        return Compiled(evaluate_index, target.types)
+
+    def binary(self, operator: str, left: Compiled, right: Compiled) -> Compiled:
+        """ """
+        left_func, right_func = left.func, right.func
+        if operator == "|":
+
+            def evaluate_union(focus, env):
+                return _union(left_func(focus, env), right_func(focus, env))
+
+            types = None
+            if left.types is not None and right.types is not None:
+                types = left.types + right.types
+            return Compiled(evaluate_union, types)
+
+        if operator in ("and", "or", "xor", "implies"):
+
+            def evaluate_logical(focus, env):
+                result = _logical(
+                    operator,
+                    to_boolean(left_func(focus, env)),
+                    to_boolean(right_func(focus, env)),
+                )
+                return [] if result is None else [result]
+
+            return Compiled(evaluate_logical, ("boolean",))
+
+        if operator in ("=", "!="):
+            negate = operator == "!="
+
+            def evaluate_equals(focus, env):
+                result = _equals(left_func(focus, env), right_func(focus, env))
+                if result is None:
+                    return []
+                return [result is not negate]
+
+            return Compiled(evaluate_equals, ("boolean",))
+
+        if operator in ("~", "!~"):
+            negate = operator == "!~"
+
+            def evaluate_equivalent(focus, env):
+                result = _equivalent(left_func(focus, env), right_func(focus, env))
+                return [result is not negate]
+
+            return Compiled(evaluate_equivalent, ("boolean",))
+
+        def evaluate_compare(focus, env):
+            result = _compare(operator, left_func(focus, env), right_func(focus, env))
+            return [] if result is None else [result]
+
+        return Compiled(evaluate_compare, ("boolean",))
+
+    def call(
+        self,
+        target: Compiled,
+        name: str,
+        arguments: typing.Tuple[tuple, ...],
+        types: StaticTypes,
+    ) -> Compiled:
+        """ """
+        method = getattr(self, f"function_{name}", None)
+        if method is None:
+            raise self.error(f"Unsupported function '{name}()'")
+        expected = FUNCTION_ARGUMENTS[name]
+        if len(arguments) not in expected:
+            raise self.error(
+                f"Function '{name}()' expects {' or '.join(map(str, expected))} "
+                f"argument(s), got {len(arguments)}"
+            )
+        return method(target, arguments, types)
+
+    def type_argument(self, name: str, arguments: typing.Tuple[tuple, ...]) -> str:
+        """ """
+        node = arguments[0]
+        if node[0] == "identifier":
+            return node[1]
+        if node[0] == "member" and node[1][0] == "identifier":
+            return f"{node[1][1]}.{node[2]}"
+        raise self.error(f"Function '{name}()' expects type name")
+
+    def function_ofType(self, target, arguments, types):
+        """ """
+        return self.type_filter(target, self.type_argument("ofType", arguments), types)
+
+    def function_as(self, target, arguments, types):
+        """ """
+        return self.type_filter(target, self.type_argument("as", arguments), types)
+
+    def function_is(self, target, arguments, types):
+        """ """
+        return self.type_operator("is", target, self.type_argument("is", arguments))
+
+    def function_where(self, target, arguments, types):
+        """ """
+        target_func = target.func
+        criteria = self.compile(arguments[0], target.types).func
+
+        def evaluate_where(focus, env):
+            return [
+                item
+                for item in target_func(focus, env)
+                if to_boolean(criteria([item], env)) is True
+            ]
+
+        return Compiled(evaluate_where, target.types)
+
+    def function_select(self, target, arguments, types):
+        """ """
+        target_func = target.func
+        projection = self.compile(arguments[0], target.types)
+        projection_func = projection.func
+
+        def evaluate_select(focus, env):
+            result = list()
+            for item in target_func(focus, env):
+                result.extend(projection_func([item], env))
+            return result
+
+        return Compiled(evaluate_select, projection.types)
+
+    def function_exists(self, target, arguments, types):
+        """ """
+        if arguments:
+            target = self.function_where(target, arguments, types)
+        target_func = target.func
+        return Compiled(
+            lambda focus, env: [len(target_func(focus, env)) > 0], ("boolean",)
+        )
+
+    def function_all(self, target, arguments, types):
+        """ """
+        target_func = target.func
+        criteria = self.compile(arguments[0], target.types).func
+
+        def evaluate_all(focus, env):
+            for item in target_func(focus, env):
+                if to_boolean(criteria([item], env)) is not True:
+                    return [False]
+            return [True]
+
+        return Compiled(evaluate_all, ("boolean",))
+
+    def function_empty(self, target, arguments, types):
+        """ """
+        target_func = target.func
+        return Compiled(
+            lambda focus, env: [len(target_func(focus, env)) == 0], ("boolean",)
+        )
+
+    def function_first(self, target, arguments, types):
+        """ """
+        target_func = target.func
+        return Compiled(lambda focus, env: target_func(focus, env)[:1], target.types)
+
+    def function_last(self, target, arguments, types):
+        """ """
+        target_func = target.func
+        return Compiled(lambda focus, env: target_func(focus, env)[-1:], target.types)
+
+    def function_count(self, target, arguments, types):
+        """ """
+        target_func = target.func
+        return Compiled(lambda focus, env: [len(target_func(focus, env))], None)
+
+    def function_not(self, target, arguments, types):
+        """ """
+        target_func = target.func
+
+        def evaluate_not(focus, env):
+            value = to_boolean(target_func(focus, env))
+            return [] if value is None else [not value]
+
+        return Compiled(evaluate_not, ("boolean",))
+
+    def function_hasValue(self, target, arguments, types):
+        """ """
+        target_func = target.func
+
+        def evaluate_has_value(focus, env):
+            collection = target_func(focus, env)
+            return [
+                len(collection) == 1
+                and not isinstance(collection[0], FHIRAbstractModel)
+            ]
+
+        return Compiled(evaluate_has_value, ("boolean",))
+
+    def function_resolve(self, target, arguments, types):
+        """Target resources, looked up by the ``index`` given at evaluation
+        (i.e. ``fhir.resources.references.ReferenceIndex``)."""
+        target_func = target.func
+
+        def evaluate_resolve(focus, env):
+            index = env.index
+            if index is None:
+                return []
+            result = list()
+            for item in target_func(focus, env):
+                resource = index.resolve(item, env.resource)
+                if resource is not None:
+                    result.append(resource)
+            return result
+
+        return Compiled(evaluate_resolve, None)
+
+    def function_extension(self, target, arguments, types):
+        """ """
+        try:
+            extensions = self.member(target, "extension")
+        except FHIRPathError:
+            # i.e. Bundle, has no extension
+            return Compiled(_empty, None)
+        url_func = self.compile(arguments[0], target.types).func
+        extensions_func = extensions.func
+
+        def evaluate_extension(focus, env):
+            url = get_singleton(url_func(focus, env))
+            return [
+                ext
+                for ext in extensions_func(focus, env)
+                if ext.__dict__.get("url", None) == url
+            ]
+
+        return Compiled(evaluate_extension, extensions.types)
+
+    def string_function(self, target, arguments, types, func):
+        """ """
+        target_func = target.func
+        argument_funcs = [self.compile(arg, target.types).func for arg in arguments]
+
+        def evaluate_string_function(focus, env):
+            value = get_singleton(target_func(focus, env))
+            if value is None:
+                return []
+            args = [get_singleton(arg(focus, env)) for arg in argument_funcs]
+            if any(arg is None for arg in args):
+                return []
+            return [func(value, *args)]
+
+        return Compiled(evaluate_string_function, None)
+
+    def function_startsWith(self, target, arguments, types):
+        """ """
+        return self.string_function(
+            target, arguments, types, lambda value, arg: value.startswith(arg)
+        )
+
+    def function_endsWith(self, target, arguments, types):
+        """ """
+        return self.string_function(
+            target, arguments, types, lambda value, arg: value.endswith(arg)
+        )
+
+    def function_contains(self, target, arguments, types):
+        """ """
+        return self.string_function(
+            target, arguments, types, lambda value, arg: arg in value
+        )
+
+    def function_matches(self, target, arguments, types):
+        """ """
+        return self.string_function(
+            target,
+            arguments,
+            types,
+            lambda value, arg: re.search(arg, value, re.DOTALL) is not None,
+        )
+
+    def function_length(self, target, arguments, types):
+        """ """
+        return self.string_function(target, arguments, types, len)
+
+
+# allowed number of arguments
+FUNCTION_ARGUMENTS = {
+    "ofType": (1,),
+    "as": (1,),
+    "is": (1,),
+    "where": (1,),
+    "select": (1,),
+    "exists": (0, 1),
+    "all": (1,),
+    "empty": (0,),
+    "first": (0,),
+    "last": (0,),
+    "count": (0,),
+    "not": (0,),
+    "hasValue": (0,),
+    "resolve": (0,),
+    "extension": (1,),
+    "startsWith": (1,),
+    "endsWith": (1,),
+    "contains": (1,),
+    "matches": (1,),
+    "length": (0,),
+}
+
+
+def _identity(focus: Collection, env: Environment) -> Collection:
+    """ """
+    return focus
+
+
+def _empty(focus: Collection, env: Environment) -> Collection:
+    """ """
+    return []
+
+
+class CompiledExpression:
+    """Reusable evaluator of compiled expression.
+
+    expr(model, index=reference_index, variables={"code": "1234-5"})
+    """
+
+    __slots__ = ("expression", "root_type", "func", "types")
+
+    def __init__(
+        self,
+        expression: str,
+        root_type: typing.Optional[typing.Type[FHIRAbstractModel]],
+        func: Evaluator,
+        types: StaticTypes,
+    ):
+        """ """
+        self.expression = expression
+        self.root_type = root_type
+        self.func = func
+        self.types = types
+
+    def __call__(
+        self,
+        model: typing.Any,
+        *,
+        index: typing.Any = None,
+        variables: typing.Dict[str, typing.Any] = None,
+    ) -> Collection:
+        """Result collection (list), ``index`` is used by ``resolve()``."""
+        focus = model if isinstance(model, list) else [model]
+        env = Environment(focus[0] if len(focus) == 1 else None, index, variables or {})
+        return self.func(focus, env)
+
+    evaluate = __call__
+
+    def __repr__(self) -> str:
+        """ """
+        root_type = self.root_type.__name__ if self.root_type else None
+        return f"<{self.__class__.__name__} {self.expression!r} ({root_type})>"
+
+
+@lru_cache(maxsize=1024)
+def compile(
+    expression: str, root_type: typing.Type[FHIRAbstractModel] = None
+) -> CompiledExpression:
+    """Compiled expression (cached by expression and type), element paths
+    are resolved against ``root_type`` (model class) ahead of time, unknown
+    element is ``FHIRPathError``. Without ``root_type`` paths are resolved
+    at runtime (still cached per class)."""
+    tree = Parser(expression).parse()
+    types = None if root_type is None else (root_type,)
+    compiled = Compiler(expression).compile(tree, types)
+    return CompiledExpression(expression, root_type, compiled.func, compiled.types)
+
+
+def evaluate(
+    model: FHIRAbstractModel,
+    expression: str,
+    *,
+    index: typing.Any = None,
+    variables: typing.Dict[str, typing.Any] = None,
+) -> Collection:
+    """ """
+    return compile(expression, model.__class__)(model, index=index, variables=variables)
+
+
+__all__ = ["compile", "evaluate", "CompiledExpression", "FHIRPathError"]
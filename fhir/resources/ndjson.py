@@ -0,0 +1,153 @@
+# _*_ coding: utf-8 _*_
+"""Streaming reader/writer for NDJSON (newline delimited JSON), the format
+is used by FHIR Bulk Data ``$export`` operation (one resource per line).
+https://hl7.org/fhir/uv/bulkdata/export.html"""
+import gzip
+import io
+import pathlib
+import typing
+
+from pydantic.error_wrappers import ErrorWrapper, ValidationError
+from pydantic.utils import ROOT_KEY
+
+from fhir.resources.core.fhirabstractmodel import FHIRAbstractModel
+
+from .fhirtypesvalidators import get_fhir_model_class
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+GZIP_MAGIC = b"\x1f\x8b"
+StrPath = typing.Union[str, pathlib.Path]
+Source = typing.Union[StrPath, typing.IO]
+
+
+class NDJSONLineError(typing.NamedTuple):
+    """Error information about a line, that is skipped."""
+
+    lineno: int
+    line: bytes
+    error: Exception
+
+
+def _is_gzip(stream: typing.IO) -> bool:
+    """ """
+    peek = getattr(stream, "peek", None)
+    if peek is not None:
+        return peek(2)[:2] == GZIP_MAGIC
+    position = stream.tell()
+    magic = stream.read(2)
+    stream.seek(position)
+    return magic == GZIP_MAGIC
+
+
+def _open_source(source: Source) -> typing.Tuple[typing.IO, bool]:
+    """Returns binary (or text) stream and flag if stream should be closed."""
+    if isinstance(source, (str, pathlib.Path)):
+        stream: typing.IO = open(source, "rb")
+        if _is_gzip(stream):
+            return gzip.GzipFile(fileobj=stream, mode="rb"), True
+        return stream, True
+
+    if isinstance(source, io.TextIOBase):
+        return source, False
+
+    if not hasattr(source, "peek") and not source.seekable():
+        source = io.BufferedReader(source)  # type: ignore
+    if _is_gzip(source):
+        return gzip.GzipFile(fileobj=source, mode="rb"), False
+    return source, False
+
+
+def iter_ndjson(
+    source: Source,
+    resource_type: str = None,
+    *,
+    skip_errors: bool = False,
+    errors: typing.List[NDJSONLineError] = None,
+) -> typing.Iterator[FHIRAbstractModel]:
+    """Lazily yields parsed model from each line of NDJSON file (path) or stream.
+    Gzip compressed input is detected and decompressed transparently.
+
+    :param resource_type: if provided, all lines are parsed with this model class
+        otherwise each line is dispatched on its ``resourceType``.
+
+    :param skip_errors: bad lines are skipped instead of raising error.
+
+    :param errors: list where skipped lines errors (``NDJSONLineError``)
+        are collected.
+    """
+    klass = None
+    if resource_type is not None:
+        klass = get_fhir_model_class(resource_type)
+
+    json_loads = FHIRAbstractModel.__config__.json_loads
+    stream, should_close = _open_source(source)
+    try:
+        for lineno, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                obj = json_loads(line)
+                if klass is not None:
+                    model_class = klass
+                else:
+                    try:
+                        model_class = get_fhir_model_class(obj["resourceType"])
+                    except (KeyError, TypeError):
+                        raise ValidationError(
+                            [
+                                ErrorWrapper(
+                                    ValueError(
+                                        "Missing or invalid 'resourceType' "
+                                        f"value at line {lineno}."
+                                    ),
+                                    loc=ROOT_KEY,
+                                )
+                            ],
+                            FHIRAbstractModel,  # type: ignore
+                        )
+                yield model_class.parse_obj(obj)
+            except (ValueError, TypeError) as exc:
+                # ValidationError & JSONDecodeError are subclass of ValueError
+                if not skip_errors:
+                    raise
+                if errors is not None:
+                    if isinstance(line, str):
+                        line = line.encode()
+                    errors.append(NDJSONLineError(lineno, line, exc))
+    finally:
+        if should_close:
+            stream.close()
+
+
+def write_ndjson(
+    models: typing.Iterable[FHIRAbstractModel],
+    stream: typing.Union[StrPath, typing.BinaryIO],
+    *,
+    exclude_comments: bool = False,
+) -> int:
+    """Streams models as NDJSON, one model per line.
+    If path is provided and ends with ``.gz`` suffix, output is gzip compressed.
+    Returns number of lines have been written."""
+    should_close = False
+    if isinstance(stream, (str, pathlib.Path)):
+        path = pathlib.Path(stream)
+        if path.suffix.lower() == ".gz":
+            stream = gzip.open(path, "wb")
+        else:
+            stream = open(path, "wb")
+        should_close = True
+    count = 0
+    try:
+        for model in models:
+            line = model.json(return_bytes=True, exclude_comments=exclude_comments)
+            stream.write(line)  # type: ignore
+            stream.write(b"\n")  # type: ignore
+            count += 1
+    finally:
+        if should_close:
+            stream.close()  # type: ignore
+    return count
+
+
+__all__ = ["iter_ndjson", "write_ndjson", "NDJSONLineError"]
@@ -0,0 +1,190 @@
+# _*_ coding: utf-8 _*_
+"""Parallel (process pool) parsing of many resources at once.
+Validation is CPU bound, so the batch is fanned out to worker processes
+and results are sent back as JSON bytes rather than pickled models, models
+are rebuilt in the parent by ``construct_fhir`` (already validated)."""
+import multiprocessing
+import pickle
+import typing
+
+from fhir.resources.core.fhirabstractmodel import FHIRAbstractModel
+
+from .fhirtypesvalidators import get_fhir_model_class
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+Payload = typing.Union[bytes, str, typing.Dict[str, typing.Any]]
+OUTPUT_MODEL = "model"
+OUTPUT_DICT = "dict"
+OUTPUT_JSON = "json"
+OUTPUTS = (OUTPUT_MODEL, OUTPUT_DICT, OUTPUT_JSON)
+
+# worker process state, set by initializer
+_WORKER_RESOURCE_TYPE: typing.Optional[str] = None
+_WORKER_OUTPUT: str = OUTPUT_MODEL
+_WORKER_RETURN_EXCEPTIONS: bool = False
+
+
+def _warmup(resource_types: typing.Iterable[str]) -> None:
+    """Imports only needed model classes (through ``MODEL_CLASSES``)."""
+    for resource_type in resource_types:
+        get_fhir_model_class(resource_type)
+
+
+def _init_worker(
+    resource_type: typing.Optional[str],
+    output: str,
+    return_exceptions: bool,
+    warmup_types: typing.Tuple[str, ...],
+) -> None:
+    """ """
+    global _WORKER_RESOURCE_TYPE, _WORKER_OUTPUT, _WORKER_RETURN_EXCEPTIONS
+    _WORKER_RESOURCE_TYPE = resource_type
+    _WORKER_OUTPUT = output
+    _WORKER_RETURN_EXCEPTIONS = return_exceptions
+    _warmup(warmup_types)
+
+
+def _parse_one(
+    payload: Payload, resource_type: typing.Optional[str]
+) -> FHIRAbstractModel:
+    """ """
+    if isinstance(payload, (bytes, bytearray, str)):
+        payload = FHIRAbstractModel.__config__.json_loads(payload)
+    if resource_type is None:
+        try:
+            resource_type = payload["resourceType"]  # type: ignore
+        except (KeyError, TypeError):
+            raise ValueError("Missing or invalid 'resourceType' value.")
+    return get_fhir_model_class(resource_type).parse_obj(payload)
+
+
+def _transport(
+    index: int,
+    payload: Payload,
+    resource_type: typing.Optional[str],
+    output: str,
+    return_exceptions: bool,
+) -> typing.Tuple[int, bool, bytes]:
+    """Returns (index, error flag, encoded result)."""
+    try:
+        model = _parse_one(payload, resource_type)
+    except (ValueError, TypeError, LookupError) as exc:
+        if not return_exceptions:
+            raise
+        return index, True, pickle.dumps(exc, pickle.HIGHEST_PROTOCOL)
+    return index, False, model.json(return_bytes=True)
+
+
+def _worker_transport(item: typing.Tuple[int, Payload]):
+    """ """
+    return _transport(
+        item[0],
+        item[1],
+        _WORKER_RESOURCE_TYPE,
+        _WORKER_OUTPUT,
+        _WORKER_RETURN_EXCEPTIONS,
+    )
+
+
+def _decode(error: bool, result: bytes, output: str) -> typing.Any:
+    """ """
+    if error:
+        return pickle.loads(result)
+    if output == OUTPUT_JSON:
+        return result
+    data = FHIRAbstractModel.__config__.json_loads(result)
+    if output == OUTPUT_DICT:
+        return data
+    # validated by worker already
+    return get_fhir_model_class(data["resourceType"]).construct_fhir(data)
+
+
+def parse_many(
+    payloads: typing.Iterable[Payload],
+    resource_type: str = None,
+    *,
+    workers: int = None,
+    chunk_size: int = 64,
+    output: str = OUTPUT_MODEL,
+    ordered: bool = True,
+    return_exceptions: bool = False,
+    warmup_types: typing.Iterable[str] = None,
+    mp_context: str = None,
+) -> typing.Iterator[typing.Any]:
+    """Parses (validates) payloads (JSON bytes/str or dict) in process pool,
+    results are lazily yielded.
+
+    :param resource_type: if provided, all payloads are parsed with this
+        model class otherwise each payload is dispatched on its ``resourceType``.
+
+    :param workers: number of worker processes, default is number of CPU.
+        ``0`` or ``1`` means, parse in current process (without pool).
+
+    :param chunk_size: number of payloads are sent to worker at once.
+
+    :param output: ``model`` (default), ``dict`` or ``json`` (bytes, same as
+        ``.json(return_bytes=True)``). ``dict`` and ``json`` results are
+        transferred as JSON bytes, which is much cheaper than pickling model,
+        so ``dict`` is JSON compatible form of ``.dict()`` (i.e. date as str).
+        Models are rebuilt from JSON without validation (``construct_fhir``).
+
+    :param ordered: if ``False``, results are yielded as soon as they are ready,
+        as ``(index, result)`` pairs, where index is position in ``payloads``.
+
+    :param return_exceptions: instead of raising, validation error is yielded
+        in place of the result.
+
+    :param warmup_types: resource types names, those models are imported
+        by worker on start.
+
+    :param mp_context: multiprocessing start method (i.e. ``spawn``).
+    """
+    if output not in OUTPUTS:
+        raise ValueError(f"Invalid output '{output}', allowed are {OUTPUTS}.")
+    if resource_type is not None:
+        # fail fast for unknown type
+        get_fhir_model_class(resource_type)
+    warmups = tuple(warmup_types or ())
+    if resource_type is not None and resource_type not in warmups:
+        warmups = (resource_type,) + warmups
+
+    items = enumerate(payloads)
+
+    if workers is not None and workers < 2:
+        # no transport needed
+        _warmup(warmups)
+        for index, payload in items:
+            try:
+                value: typing.Any = _parse_one(payload, resource_type)
+            except (ValueError, TypeError, LookupError) as exc:
+                if not return_exceptions:
+                    raise
+                value = exc
+            else:
+                if output == OUTPUT_JSON:
+                    value = value.json(return_bytes=True)
+                elif output == OUTPUT_DICT:
+                    value = _decode(False, value.json(return_bytes=True), output)
+            yield value if ordered else (index, value)
+        return
+
+    ctx = multiprocessing.get_context(mp_context)
+    with ctx.Pool(
+        processes=workers,
+        initializer=_init_worker,
+        initargs=(resource_type, output, return_exceptions, warmups),
+    ) as pool:
+        if ordered:
+            for _, error, result in pool.imap(
+                _worker_transport, items, chunksize=chunk_size
+            ):
+                yield _decode(error, result, output)
+        else:
+            for index, error, result in pool.imap_unordered(
+                _worker_transport, items, chunksize=chunk_size
+            ):
+                yield index, _decode(error, result, output)
+
+
+__all__ = ["parse_many"]
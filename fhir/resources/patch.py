@@ -0,0 +1,835 @@
+# _*_ coding: utf-8 _*_
+"""Structural diff between two model instances of the same class and the
+matching patch application, in RFC 6902 JSON Patch
+(https://datatracker.ietf.org/doc/html/rfc6902) or FHIRPath Patch
+(https://hl7.org/fhir/fhirpatch.html) format."""
+import datetime
+import decimal
+import json
+import re
+import typing
+from functools import lru_cache
+
+from pydantic.error_wrappers import ErrorWrapper, ValidationError
+from pydantic.fields import SHAPE_LIST
+from pydantic.utils import ROOT_KEY
+
+from fhir.resources.core.fhirabstractmodel import (
+    FHIR_COMMENTS_FIELD_NAME,
+    FHIRAbstractModel,
+)
+from fhir.resources.core.utils.common import (
+    get_fhir_type_name,
+    normalize_fhir_type_class,
+)
+from fhir.resources.core.utils.construct import get_fhir_model_class_getter
+from fhir.resources.core.utils.content import get_copy_plan
+from fhir.resources.core.validators import get_fields_by_alias
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+JSON_PATCH = "json-patch"
+FHIRPATH_PATCH = "fhirpath"
+
+# path segment, element name (output key) or list index
+Segment = typing.Union[str, int]
+
+FHIRPATH_PATH_SEGMENT = re.compile(
+    r"^(?P<name>[A-Za-z_][A-Za-z0-9_]*)(?P<indexes>(?:\[\d+\])*)$"
+)
+FHIRPATH_PATH_INDEX = re.compile(r"\[(\d+)\]")
+
+
+class PatchError(ValueError):
+    """Invalid patch document or the patch cannot be applied to the model."""
+
+
+class Operation(typing.NamedTuple):
+    """Patch operation, independent of output format. ``path`` is tuple of
+    output keys and list indexes from the root model, ``type_name`` is the
+    FHIR type name of ``value``."""
+
+    op: str
+    path: typing.Tuple[Segment, ...]
+    value: typing.Any = None
+    type_name: typing.Optional[str] = None
+
+
+class DiffPlanEntry(typing.NamedTuple):
+    """ """
+
+    field_key: str
+    alias: str
+    is_primitive: bool
+    is_list: bool
+    type_name: str
+    ext_key: typing.Optional[str]
+    ext_alias: typing.Optional[str]
+    ext_is_list: bool
+
+
+@lru_cache(maxsize=None)
+def get_diff_plan(
+    klass: typing.Type[FHIRAbstractModel],
+) -> typing.Tuple[DiffPlanEntry, ...]:
+    """Serialization plan (``elements_sequence`` order) with list flags and
+    FHIR type names of elements, compiled once per class."""
+    plan = list()
+    for entry in klass.get_serialization_plan():
+        field_key, alias, is_primitive, ext_key, ext_alias = entry
+        field = klass.__fields__[field_key]
+        ext_is_list = False
+        if ext_key is not None:
+            ext_is_list = klass.__fields__[ext_key].shape == SHAPE_LIST
+        plan.append(
+            DiffPlanEntry(
+                field_key,
+                alias,
+                is_primitive,
+                field.shape == SHAPE_LIST,
+                get_fhir_type_name(field.type_),
+                ext_key,
+                ext_alias,
+                ext_is_list,
+            )
+        )
+    return tuple(plan)
+
+
+def _normalize(value):
+    """Empty list is same as missing element."""
+    if value is None or (isinstance(value, list) and len(value) == 0):
+        return None
+    return value
+
+
+def _primitive_equal(a, b) -> bool:
+    """Equality of primitive values, sensitive to representation (decimal
+    precision, timezone offset), as it's visible in JSON."""
+    if a.__class__ is not b.__class__:
+        return False
+    if isinstance(a, decimal.Decimal):
+        return a.as_tuple() == b.as_tuple()
+    if isinstance(a, (datetime.date, datetime.time)):
+        return a.isoformat() == b.isoformat()
+    return a == b
+
+
+def values_equal(a, b) -> bool:
+    """Deep equality of element values, without serialization (unlike
+    pydantic's ``==``, which compares ``dict()`` of both side)."""
+    if a is b:
+        return True
+    if a is None or b is None:
+        return False
+    if isinstance(a, FHIRAbstractModel):
+        if a.__class__ is not b.__class__:
+            return False
+        dict_a = a.__dict__
+        dict_b = b.__dict__
+        for key in a.__fields__:
+            if not values_equal(
+                _normalize(dict_a.get(key)), _normalize(dict_b.get(key))
+            ):
+                return False
+        return True
+    if isinstance(a, list):
+        if not isinstance(b, list) or len(a) != len(b):
+            return False
+        for item_a, item_b in zip(a, b):
+            if not values_equal(item_a, item_b):
+                return False
+        return True
+    if isinstance(b, (FHIRAbstractModel, list)):
+        return False
+    return _primitive_equal(a, b)
+
+
+class Differ:
+    """Collects operations those transform ``a`` into ``b``. With
+    ``explode_extensions``, primitive extensions are compared as elements
+    of the primitive (FHIRPath Patch has no ``_element`` path)."""
+
+    def __init__(self, explode_extensions: bool = False):
+        """ """
+        self.explode_extensions = explode_extensions
+        self.operations: typing.List[Operation] = list()
+
+    def diff_model(self, a, b, path: typing.Tuple[Segment, ...]):
+        """ """
+        dict_a = a.__dict__
+        dict_b = b.__dict__
+        for entry in get_diff_plan(a.__class__):
+            value_a = _normalize(dict_a.get(entry.field_key))
+            value_b = _normalize(dict_b.get(entry.field_key))
+            if value_a is not value_b:
+                self.diff_field(
+                    value_a,
+                    value_b,
+                    path + (entry.alias,),
+                    entry.is_list,
+                    entry.is_primitive,
+                    entry.type_name,
+                )
+            if entry.ext_key is None:
+                continue
+            value_a = _normalize(dict_a.get(entry.ext_key))
+            value_b = _normalize(dict_b.get(entry.ext_key))
+            if value_a is value_b:
+                continue
+            if self.explode_extensions:
+                self.diff_extension(
+                    value_a, value_b, path + (entry.ext_alias,), entry.ext_is_list
+                )
+            else:
+                self.diff_field(
+                    value_a,
+                    value_b,
+                    path + (entry.ext_alias,),
+                    entry.ext_is_list,
+                    False,
+                    "FHIRPrimitiveExtension",
+                )
+        if self.explode_extensions is False:
+            value_a = _normalize(dict_a.get(FHIR_COMMENTS_FIELD_NAME))
+            value_b = _normalize(dict_b.get(FHIR_COMMENTS_FIELD_NAME))
+            if value_a is not value_b:
+                self.diff_field(
+                    value_a,
+                    value_b,
+                    path + (FHIR_COMMENTS_FIELD_NAME,),
+                    False,
+                    True,
+                    "string",
+                )
+
+    def diff_field(self, a, b, path, is_list: bool, is_primitive: bool, type_name):
+        """ """
+        if a is None:
+            if b is not None:
+                self.operations.append(Operation("add", path, b, type_name))
+        elif b is None:
+            self.operations.append(Operation("remove", path, a, type_name))
+        elif is_list:
+            self.diff_list(a, b, path, is_primitive, type_name)
+        else:
+            self.diff_item(a, b, path, is_primitive, type_name)
+
+    def diff_item(self, a, b, path, is_primitive: bool, type_name):
+        """ """
+        if a is b:
+            return
+        if (
+            is_primitive
+            or not isinstance(a, FHIRAbstractModel)
+            or a.__class__ is not b.__class__
+        ):
+            # primitive or polymorphic (``Resource``) element.
+            if not values_equal(a, b):
+                self.operations.append(Operation("replace", path, b, type_name))
+            return
+        self.diff_model(a, b, path)
+
+    def diff_list(self, a, b, path, is_primitive: bool, type_name):
+        """Common head and tail items are skipped, remaining items are
+        compared pairwise, then surplus items are added or removed."""
+        len_a = len(a)
+        len_b = len(b)
+        start = 0
+        while start < len_a and start < len_b and values_equal(a[start], b[start]):
+            start += 1
+        end = 0
+        while (
+            end < len_a - start
+            and end < len_b - start
+            and values_equal(a[len_a - 1 - end], b[len_b - 1 - end])
+        ):
+            end += 1
+        middle_a = a[start : len_a - end]
+        middle_b = b[start : len_b - end]
+        common = min(len(middle_a), len(middle_b))
+        for index in range(common):
+            self.diff_item(
+                middle_a[index],
+                middle_b[index],
+                path + (start + index,),
+                is_primitive,
+                type_name,
+            )
+        for index in range(common, len(middle_b)):
+            self.operations.append(
+                Operation("add", path + (start + index,), middle_b[index], type_name)
+            )
+        for index in range(common, len(middle_a)):
+            self.operations.append(
+                Operation(
+                    "remove", path + (start + common,), middle_a[index], type_name
+                )
+            )
+
+    def diff_extension(self, a, b, path, is_list: bool):
+        """Primitive extension(s) compared as elements (``id``, ``extension``)
+        of the primitive value, missing one is same as empty."""
+        if is_list is False:
+            a, b = [a], [b]
+        for index in range(max(len(a or ()), len(b or ()))):
+            ext_a = a[index] if a is not None and index < len(a) else None
+            ext_b = b[index] if b is not None and index < len(b) else None
+            if ext_a is ext_b:
+                continue
+            if ext_a is None:
+                ext_a = ext_b.__class__.construct()
+            elif ext_b is None:
+                ext_b = ext_a.__class__.construct()
+            self.diff_model(ext_a, ext_b, path + ((index,) if is_list else ()))
+
+
+def _to_json_value(value, encoder: typing.Callable[[typing.Any], typing.Any]):
+    """JSON compatible value (as ``json.loads`` gives), models and primitive
+    values (i.e. ``date``, ``Decimal``) are encoded as by ``json()``."""
+    if isinstance(value, FHIRAbstractModel):
+        return json.loads(value.json())
+    if isinstance(value, list):
+        return [_to_json_value(item, encoder) for item in value]
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    return encoder(value)
+
+
+def _json_pointer(path: typing.Tuple[Segment, ...]) -> str:
+    """ """
+    return "".join(
+        "/" + str(segment).replace("~", "~0").replace("/", "~1") for segment in path
+    )
+
+
+def _fhirpath(root: str, path: typing.Tuple[Segment, ...]) -> str:
+    """Primitive extension keys (``_element``) are mapped to the primitive,
+    as extensions are the children of primitive in FHIRPath."""
+    parts = [root]
+    for segment in path:
+        if segment.__class__ is int:
+            parts.append(f"[{segment}]")
+        elif segment.startswith("_"):
+            parts.append("." + segment[1:])
+        else:
+            parts.append("." + segment)
+    return "".join(parts)
+
+
+def to_json_patch(
+    operations: typing.Iterable[Operation],
+    model_class: typing.Type[FHIRAbstractModel] = FHIRAbstractModel,
+) -> typing.List[typing.Dict[str, typing.Any]]:
+    """JSON serializable list of operations."""
+    encoder = model_class.get_json_encoder()
+    patch = list()
+    for operation in operations:
+        item = {"op": operation.op, "path": _json_pointer(operation.path)}
+        if operation.op != "remove":
+            item["value"] = _to_json_value(operation.value, encoder)
+        patch.append(item)
+    return patch
+
+
+@lru_cache(maxsize=None)
+def get_parameter_value_fields(
+    klass: typing.Type[FHIRAbstractModel],
+) -> typing.Dict[str, str]:
+    """FHIR type name to ``value[x]`` field name of ``Parameters.parameter``
+    (``part``) class."""
+    fields = dict()
+    for field in klass.__fields__.values():
+        if field.field_info.extra.get("one_of_many", None) != "value":
+            continue
+        fields[get_fhir_type_name(field.type_)] = field.name
+    return fields
+
+
+def _parameter_class(model_class):
+    """ """
+    parameters_class = get_fhir_model_class_getter(model_class)("Parameters")
+    return parameters_class, get_fhir_model_class_getter(model_class)(
+        normalize_fhir_type_class(
+            parameters_class.__fields__["parameter"].type_
+        ).__resource_type__
+    )
+
+
+def _value_part(name: str, value, type_name, value_fields):
+    """Parameter part of value, complex types those are not allowed as
+    ``value[x]`` are expressed as nested parts."""
+    if isinstance(value, FHIRAbstractModel):
+        if value.has_resource_base():
+            return {"name": name, "resource": value.dict()}
+        type_name = value.get_resource_type()
+        if type_name not in value_fields:
+            return {"name": name, "part": _model_parts(value, value_fields)}
+        return {"name": name, value_fields[type_name]: value.dict()}
+    return {"name": name, value_fields.get(type_name, "valueString"): value}
+
+
+def _model_parts(model: FHIRAbstractModel, value_fields) -> typing.List[dict]:
+    """ """
+    parts = list()
+    dict_ = model.__dict__
+    for entry in get_diff_plan(model.__class__):
+        value = _normalize(dict_.get(entry.field_key))
+        if value is None:
+            continue
+        for item in value if entry.is_list else (value,):
+            if item is not None:
+                parts.append(
+                    _value_part(entry.alias, item, entry.type_name, value_fields)
+                )
+    return parts
+
+
+def to_fhirpath_patch(
+    operations: typing.Iterable[Operation],
+    model_class: typing.Type[FHIRAbstractModel],
+) -> FHIRAbstractModel:
+    """``Parameters`` resource of FHIRPath Patch operations. Whole list
+    additions and removals are expanded to per item operations."""
+    parameters_class, parameter_class = _parameter_class(model_class)
+    value_fields = get_parameter_value_fields(parameter_class)
+    root = model_class.get_resource_type()
+    parameters = list()
+
+    def operation(type_, path, value=None, type_name=None, **extra):
+        parts = [
+            {"name": "type", "valueCode": type_},
+            {"name": "path", "valueString": path},
+        ]
+        if "name" in extra:
+            parts.append({"name": "name", "valueString": extra["name"]})
+        if "index" in extra:
+            parts.append({"name": "index", "valueInteger": extra["index"]})
+        if value is not None:
+            parts.append(_value_part("value", value, type_name, value_fields))
+        parameters.append({"name": "operation", "part": parts})
+
+    for op, path, value, type_name in operations:
+        last = path[-1]
+        if op == "replace" and value is not None:
+            operation("replace", _fhirpath(root, path), value, type_name)
+        elif op == "add" and last.__class__ is int:
+            operation(
+                "insert", _fhirpath(root, path[:-1]), value, type_name, index=last
+            )
+        elif op == "add":
+            parent = _fhirpath(root, path[:-1])
+            name = last[1:] if last.startswith("_") else last
+            for item in value if value.__class__ is list else (value,):
+                operation("add", parent, item, type_name, name=name)
+        elif op == "remove" and last.__class__ is not int and value.__class__ is list:
+            for index in reversed(range(len(value))):
+                operation("delete", _fhirpath(root, path + (index,)))
+        else:
+            operation("delete", _fhirpath(root, path))
+    return parameters_class.parse_obj(
+        {"resourceType": "Parameters", "parameter": parameters}
+    )
+
+
+def diff(
+    a: FHIRAbstractModel, b: FHIRAbstractModel, format: str = JSON_PATCH
+) -> typing.Union[typing.List[typing.Dict[str, typing.Any]], FHIRAbstractModel]:
+    """Minimal patch, that transforms ``a`` into ``b`` (models of same class).
+    Models are walked in ``elements_sequence`` order, identical sub-objects
+    are skipped without comparison and lists are compared by items, so that
+    single insertion or removal in list is single operation.
+
+    :param format: ``json-patch`` for RFC 6902 operations (list of dict)
+        or ``fhirpath`` for FHIRPath Patch ``Parameters`` resource.
+    """
+    if a.__class__ is not b.__class__:
+        raise ValueError(
+            f"Cannot diff {a.__class__.__name__} with {b.__class__.__name__}, "
+            "models must be of same class."
+        )
+    if format not in (JSON_PATCH, FHIRPATH_PATCH):
+        raise ValueError(
+            f"Invalid patch format '{format}', "
+            f"expected '{JSON_PATCH}' or '{FHIRPATH_PATCH}'."
+        )
+    differ = Differ(explode_extensions=format == FHIRPATH_PATCH)
+    if a is not b:
+        differ.diff_model(a, b, ())
+    if format == FHIRPATH_PATCH:
+        return to_fhirpath_patch(differ.operations, a.__class__)
+    return to_json_patch(differ.operations, a.__class__)
+
+
+class PartsValue(typing.NamedTuple):
+    """FHIRPath Patch ``value`` given as parts, converted to element data
+    when the target element (type) is known."""
+
+    parts: typing.List[FHIRAbstractModel]
+
+
+def _parse_json_pointer(pointer: str) -> typing.Tuple[Segment, ...]:
+    """ """
+    if pointer == "":
+        return ()
+    if not isinstance(pointer, str) or not pointer.startswith("/"):
+        raise PatchError(f"Invalid JSON pointer '{pointer}'.")
+    path = list()
+    for token in pointer[1:].split("/"):
+        token = token.replace("~1", "/").replace("~0", "~")
+        path.append(int(token) if token.isdigit() else token)
+    return tuple(path)
+
+
+def _parse_fhirpath(
+    expression: str, model: FHIRAbstractModel
+) -> typing.Tuple[Segment, ...]:
+    """Simple FHIRPath of names and indexes (``Patient.name[0].given``), that
+    starts with the resource type of model."""
+    names = expression.split(".")
+    if names[0] != model.get_resource_type():
+        raise PatchError(
+            f"Path '{expression}' doesn't start with '{model.get_resource_type()}'."
+        )
+    path: typing.List[Segment] = list()
+    for name in names[1:]:
+        match = FHIRPATH_PATH_SEGMENT.match(name)
+        if match is None:
+            raise PatchError(f"Unsupported FHIRPath Patch path '{expression}'.")
+        path.append(match.group("name"))
+        path.extend(int(i) for i in FHIRPATH_PATH_INDEX.findall(match.group("indexes")))
+    return tuple(path)
+
+
+def _parameter_parts(parameter) -> typing.Dict[str, FHIRAbstractModel]:
+    """ """
+    return {part.name: part for part in parameter.part or ()}
+
+
+def _parameter_value(parameter):
+    """Value of ``Parameters.parameter`` (``part``), ``value[x]``,
+    ``resource`` or nested parts."""
+    if parameter.resource is not None:
+        return parameter.resource
+    if parameter.part:
+        return PartsValue(parameter.part)
+    dict_ = parameter.__dict__
+    for field_name in get_parameter_value_fields(parameter.__class__).values():
+        value = dict_.get(field_name)
+        if value is not None:
+            return value
+    return None
+
+
+def _from_fhirpath_patch(
+    model: FHIRAbstractModel, parameters: FHIRAbstractModel
+) -> typing.Iterator[typing.Tuple[str, tuple, typing.Any, typing.Any]]:
+    """Yields FHIRPath Patch operations as (op, path, value, from path)."""
+    for parameter in parameters.parameter or ():
+        if parameter.name != "operation":
+            raise PatchError(f"Invalid parameter '{parameter.name}' in patch.")
+        parts = _parameter_parts(parameter)
+        try:
+            type_ = parts["type"].valueCode
+            path = _parse_fhirpath(parts["path"].valueString, model)
+        except KeyError as exc:
+            raise PatchError(f"Operation part {exc} is required.")
+        value = None
+        if "value" in parts:
+            value = _parameter_value(parts["value"])
+        if type_ == "add":
+            if "name" not in parts:
+                raise PatchError("Operation part 'name' is required for 'add'.")
+            yield "append", path + (parts["name"].valueString,), value, None
+        elif type_ == "insert":
+            yield "add", path + (parts["index"].valueInteger,), value, None
+        elif type_ == "delete":
+            yield "delete", path, None, None
+        elif type_ == "replace":
+            yield "replace", path, value, None
+        elif type_ == "move":
+            source = path + (parts["source"].valueInteger,)
+            yield "move", path + (parts["destination"].valueInteger,), None, source
+        else:
+            raise PatchError(f"Unknown FHIRPath Patch operation type '{type_}'.")
+
+
+def _from_json_patch(
+    patch: typing.Iterable[typing.Dict[str, typing.Any]]
+) -> typing.Iterator[typing.Tuple[str, tuple, typing.Any, typing.Any]]:
+    """Yields JSON Patch operations as (op, path, value, from path)."""
+    for item in patch:
+        try:
+            op = item["op"]
+            path = _parse_json_pointer(item["path"])
+        except (KeyError, TypeError):
+            raise PatchError(f"Invalid JSON Patch operation {item!r}.")
+        if op not in ("add", "remove", "replace", "move", "copy", "test"):
+            raise PatchError(f"Unknown JSON Patch operation '{op}'.")
+        if op in ("add", "replace", "test") and "value" not in item:
+            raise PatchError(f"Operation '{op}' requires 'value'.")
+        from_ = None
+        if op in ("move", "copy"):
+            if "from" not in item:
+                raise PatchError(f"Operation '{op}' requires 'from'.")
+            from_ = _parse_json_pointer(item["from"])
+        yield op, path, item.get("value"), from_
+
+
+def _get_field(klass, key: Segment, rest: typing.Tuple[Segment, ...]):
+    """Field by output key, the path to the children (``extension``, ``id``)
+    of primitive is redirected to the primitive extension field."""
+    if key.__class__ is int:
+        raise PatchError(f"Unexpected list index {key} for {klass.__name__}.")
+    fields = get_fields_by_alias(klass)
+    field = fields.get(key)
+    if field is None or key == "resourceType":
+        raise PatchError(f"{klass.__name__} has no element '{key}'.")
+    if len(rest) > 1 or (rest and rest[0].__class__ is not int and rest[0] != "-"):
+        ext_field = fields.get(f"_{key}")
+        if ext_field is not None and ext_field.name.endswith("__ext"):
+            return ext_field
+    return field
+
+
+def _decode_value(value, field, klass):
+    """ """
+    if value.__class__ is PartsValue:
+        type_ = normalize_fhir_type_class(field.type_)
+        value_class = get_fhir_model_class_getter(klass)(type_.__resource_type__)
+        fields = get_fields_by_alias(value_class)
+        data: typing.Dict[str, typing.Any] = dict()
+        for part in value.parts:
+            part_field = fields.get(part.name)
+            if part_field is None:
+                raise PatchError(
+                    f"{value_class.__name__} has no element '{part.name}'."
+                )
+            part_value = _decode_value(_parameter_value(part), part_field, value_class)
+            if part_field.shape == SHAPE_LIST:
+                data.setdefault(part.name, list()).append(part_value)
+            else:
+                data[part.name] = part_value
+        return data
+    return value
+
+
+def _list_index(segment: Segment, items: list, insert: bool = False) -> int:
+    """ """
+    if segment == "-" and insert:
+        return len(items)
+    if segment.__class__ is not int or segment > len(items) - (0 if insert else 1):
+        raise PatchError(f"List index {segment!r} is out of range.")
+    return segment
+
+
+def _empty_extension(field, klass):
+    """ """
+    type_ = normalize_fhir_type_class(field.type_)
+    return get_fhir_model_class_getter(klass)(type_.__resource_type__).construct()
+
+
+def _get(node, path: typing.Tuple[Segment, ...]):
+    """Value at path, ``None`` if not exists."""
+    for index, segment in enumerate(path):
+        if node is None:
+            return None
+        if isinstance(node, FHIRAbstractModel):
+            field = _get_field(node.__class__, segment, path[index + 1 :])
+            node = node.__dict__.get(field.name)
+        elif segment.__class__ is int and segment < len(node):
+            node = node[segment]
+        else:
+            return None
+    return node
+
+
+def _apply(
+    node: FHIRAbstractModel,
+    op: str,
+    path: tuple,
+    value,
+    touched: typing.Dict[int, FHIRAbstractModel],
+) -> FHIRAbstractModel:
+    """Copy of node with operation applied at path. Nodes along the path are
+    shallow copied and only the changed field of each is validated, root
+    validators of touched nodes run after all operations (see
+    ``_validate_touched``), as operations might be valid only together
+    (i.e. ``remove`` and ``add`` of choice type element)."""
+    klass = node.__class__
+    key, rest = path[0], path[1:]
+    field = _get_field(klass, key, rest)
+    is_list = field.shape == SHAPE_LIST
+    current = node.__dict__.get(field.name)
+    if not rest:
+        if op in ("remove", "delete"):
+            if current is None and op == "remove":
+                raise PatchError(f"Element '{key}' doesn't exist.")
+            new_value = None
+        elif op == "replace" and current is None:
+            raise PatchError(f"Element '{key}' doesn't exist.")
+        elif op == "append" and is_list:
+            new_value = list(current or ()) + [_decode_value(value, field, klass)]
+        else:
+            new_value = _decode_value(value, field, klass)
+    elif is_list:
+        items = list(current or ())
+        if len(rest) == 1:
+            index = _list_index(rest[0], items, insert=op == "add")
+            if op == "add":
+                items.insert(index, _decode_value(value, field, klass))
+            elif op in ("remove", "delete"):
+                del items[index]
+            else:
+                items[index] = _decode_value(value, field, klass)
+            new_value = items or None
+        else:
+            index = rest[0]
+            if field.name.endswith("__ext") and index.__class__ is int:
+                # aligned with primitive values, might be shorter or ``None``
+                items.extend([None] * (index + 1 - len(items)))
+            index = _list_index(index, items)
+            child = items[index]
+            if child is None and field.name.endswith("__ext"):
+                child = _empty_extension(field, klass)
+            elif child is None:
+                raise PatchError(f"Element '{key}[{index}]' doesn't exist.")
+            items[index] = _apply(child, op, rest[1:], value, touched)
+            new_value = items if any(item is not None for item in items) else None
+    else:
+        child = current
+        if child is None and field.name.endswith("__ext"):
+            child = _empty_extension(field, klass)
+        elif child is None:
+            raise PatchError(f"Element '{key}' doesn't exist.")
+        elif not isinstance(child, FHIRAbstractModel):
+            raise PatchError(f"Element '{key}' is primitive.")
+        new_value = _apply(child, op, rest, value, touched)
+    if (
+        new_value is None
+        and node.get_resource_type() == "FHIRPrimitiveExtension"
+        and all(
+            _normalize(val) is None
+            for name, val in node.__dict__.items()
+            if name not in (field.name, "resource_type")
+        )
+    ):
+        # emptied primitive extension is removed, it's invalid as empty.
+        return None
+    others = {name: val for name, val in node.__dict__.items() if name != field.name}
+    new_value, error = field.validate(new_value, others, loc=field.alias, cls=klass)
+    if error:
+        raise ValidationError([error], klass)
+    node = node.copy()
+    node.__dict__[field.name] = new_value
+    node.__fields_set__.add(field.name)
+    touched[id(node)] = node
+    return node
+
+
+def _validate_touched(
+    node: FHIRAbstractModel, touched: typing.Dict[int, FHIRAbstractModel]
+):
+    """Runs root validators of nodes, those are copied by ``_apply``
+    (untouched sub-trees are skipped)."""
+    klass = node.__class__
+    values = node.__dict__
+    for name, is_model in get_copy_plan(klass):
+        value = values[name]
+        if not is_model or value is None:
+            continue
+        for item in value if isinstance(value, list) else (value,):
+            if item is not None and id(item) in touched:
+                _validate_touched(item, touched)
+    for validator in klass.__pre_root_validators__:
+        try:
+            values = validator(klass, values)
+        except (ValueError, TypeError, AssertionError) as exc:
+            raise ValidationError([ErrorWrapper(exc, loc=ROOT_KEY)], klass)
+    errors = list()
+    for skip_on_failure, validator in klass.__post_root_validators__:
+        if skip_on_failure and errors:
+            continue
+        try:
+            values = validator(klass, values)
+        except (ValueError, TypeError, AssertionError) as exc:
+            errors.append(ErrorWrapper(exc, loc=ROOT_KEY))
+    if errors:
+        raise ValidationError(errors, klass)
+    object.__setattr__(node, "__dict__", values)
+
+
+def _normalize_json(value):
+    """Comparable form of JSON or model value, for ``test`` operation."""
+    if isinstance(value, FHIRAbstractModel):
+        value = value.dict()
+    if isinstance(value, dict):
+        return {key: _normalize_json(val) for key, val in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize_json(item) for item in value]
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return decimal.Decimal(str(value))
+    return value
+
+
+def apply_patch(
+    model: FHIRAbstractModel,
+    patch: typing.Union[
+        typing.List[typing.Dict[str, typing.Any]], FHIRAbstractModel, dict
+    ],
+) -> FHIRAbstractModel:
+    """Applies JSON Patch (list of operations) or FHIRPath Patch
+    (``Parameters`` resource or its dict) and returns the patched copy of
+    model, the given model is not modified. Only the touched elements (and
+    their ancestors' own fields) are revalidated.
+
+    :raises PatchError: patch is invalid, cannot be applied or the patched
+        model is invalid (``__cause__`` is the ``ValidationError``).
+    """
+    if isinstance(patch, dict) and patch.get("resourceType") == "Parameters":
+        patch = _parameter_class(model.__class__)[0].parse_obj(patch)
+    if isinstance(patch, FHIRAbstractModel):
+        if patch.get_resource_type() != "Parameters":
+            raise PatchError("FHIRPath Patch must be Parameters resource.")
+        operations = _from_fhirpath_patch(model, patch)
+    else:
+        operations = _from_json_patch(patch)
+
+    try:
+        return _apply_operations(model, operations)
+    except ValidationError as exc:
+        raise PatchError(f"Patched model is invalid: {exc}") from exc
+
+
+def _apply_operations(
+    model: FHIRAbstractModel,
+    operations: typing.Iterable[typing.Tuple[str, tuple, typing.Any, typing.Any]],
+) -> FHIRAbstractModel:
+    """ """
+    touched: typing.Dict[int, FHIRAbstractModel] = dict()
+    for op, path, value, from_ in operations:
+        if op == "test":
+            if _normalize_json(_get(model, path)) != _normalize_json(value):
+                raise PatchError(f"Test operation failed at {_json_pointer(path)}.")
+            continue
+        if op in ("move", "copy"):
+            value = _get(model, from_)
+            if value is None:
+                raise PatchError(f"Element {_json_pointer(from_)} doesn't exist.")
+            if op == "move":
+                model = _apply(model, "remove", from_, None, touched)
+            op = "add"
+        if not path:
+            if op not in ("add", "replace") or isinstance(value, PartsValue):
+                raise PatchError("Only the whole document can be replaced.")
+            model = model.__class__.parse_obj(
+                _to_json_value(value, model.get_json_encoder())
+            )
+            touched.clear()
+            continue
+        model = _apply(model, op, path, value, touched)
+    if id(model) in touched:
+        _validate_touched(model, touched)
+    return model
@@ -0,0 +1,649 @@
+# _*_ coding: utf-8 _*_
+"""Profile (``StructureDefinition``) conformance validation. Snapshot
+elements are compiled once (per profile url & version) into a tree of
+element rules: cardinality, fixed/pattern values, type restriction of
+choice elements, slicing (discriminators) and binding, only the elements
+those constrain instances are kept, so validation traverses only them.
+https://hl7.org/fhir/profiling.html"""
+import typing
+
+from fhir.resources.core.fhirabstractmodel import FHIRAbstractModel
+from fhir.resources.core.utils.construct import get_fhir_model_class_getter
+from fhir.resources.core.validators import get_choice_groups
+
+from .fhirpath import MemberField, get_member_fields, get_model_class, is_type
+from .patch import values_equal
+from .structuredefinition import StructureDefinition
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+SEVERITY_ERROR = "error"
+SEVERITY_WARNING = "warning"
+
+# binding strength to issue severity of code, not in value set.
+BINDING_SEVERITIES = {
+    "required": SEVERITY_ERROR,
+    "extensible": SEVERITY_WARNING,
+}
+SUPPORTED_DISCRIMINATORS = ("value", "pattern", "exists", "type")
+
+# terminology check, (value set url, system, code) -> membership,
+# ``None`` means unknown (not checked).
+Terminology = typing.Callable[[str, typing.Optional[str], str], typing.Optional[bool]]
+
+_COMPILED_PROFILES: typing.Dict[
+    typing.Tuple[str, typing.Optional[str]], "CompiledProfile"
+] = dict()
+
+
+class ProfileError(ValueError):
+    """StructureDefinition cannot be compiled."""
+
+
+class ProfileIssue(typing.NamedTuple):
+    """ """
+
+    severity: str
+    element: str  # ElementDefinition.id
+    location: str  # instance path, i.e. ``Patient.name[0].given``
+    message: str
+
+
+class Matcher(typing.NamedTuple):
+    """Discriminator of slice, ``expected`` is fixed or pattern value,
+    exists flag or type names, as per ``kind``."""
+
+    kind: str
+    path: typing.Tuple[str, ...]
+    expected: typing.Any
+
+
+class ElementRule(typing.NamedTuple):
+    """Compiled constraints of element, ``name`` is the element name in its
+    parent (choice type prefix for ``value[x]``)."""
+
+    id: str
+    name: str
+    min: int
+    max: typing.Optional[int]
+    fixed: typing.Any
+    pattern: typing.Any
+    disallowed: typing.FrozenSet[str]
+    binding: typing.Optional[typing.Tuple[str, str]]
+    slicing_closed: bool
+    slices: typing.Tuple["SliceRule", ...]
+    children: typing.Tuple["ElementRule", ...]
+
+
+class SliceRule(typing.NamedTuple):
+    """ """
+
+    name: str
+    rule: ElementRule
+    matchers: typing.Tuple[Matcher, ...]
+
+
+def _parse_max(value: typing.Optional[str]) -> typing.Optional[int]:
+    """ """
+    if value is None or value == "*":
+        return None
+    return int(value)
+
+
+def _choice_value(element: FHIRAbstractModel, prefix: str):
+    """Value of ``fixed[x]``/``pattern[x]`` of ElementDefinition."""
+    for group_prefix, _, fields, _ in get_choice_groups(element.__class__)[0]:
+        if group_prefix != prefix:
+            continue
+        dict_ = element.__dict__
+        for field_name in fields:
+            value = dict_.get(field_name)
+            if value is not None:
+                return value
+    return None
+
+
+def _binding_value_set(binding) -> typing.Optional[str]:
+    """``valueSet`` (R4B) or ``valueSetUri``/``valueSetReference`` (STU3)."""
+    value_set = getattr(binding, "valueSet", None) or getattr(
+        binding, "valueSetUri", None
+    )
+    if value_set is None:
+        reference = getattr(binding, "valueSetReference", None)
+        if reference is not None:
+            value_set = reference.reference
+    return value_set
+
+
+def _type_profiles(type_) -> typing.List[str]:
+    """ """
+    profile = getattr(type_, "profile", None)
+    if profile is None:
+        return []
+    if isinstance(profile, str):
+        return [profile]
+    return list(profile)
+
+
+class _ElementBuilder:
+    """Mutable element node, while reading snapshot elements."""
+
+    def __init__(self, element, name: str, klass):
+        """ """
+        self.element = element
+        self.name = name
+        self.klass = klass
+        self.children: typing.List["_ElementBuilder"] = list()
+        self.slices: typing.List[typing.Tuple[str, "_ElementBuilder"]] = list()
+        self.members: typing.Tuple[MemberField, ...] = ()
+
+    @property
+    def id(self) -> str:
+        """ """
+        return self.element.id or self.element.path
+
+    def type_codes(self) -> typing.List[str]:
+        """ """
+        return [type_.code for type_ in self.element.type or () if type_.code]
+
+    def child(self, name: str) -> typing.Optional["_ElementBuilder"]:
+        """ """
+        for builder in self.children:
+            if builder.name == name:
+                return builder
+        return None
+
+    def cardinality(self) -> typing.Tuple[int, typing.Optional[int]]:
+        """Cardinality, only if it's constrained than base definition."""
+        element = self.element
+        min_ = element.min or 0
+        max_ = _parse_max(element.max)
+        base = element.base
+        if base is not None:
+            if min_ <= (base.min or 0):
+                min_ = 0
+            base_max = _parse_max(base.max)
+            if max_ is not None and base_max is not None and max_ >= base_max:
+                max_ = None
+        return min_, max_
+
+    def matchers(self, discriminators) -> typing.Optional[typing.Tuple[Matcher, ...]]:
+        """Matchers of slice from the discriminators of sliced element,
+        ``None`` if any of discriminator is not supported."""
+        matchers = list()
+        for discriminator in discriminators:
+            kind = discriminator.type
+            path = discriminator.path
+            if kind not in SUPPORTED_DISCRIMINATORS:
+                return None
+            names: typing.Tuple[str, ...] = ()
+            if path != "$this":
+                names = tuple(
+                    name[:-3] if name.endswith("[x]") else name
+                    for name in path.split(".")
+                )
+            builder: typing.Optional[_ElementBuilder] = self
+            for name in names:
+                builder = builder.child(name) if builder is not None else None
+            expected: typing.Any = None
+            if builder is not None:
+                element = builder.element
+                if kind == "exists":
+                    if element.min and element.min > 0:
+                        expected = True
+                    elif element.max == "0":
+                        expected = False
+                elif kind == "type":
+                    expected = frozenset(builder.type_codes()) or None
+                else:
+                    expected = _choice_value(element, "fixed")
+                    if expected is None:
+                        expected = _choice_value(element, "pattern")
+                        kind = "pattern"
+                    else:
+                        kind = "value"
+            if expected is None and names == ("url",) and discriminator.type == "value":
+                # extension slice, the url is the canonical of its profile.
+                for type_ in self.element.type or ():
+                    for profile in _type_profiles(type_):
+                        expected = profile
+            if expected is None:
+                return None
+            matchers.append(Matcher(kind, names, expected))
+        return tuple(matchers)
+
+    def build(
+        self, with_bindings: bool, unsupported: typing.List[typing.Tuple[str, str]]
+    ) -> typing.Optional[ElementRule]:
+        """Frozen rule, ``None`` if element (and descendants) has nothing
+        to check."""
+        element = self.element
+        children = list()
+        for child in self.children:
+            rule = child.build(with_bindings, unsupported)
+            if rule is not None:
+                children.append(rule)
+        slices = list()
+        slicing_closed = False
+        if self.slices and element.slicing is not None:
+            matchers_ok = True
+            for slice_name, builder in self.slices:
+                matchers = builder.matchers(element.slicing.discriminator or ())
+                if matchers is None:
+                    unsupported.append(
+                        (builder.id, "slice discriminator is not supported")
+                    )
+                    matchers_ok = False
+                    break
+                rule = builder.build(with_bindings, unsupported)
+                slices.append(SliceRule(slice_name, rule, matchers))
+            if matchers_ok:
+                slicing_closed = element.slicing.rules == "closed"
+            else:
+                slices = list()
+        min_, max_ = self.cardinality()
+        fixed = _choice_value(element, "fixed")
+        pattern = _choice_value(element, "pattern")
+        disallowed: typing.FrozenSet[str] = frozenset()
+        codes = self.type_codes()
+        if len(self.members) > 1 and codes:
+            disallowed = frozenset(
+                member.name
+                for member in self.members
+                if not any(_member_is_type(member, code) for code in codes)
+            )
+        binding = None
+        if with_bindings and element.binding is not None:
+            value_set = _binding_value_set(element.binding)
+            if value_set and element.binding.strength in BINDING_SEVERITIES:
+                binding = (element.binding.strength, value_set)
+        if (
+            not children
+            and not slices
+            and min_ == 0
+            and max_ is None
+            and fixed is None
+            and pattern is None
+            and not disallowed
+            and binding is None
+        ):
+            return None
+        return ElementRule(
+            self.id,
+            self.name,
+            min_,
+            max_,
+            fixed,
+            pattern,
+            disallowed,
+            binding,
+            slicing_closed,
+            tuple(slices),
+            tuple(children),
+        )
+
+
+def _member_is_type(member: MemberField, code: str) -> bool:
+    """ """
+    type_ = member.type
+    if isinstance(type_, type):
+        return type_.get_resource_type() == code
+    return type_ == code or (type_ is None and code == "Resource")
+
+
+def pattern_match(value, pattern) -> bool:
+    """Value conforms to pattern, all the pattern's elements are present in
+    value, pattern's list items are matched by any item of value."""
+    if isinstance(pattern, FHIRAbstractModel):
+        if not isinstance(value, FHIRAbstractModel):
+            return False
+        pattern_dict = pattern.__dict__
+        value_dict = value.__dict__
+        for key, expected in pattern_dict.items():
+            if expected is None or key == "resource_type":
+                continue
+            actual = value_dict.get(key)
+            if actual is None:
+                return False
+            if isinstance(expected, list):
+                if not isinstance(actual, list):
+                    return False
+                for item in expected:
+                    if not any(pattern_match(val, item) for val in actual):
+                        return False
+            elif not pattern_match(actual, expected):
+                return False
+        return True
+    return values_equal(value, pattern)
+
+
+def _iter_codes(value) -> typing.Iterator[typing.Tuple[typing.Optional[str], str]]:
+    """(system, code) of coded value (code, Coding, CodeableConcept,
+    Quantity)."""
+    if isinstance(value, str):
+        yield None, value
+    elif isinstance(value, FHIRAbstractModel):
+        dict_ = value.__dict__
+        codings = dict_.get("coding")
+        if codings:
+            for coding in codings:
+                if coding.code is not None:
+                    yield coding.system, coding.code
+        elif dict_.get("code") is not None and isinstance(dict_["code"], str):
+            yield dict_.get("system"), dict_["code"]
+
+
+def _member_values(node: FHIRAbstractModel, name: str):
+    """Values of element (flatten) in node, as (field name, list index,
+    value), index is ``None`` for single value field."""
+    values = list()
+    dict_ = node.__dict__
+    for member in get_member_fields(node.__class__, name):
+        value = dict_.get(member.name)
+        if value is None:
+            continue
+        if member.is_list:
+            values.extend(
+                (member.name, index, item) for index, item in enumerate(value)
+            )
+        else:
+            values.append((member.name, None, value))
+    return values
+
+
+def _matches(value, matchers: typing.Tuple[Matcher, ...]) -> bool:
+    """ """
+    for kind, path, expected in matchers:
+        items = [value]
+        for name in path:
+            next_items = list()
+            for item in items:
+                if isinstance(item, FHIRAbstractModel):
+                    next_items.extend(val for _, _, val in _member_values(item, name))
+            items = next_items
+        if kind == "exists":
+            if bool(items) is not expected:
+                return False
+        elif kind == "type":
+            if not any(is_type(item, code) for item in items for code in expected):
+                return False
+        elif kind == "value":
+            if not any(values_equal(item, expected) for item in items):
+                return False
+        elif not any(pattern_match(item, expected) for item in items):
+            return False
+    return True
+
+
+class Validator:
+    """Single validation run, collects issues."""
+
+    def __init__(self, terminology: typing.Optional[Terminology]):
+        """ """
+        self.terminology = terminology
+        self.issues: typing.List[ProfileIssue] = list()
+
+    def issue(self, rule: ElementRule, location: str, message: str, severity=None):
+        """ """
+        self.issues.append(
+            ProfileIssue(severity or SEVERITY_ERROR, rule.id, location, message)
+        )
+
+    def validate_children(self, rules, node: FHIRAbstractModel, location: str):
+        """ """
+        for rule in rules:
+            values = _member_values(node, rule.name)
+            self.validate_rule(rule, values, f"{location}.{rule.name}")
+
+    def validate_rule(self, rule: ElementRule, values, location: str):
+        """ """
+        count = len(values)
+        if count < rule.min:
+            self.issue(
+                rule,
+                location,
+                f"minimum required = {rule.min}, but only found {count}",
+            )
+        if rule.max is not None and count > rule.max:
+            self.issue(
+                rule, location, f"maximum allowed = {rule.max}, but found {count}"
+            )
+        if count == 0 and not rule.slices:
+            return
+        matched: typing.List[int] = [0] * len(rule.slices)
+        for field_name, index, value in values:
+            item_location = location if index is None else f"{location}[{index}]"
+            if field_name in rule.disallowed:
+                self.issue(
+                    rule, item_location, f"type of '{field_name}' is not allowed"
+                )
+            self.validate_value(rule, value, item_location)
+            if not rule.slices:
+                continue
+            for slice_index, slice_ in enumerate(rule.slices):
+                if _matches(value, slice_.matchers):
+                    matched[slice_index] += 1
+                    if slice_.rule is not None:
+                        self.validate_value(slice_.rule, value, item_location)
+                    break
+            else:
+                if rule.slicing_closed:
+                    self.issue(
+                        rule, item_location, "value doesn't match any slice (closed)"
+                    )
+        for slice_index, slice_ in enumerate(rule.slices):
+            if slice_.rule is None:
+                continue
+            count = matched[slice_index]
+            if count < slice_.rule.min:
+                self.issue(
+                    slice_.rule,
+                    location,
+                    f"slice '{slice_.name}' minimum required = "
+                    f"{slice_.rule.min}, but only found {count}",
+                )
+            if slice_.rule.max is not None and count > slice_.rule.max:
+                self.issue(
+                    slice_.rule,
+                    location,
+                    f"slice '{slice_.name}' maximum allowed = "
+                    f"{slice_.rule.max}, but found {count}",
+                )
+
+    def validate_value(self, rule: ElementRule, value, location: str):
+        """Value constraints and child elements of single value."""
+        if rule.fixed is not None and not values_equal(value, rule.fixed):
+            self.issue(rule, location, "value is not same as the fixed value")
+        if rule.pattern is not None and not pattern_match(value, rule.pattern):
+            self.issue(rule, location, "value doesn't match the pattern")
+        if rule.binding is not None and self.terminology is not None:
+            self.validate_binding(rule, value, location)
+        if rule.children and isinstance(value, FHIRAbstractModel):
+            self.validate_children(rule.children, value, location)
+
+    def validate_binding(self, rule: ElementRule, value, location: str):
+        """ """
+        strength, value_set = rule.binding
+        results = [
+            self.terminology(value_set, system, code)
+            for system, code in _iter_codes(value)
+        ]
+        if results and not any(results) and False in results:
+            self.issue(
+                rule,
+                location,
+                f"code is not in value set '{value_set}' ({strength})",
+                BINDING_SEVERITIES[strength],
+            )
+
+
+class CompiledProfile:
+    """Validation plan of ``StructureDefinition``, see ``compile_profile``."""
+
+    def __init__(self, structure_definition: FHIRAbstractModel):
+        """ """
+        self.url: typing.Optional[str] = structure_definition.url
+        self.version: typing.Optional[str] = structure_definition.version
+        self.type: str = structure_definition.type
+        # (element id, reason) of constraints those are not checked.
+        self.unsupported: typing.List[typing.Tuple[str, str]] = list()
+        self._root = self._read_snapshot(structure_definition)
+        self._plans: typing.Dict[bool, typing.Tuple[ElementRule, ...]] = dict()
+        self.plan()
+
+    def __repr__(self):
+        """ """
+        return f"<CompiledProfile {self.url}|{self.version} ({self.type})>"
+
+    def _read_snapshot(self, structure_definition) -> _ElementBuilder:
+        """ """
+        snapshot = structure_definition.snapshot
+        if snapshot is None or not snapshot.element:
+            raise ProfileError(
+                f"StructureDefinition '{self.url}' has no snapshot, "
+                "differential only profiles are not supported."
+            )
+        try:
+            klass = get_fhir_model_class_getter(structure_definition.__class__)(
+                self.type
+            )
+        except (KeyError, ValueError):
+            raise ProfileError(f"Unknown type '{self.type}' of profile '{self.url}'.")
+
+        root = None
+        builders: typing.Dict[str, _ElementBuilder] = dict()
+        for element in snapshot.element:
+            element_id = element.id or (
+                element.path + (f":{element.sliceName}" if element.sliceName else "")
+            )
+            if root is None:
+                root = builders[element_id] = _ElementBuilder(element, self.type, klass)
+                continue
+            parent_id, _, last = element_id.rpartition(".")
+            name, _, slice_name = last.partition(":")
+            if name.endswith("[x]"):
+                name = name[:-3]
+            parent = builders.get(parent_id, None)
+            if parent is None:
+                continue
+            builder = _ElementBuilder(element, name, None)
+            builders[element_id] = builder
+            if parent.klass is not None:
+                builder.members = get_member_fields(parent.klass, name)
+                if not builder.members:
+                    self.unsupported.append((element_id, "unknown element"))
+                    continue
+                if len(builder.members) == 1:
+                    builder.klass = builder.members[0].type
+                elif len(builder.type_codes()) == 1:
+                    builder.klass = get_model_class(
+                        builder.type_codes()[0],
+                        tuple(member.type for member in builder.members),
+                    )
+                if not isinstance(builder.klass, type):
+                    builder.klass = None
+            if slice_name:
+                sliced = builders.get(f"{parent_id}.{last.partition(':')[0]}")
+                if sliced is None:
+                    continue
+                sliced.slices.append((slice_name, builder))
+            else:
+                parent.children.append(builder)
+        return root
+
+    def plan(self, with_bindings: bool = False) -> typing.Tuple[ElementRule, ...]:
+        """Rules of root's child elements, the variant with bindings is
+        compiled on first use (validation with terminology)."""
+        plan = self._plans.get(with_bindings, None)
+        if plan is None:
+            unsupported: typing.List[typing.Tuple[str, str]] = list()
+            plan = tuple(
+                rule
+                for rule in (
+                    child.build(with_bindings, unsupported)
+                    for child in self._root.children
+                )
+                if rule is not None
+            )
+            if not self._plans:
+                self.unsupported.extend(unsupported)
+            self._plans[with_bindings] = plan
+        return plan
+
+    def validate(
+        self,
+        model: FHIRAbstractModel,
+        terminology: typing.Optional[Terminology] = None,
+    ) -> typing.List[ProfileIssue]:
+        """Conformance issues of model, empty list means valid.
+
+        :param terminology: function of (value set url, system, code), that
+            returns whether code is in value set (``None`` if unknown); when
+            given, ``required`` and ``extensible`` bindings are checked.
+        """
+        validator = Validator(terminology)
+        if model.get_resource_type() != self.type:
+            validator.issues.append(
+                ProfileIssue(
+                    SEVERITY_ERROR,
+                    self.type,
+                    model.get_resource_type(),
+                    f"expected type '{self.type}'",
+                )
+            )
+            return validator.issues
+        validator.validate_children(
+            self.plan(terminology is not None), model, self.type
+        )
+        return validator.issues
+
+    def is_valid(
+        self,
+        model: FHIRAbstractModel,
+        terminology: typing.Optional[Terminology] = None,
+    ) -> bool:
+        """No error issue (warnings are allowed)."""
+        return not any(
+            issue.severity == SEVERITY_ERROR
+            for issue in self.validate(model, terminology)
+        )
+
+
+def compile_profile(
+    structure_definition: typing.Union[FHIRAbstractModel, typing.Dict[str, typing.Any]]
+) -> CompiledProfile:
+    """Compiled validation plan of profile (``StructureDefinition`` with
+    snapshot, model or dict), cached by profile url and version. Dict is
+    trusted (constructed without validation), as element ids of slices
+    (``Observation.component:systolic``) don't conform to ``id`` type.
+
+    :raises ProfileError: no snapshot or unknown type.
+    """
+    if isinstance(structure_definition, dict):
+        key = (structure_definition.get("url"), structure_definition.get("version"))
+    else:
+        key = (structure_definition.url, structure_definition.version)
+    profile = _COMPILED_PROFILES.get(key, None)
+    if profile is None:
+        if isinstance(structure_definition, dict):
+            structure_definition = StructureDefinition.construct_fhir(
+                structure_definition
+            )
+        profile = CompiledProfile(structure_definition)
+        if key[0] is not None:
+            _COMPILED_PROFILES[key] = profile
+    return profile
+
+
+def clear_profile_cache():
+    """ """
+    _COMPILED_PROFILES.clear()
+
+
+__all__ = [
+    "compile_profile",
+    "clear_profile_cache",
+    "CompiledProfile",
+    "ProfileError",
+    "ProfileIssue",
+]
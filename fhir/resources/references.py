@@ -0,0 +1,254 @@
+# _*_ coding: utf-8 _*_
+"""Index of resources inside Bundle (``entry``) and ``contained``, for O(1)
+resolution of ``Reference.reference`` values (``urn:uuid:...``,
+``Patient/123``, ``Patient/123/_history/2``, ``#local-id``), without
+scanning entries for every reference.
+https://hl7.org/fhir/references.html#resolve"""
+import re
+import typing
+from functools import lru_cache
+
+from pydantic.fields import SHAPE_LIST
+
+from fhir.resources.core.fhirabstractmodel import FHIRAbstractModel
+from fhir.resources.core.utils.common import normalize_fhir_type_class
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+# kind of traversal plan entry
+KIND_REFERENCE = 0  # ``Reference`` datatype
+KIND_RESOURCE = 1  # nested resource (i.e. ``Bundle.entry.resource``)
+KIND_ELEMENT = 2  # any other complex datatype (might contain Reference)
+
+# (field name, kind, list flag)
+TraversalPlanEntry = typing.Tuple[str, int, bool]
+
+RELATIVE_REFERENCE = re.compile(
+    r"^(?P<type>[A-Z][A-Za-z]+)/(?P<id>[A-Za-z0-9\-.]{1,64})"
+    r"(?:/_history/(?P<version>[A-Za-z0-9\-.]{1,64}))?$"
+)
+RESTFUL_URL = re.compile(
+    r"^(?P<base>(?:https?|ftp)://.+/)(?P<type>[A-Z][A-Za-z]+)/"
+    r"(?P<id>[A-Za-z0-9\-.]{1,64})(?:/_history/[A-Za-z0-9\-.]{1,64})?$"
+)
+
+
+class ReferenceLocation(typing.NamedTuple):
+    """Found ``Reference``, ``owner`` is the model that holds the field and
+    ``resource`` is the resolution context (for ``#local-id``), that is the
+    container resource for references inside contained resources."""
+
+    reference: FHIRAbstractModel
+    owner: FHIRAbstractModel
+    field_name: str
+    resource: typing.Optional[FHIRAbstractModel]
+
+
+@lru_cache(maxsize=None)
+def get_traversal_plan(
+    klass: typing.Type[FHIRAbstractModel],
+) -> typing.Tuple[TraversalPlanEntry, ...]:
+    """Complex (non primitive) fields of class, compiled once from the
+    fields metadata. Primitive extension fields are included, as extension
+    might have ``valueReference``."""
+    plan = list()
+    for field in klass.__fields__.values():
+        type_ = normalize_fhir_type_class(field.type_)
+        resource_type = getattr(type_, "__resource_type__", None)
+        if resource_type is None:
+            # primitive, str or bool
+            continue
+        if resource_type == "Reference":
+            kind = KIND_REFERENCE
+        elif resource_type == "Resource":
+            kind = KIND_RESOURCE
+        else:
+            kind = KIND_ELEMENT
+        plan.append((field.name, kind, field.shape == SHAPE_LIST))
+    return tuple(plan)
+
+
+def _iter_references(
+    model: FHIRAbstractModel, resource: typing.Optional[FHIRAbstractModel]
+) -> typing.Iterator[ReferenceLocation]:
+    """ """
+    values = model.__dict__
+    for field_name, kind, is_list in get_traversal_plan(model.__class__):
+        value = values.get(field_name, None)
+        if value is None:
+            continue
+        for item in value if is_list else (value,):
+            if item is None:
+                continue
+            if kind == KIND_REFERENCE:
+                yield ReferenceLocation(item, model, field_name, resource)
+                # Reference.identifier.assigner is also Reference
+                yield from _iter_references(item, resource)
+            elif kind == KIND_RESOURCE:
+                # contained resources share the container's context
+                yield from _iter_references(
+                    item, resource if field_name == "contained" else item
+                )
+            else:
+                yield from _iter_references(item, resource)
+
+
+def iter_references(model: FHIRAbstractModel) -> typing.Iterator[ReferenceLocation]:
+    """Yields every ``Reference`` of model tree (nested resources included,
+    i.e. Bundle entries and contained resources), in order of the class fields."""
+    resource = model if model.has_resource_base() else None
+    return _iter_references(model, resource)
+
+
+def rewrite_references(
+    model: FHIRAbstractModel,
+    mapping: typing.Union[
+        typing.Mapping[str, str], typing.Callable[[str], typing.Optional[str]]
+    ],
+) -> int:
+    """Replaces ``Reference.reference`` values in place (i.e. ``urn:uuid``
+    to server assigned ``Patient/123`` during transaction processing),
+    in single traversal. Mapping could be dict or function, which returns
+    ``None`` for unchanged value. Returns number of replaced references."""
+    if callable(mapping):
+        get_value = mapping
+    else:
+        get_value = mapping.get  # type: ignore
+    count = 0
+    for location in iter_references(model):
+        reference = location.reference
+        value = reference.__dict__.get("reference", None)
+        if value is None:
+            continue
+        new_value = get_value(value)
+        if new_value is None or new_value == value:
+            continue
+        reference.reference = new_value
+        count += 1
+    return count
+
+
+def _get_reference_value(
+    reference: typing.Union[str, FHIRAbstractModel, None],
+) -> typing.Optional[str]:
+    """ """
+    if reference is None or isinstance(reference, str):
+        return reference
+    return reference.__dict__.get("reference", None)
+
+
+class ReferenceIndex:
+    """Lookup tables of resources by ``fullUrl``, ``Type/id`` and versioned
+    ``Type/id/_history/vid`` (``meta.versionId``), contained resources by
+    local id per container. Index is built once, in single pass over
+    entries; in case of duplicates the first one wins.
+
+        index = ReferenceIndex.build(bundle)
+        for location in index.iter_references():
+            target = index.resolve(location.reference, location.resource)
+    """
+
+    def __init__(self, root: FHIRAbstractModel = None):
+        """ """
+        self.root = root
+        self._resources: typing.Dict[str, FHIRAbstractModel] = dict()
+        self._full_urls: typing.Dict[int, str] = dict()
+        self._contained: typing.Dict[typing.Tuple[int, str], FHIRAbstractModel] = dict()
+
+    @classmethod
+    def build(cls, model: FHIRAbstractModel) -> "ReferenceIndex":
+        """Index of Bundle entries (not nested Bundles) or single resource
+        and their contained resources."""
+        index = cls(model)
+        if model.resource_type == "Bundle":
+            for entry in model.__dict__.get("entry", None) or ():
+                resource = entry.__dict__.get("resource", None)
+                full_url = entry.__dict__.get("fullUrl", None)
+                if resource is not None:
+                    index.add(resource, full_url)
+        index.add(model)
+        return index
+
+    def add(self, resource: FHIRAbstractModel, full_url: str = None) -> None:
+        """Adds resource (and its contained resources) to the index."""
+        resources = self._resources
+        resource_type = resource.resource_type
+        resource_id = resource.__dict__.get("id", None)
+        version_id = None
+        meta = resource.__dict__.get("meta", None)
+        if meta is not None:
+            version_id = meta.__dict__.get("versionId", None)
+
+        if full_url:
+            self._full_urls[id(resource)] = full_url
+            resources.setdefault(full_url, resource)
+            if version_id and RESTFUL_URL.match(full_url):
+                resources.setdefault(f"{full_url}/_history/{version_id}", resource)
+        if resource_id:
+            key = f"{resource_type}/{resource_id}"
+            resources.setdefault(key, resource)
+            if version_id:
+                resources.setdefault(f"{key}/_history/{version_id}", resource)
+
+        for contained in resource.__dict__.get("contained", None) or ():
+            local_id = contained.__dict__.get("id", None)
+            if local_id:
+                self._contained.setdefault((id(resource), local_id), contained)
+
+    def resolve(
+        self,
+        reference: typing.Union[str, FHIRAbstractModel, None],
+        resource: FHIRAbstractModel = None,
+    ) -> typing.Optional[FHIRAbstractModel]:
+        """Target resource of reference (``Reference`` model or its value),
+        ``None`` if it is not inside the index (i.e. external or logical
+        reference). ``resource`` is the resolution context, required for
+        ``#local-id`` and used as base of relative references, when its
+        ``fullUrl`` is RESTful (absolute) URL."""
+        value = _get_reference_value(reference)
+        if not value:
+            return None
+        if value[0] == "#":
+            if resource is None:
+                return None
+            if value == "#":
+                # reference to the container itself
+                return resource
+            return self._contained.get((id(resource), value[1:]), None)
+
+        resources = self._resources
+        if resource is not None and RELATIVE_REFERENCE.match(value) is not None:
+            # relative to the (RESTful) base of the context's fullUrl first
+            full_url = self._full_urls.get(id(resource), None)
+            matched = full_url and RESTFUL_URL.match(full_url)
+            if matched:
+                target = resources.get(matched.group("base") + value, None)
+                if target is not None:
+                    return target
+        return resources.get(value, None)
+
+    def iter_references(self) -> typing.Iterator[ReferenceLocation]:
+        """ """
+        return iter_references(self.root)
+
+    def rewrite(
+        self,
+        mapping: typing.Union[
+            typing.Mapping[str, str], typing.Callable[[str], typing.Optional[str]]
+        ],
+    ) -> int:
+        """``rewrite_references`` of the indexed model, lookup tables are
+        not changed."""
+        return rewrite_references(self.root, mapping)
+
+    def __contains__(self, reference: typing.Any) -> bool:
+        """ """
+        return _get_reference_value(reference) in self._resources
+
+
+__all__ = [
+    "ReferenceIndex",
+    "ReferenceLocation",
+    "iter_references",
+    "rewrite_references",
+]
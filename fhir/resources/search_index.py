@@ -0,0 +1,511 @@
+# _*_ coding: utf-8 _*_
+"""Extraction of search index values (``token``, ``string``, ``date``,
+``reference``, ``quantity``, ``number`` and ``uri``) from models, as defined
+by ``SearchParameter`` resources. Expressions are compiled once per resource
+type (``fhir.resources.fhirpath``) and evaluated over model attributes.
+https://hl7.org/fhir/search.html"""
+import calendar
+import datetime
+import decimal
+import logging
+import pathlib
+import typing
+import unicodedata
+
+from fhir.resources.core.fhirabstractmodel import FHIRAbstractModel
+from fhir.resources.core.utils.construct import get_fhir_model_class_getter
+from fhir.resources.core.validators import REFERENCE_TYPE_PREFIX
+
+from .fhirpath import CompiledExpression, FHIRPathError, compile, get_type_names
+from .searchparameter import SearchParameter
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+LOG = logging.getLogger(__name__)
+UTC = datetime.timezone.utc
+ISO4217_SYSTEM = "urn:iso:std:iso:4217"
+# resource types, those search parameters apply to all (sub) types
+ABSTRACT_BASES = ("Resource", "DomainResource")
+SearchParameterSource = typing.Union[SearchParameter, typing.Dict[str, typing.Any]]
+
+
+class StringRow(typing.NamedTuple):
+    """``normalized`` is lower case value without accents (diacritics)."""
+
+    resource_type: str
+    resource_id: typing.Optional[str]
+    name: str
+    value: str
+    normalized: str
+
+
+class TokenRow(typing.NamedTuple):
+    """ """
+
+    resource_type: str
+    resource_id: typing.Optional[str]
+    name: str
+    system: typing.Optional[str]
+    code: typing.Optional[str]
+    display: typing.Optional[str]
+
+
+class DateRow(typing.NamedTuple):
+    """Inclusive range (UTC), ``None`` is open end (of Period)."""
+
+    resource_type: str
+    resource_id: typing.Optional[str]
+    name: str
+    low: typing.Optional[datetime.datetime]
+    high: typing.Optional[datetime.datetime]
+
+
+class ReferenceRow(typing.NamedTuple):
+    """``target_type`` and ``target_id`` of relative or RESTful reference."""
+
+    resource_type: str
+    resource_id: typing.Optional[str]
+    name: str
+    reference: str
+    target_type: typing.Optional[str]
+    target_id: typing.Optional[str]
+
+
+class QuantityRow(typing.NamedTuple):
+    """ """
+
+    resource_type: str
+    resource_id: typing.Optional[str]
+    name: str
+    value: typing.Optional[decimal.Decimal]
+    system: typing.Optional[str]
+    code: typing.Optional[str]
+    unit: typing.Optional[str]
+
+
+class NumberRow(typing.NamedTuple):
+    """ """
+
+    resource_type: str
+    resource_id: typing.Optional[str]
+    name: str
+    value: decimal.Decimal
+
+
+class UriRow(typing.NamedTuple):
+    """ """
+
+    resource_type: str
+    resource_id: typing.Optional[str]
+    name: str
+    uri: str
+
+
+IndexRow = typing.Union[
+    StringRow, TokenRow, DateRow, ReferenceRow, QuantityRow, NumberRow, UriRow
+]
+# (value) -> iterator of row values (without the common prefix)
+Converter = typing.Callable[[typing.Any], typing.Iterator[tuple]]
+
+
+class SkippedParameter(typing.NamedTuple):
+    """Search parameter, that is not indexed for the resource type."""
+
+    name: str
+    resource_type: str
+    reason: str
+
+
+class CompiledSearchParameter(typing.NamedTuple):
+    """ """
+
+    name: str
+    type: str
+    expression: CompiledExpression
+    row_class: type
+    convert: Converter
+
+
+def _get(model: typing.Any, name: str) -> typing.Any:
+    """ """
+    return model.__dict__.get(name, None)
+
+
+def _type_name(value: typing.Any) -> typing.Optional[str]:
+    """ """
+    if isinstance(value, FHIRAbstractModel):
+        return value.__class__.get_resource_type()
+    return None
+
+
+def normalize_string(value: str) -> str:
+    """Case and accent insensitive form of string."""
+    decomposed = unicodedata.normalize("NFKD", value)
+    return "".join(
+        char for char in decomposed if not unicodedata.combining(char)
+    ).lower()
+
+
+def _to_utc(value: datetime.datetime) -> datetime.datetime:
+    """Naive value is taken as UTC."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=UTC)
+    return value.astimezone(UTC)
+
+
+def date_range(
+    value: typing.Any,
+) -> typing.Optional[typing.Tuple[datetime.datetime, datetime.datetime]]:
+    """Inclusive (UTC) range of ``date``, ``dateTime`` or ``instant`` value
+    by its precision, partial values (``2020``, ``2020-02``) included:
+    ``2020-02`` is from ``2020-02-01T00:00:00`` to ``2020-02-29T23:59:59.999999``.
+    ``None`` for unknown value."""
+    if isinstance(value, datetime.datetime):
+        low = _to_utc(value)
+        if value.microsecond == 0:
+            # precision of seconds
+            return low, low.replace(microsecond=999999)
+        return low, low
+    if isinstance(value, datetime.date):
+        low = datetime.datetime(value.year, value.month, value.day, tzinfo=UTC)
+        return low, low.replace(hour=23, minute=59, second=59, microsecond=999999)
+    if not isinstance(value, str):
+        return None
+    try:
+        year = int(value[0:4])
+        if len(value) == 4:
+            return (
+                datetime.datetime(year, 1, 1, tzinfo=UTC),
+                datetime.datetime(year, 12, 31, 23, 59, 59, 999999, tzinfo=UTC),
+            )
+        if len(value) == 7 and value[4] == "-":
+            month = int(value[5:7])
+            last_day = calendar.monthrange(year, month)[1]
+            return (
+                datetime.datetime(year, month, 1, tzinfo=UTC),
+                datetime.datetime(
+                    year, month, last_day, 23, 59, 59, 999999, tzinfo=UTC
+                ),
+            )
+    except ValueError:
+        return None
+    return None
+
+
+def convert_string(value: typing.Any) -> typing.Iterator[tuple]:
+    """ """
+    type_name = _type_name(value)
+    if type_name is None:
+        if isinstance(value, str):
+            yield value, normalize_string(value)
+        return
+    if type_name == "HumanName":
+        names = ("family", "given", "prefix", "suffix", "text")
+    elif type_name == "Address":
+        names = ("line", "city", "district", "state", "postalCode", "country", "text")
+    else:
+        return
+    for name in names:
+        part = _get(value, name)
+        if part is None:
+            continue
+        for item in part if isinstance(part, list) else (part,):
+            if item:
+                yield item, normalize_string(item)
+
+
+def convert_token(value: typing.Any) -> typing.Iterator[tuple]:
+    """ """
+    type_name = _type_name(value)
+    if type_name is None:
+        if value is True or value is False:
+            yield None, "true" if value else "false", None
+        elif isinstance(value, str):
+            yield None, value, None
+        return
+    if type_name == "CodeableConcept":
+        for coding in _get(value, "coding") or ():
+            yield from convert_token(coding)
+    elif type_name == "Coding":
+        if _get(value, "code") is not None:
+            yield _get(value, "system"), _get(value, "code"), _get(value, "display")
+    elif type_name in ("Identifier", "ContactPoint"):
+        if _get(value, "value") is not None:
+            yield _get(value, "system"), _get(value, "value"), None
+
+
+def convert_date(value: typing.Any) -> typing.Iterator[tuple]:
+    """ """
+    type_name = _type_name(value)
+    if type_name is None:
+        range_ = date_range(value)
+        if range_ is not None:
+            yield range_
+        return
+    if type_name == "Period":
+        start = date_range(_get(value, "start"))
+        end = date_range(_get(value, "end"))
+        if start is not None or end is not None:
+            yield start[0] if start else None, end[1] if end else None
+    elif type_name == "Timing":
+        for event in _get(value, "event") or ():
+            yield from convert_date(event)
+        repeat = _get(value, "repeat")
+        if repeat is not None and _get(repeat, "boundsPeriod") is not None:
+            yield from convert_date(_get(repeat, "boundsPeriod"))
+
+
+def parse_reference(value: str) -> typing.Tuple[typing.Optional[str], ...]:
+    """(target type, target id) of relative or RESTful reference."""
+    matched = REFERENCE_TYPE_PREFIX.search(value)
+    if matched is None:
+        return None, None
+    target_id = value[matched.end(1) + 1 :].split("/", 1)[0]
+    return matched.group(1), target_id
+
+
+def convert_reference(value: typing.Any) -> typing.Iterator[tuple]:
+    """ """
+    if isinstance(value, str):
+        yield (value,) + parse_reference(value)
+        return
+    if _type_name(value) != "Reference":
+        return
+    reference = _get(value, "reference")
+    if not reference:
+        return
+    target_type, target_id = parse_reference(reference)
+    if target_type is None:
+        target_type = _get(value, "type")
+    yield reference, target_type, target_id
+
+
+def convert_quantity(value: typing.Any) -> typing.Iterator[tuple]:
+    """ """
+    type_name = _type_name(value)
+    if type_name is None:
+        return
+    if type_name == "Money":
+        yield _get(value, "value"), ISO4217_SYSTEM, _get(value, "currency"), None
+    elif "Quantity" in get_type_names(value.__class__):
+        yield (
+            _get(value, "value"),
+            _get(value, "system"),
+            _get(value, "code"),
+            _get(value, "unit"),
+        )
+
+
+def convert_number(value: typing.Any) -> typing.Iterator[tuple]:
+    """ """
+    if isinstance(value, (int, decimal.Decimal)) and value.__class__ is not bool:
+        yield (decimal.Decimal(value),)
+
+
+def convert_uri(value: typing.Any) -> typing.Iterator[tuple]:
+    """ """
+    if isinstance(value, str):
+        yield (value,)
+
+
+SEARCH_TYPES: typing.Dict[str, typing.Tuple[type, Converter]] = {
+    "string": (StringRow, convert_string),
+    "token": (TokenRow, convert_token),
+    "date": (DateRow, convert_date),
+    "reference": (ReferenceRow, convert_reference),
+    "quantity": (QuantityRow, convert_quantity),
+    "number": (NumberRow, convert_number),
+    "uri": (UriRow, convert_uri),
+}
+
+
+class TypeResolver:
+    """``resolve()`` of search expressions (``subject.where(resolve() is
+    Patient)``), the target resource is looked up in index (if given),
+    contained resources by local id, otherwise only its type is known from
+    the reference, so that empty instance (without validation) of the type
+    is the result."""
+
+    def __init__(self, index: typing.Any = None):
+        """ """
+        self.index = index
+        self._empty: typing.Dict[typing.Tuple[type, str], FHIRAbstractModel] = dict()
+
+    def resolve(
+        self, reference: typing.Any, resource: FHIRAbstractModel = None
+    ) -> typing.Optional[FHIRAbstractModel]:
+        """ """
+        if self.index is not None:
+            target = self.index.resolve(reference, resource)
+            if target is not None:
+                return target
+        if isinstance(reference, str):
+            value, type_ = reference, None
+        else:
+            value, type_ = _get(reference, "reference"), _get(reference, "type")
+        if value and value[0] == "#":
+            if resource is not None:
+                for contained in _get(resource, "contained") or ():
+                    if _get(contained, "id") == value[1:]:
+                        return contained
+            return None
+        if value and type_ is None:
+            type_ = parse_reference(value)[0]
+        if not type_ or resource is None:
+            return None
+        key = (resource.__class__, type_)
+        if key not in self._empty:
+            try:
+                klass = get_fhir_model_class_getter(resource.__class__)(type_)
+            except (KeyError, ValueError):
+                return None
+            self._empty[key] = klass.construct()
+        return self._empty[key]
+
+
+class SearchIndexer:
+    """Index rows of models by search parameters, compiled (and cached) per
+    resource type on first use.
+
+        indexer = SearchIndexer.from_file("search-parameters.json")
+        for row in indexer.iter_rows(resources):
+            store(row)
+    """
+
+    def __init__(self, search_parameters: typing.Iterable[SearchParameterSource] = ()):
+        """ """
+        self._parameters: typing.Dict[str, typing.List[SearchParameter]] = dict()
+        self._compiled: typing.Dict[
+            type, typing.Tuple[CompiledSearchParameter, ...]
+        ] = dict()
+        self.skipped: typing.List[SkippedParameter] = list()
+        self._skipped_keys: typing.Set[typing.Tuple[str, str]] = set()
+        for search_parameter in search_parameters:
+            self.add(search_parameter)
+
+    @classmethod
+    def from_bundle(cls, bundle: FHIRAbstractModel) -> "SearchIndexer":
+        """ """
+        return cls(
+            entry.resource
+            for entry in bundle.entry or ()
+            if entry.resource is not None
+            and entry.resource.resource_type == "SearchParameter"
+        )
+
+    @classmethod
+    def from_file(
+        cls, source: typing.Union[str, pathlib.Path, typing.IO], format: str = "json"
+    ) -> "SearchIndexer":
+        """SearchParameter resources of Bundle file (i.e. the official
+        ``search-parameters.json``), entries are parsed one by one."""
+        from .bundle_stream import iter_entries
+
+        return cls(
+            resource
+            for resource in iter_entries(source, format, resource_only=True)
+            if resource is not None and resource.resource_type == "SearchParameter"
+        )
+
+    def add(self, search_parameter: SearchParameterSource) -> None:
+        """ """
+        if isinstance(search_parameter, dict):
+            search_parameter = SearchParameter.parse_obj(search_parameter)
+        for base in search_parameter.base or ():
+            self._parameters.setdefault(base, list()).append(search_parameter)
+        self._compiled.clear()
+
+    def compile(
+        self, klass: typing.Type[FHIRAbstractModel]
+    ) -> typing.Tuple[CompiledSearchParameter, ...]:
+        """Compiled search parameters of model class, those without
+        expression, of ``composite``/``special`` type or unsupported
+        expression are skipped (see ``skipped``)."""
+        try:
+            return self._compiled[klass]
+        except KeyError:
+            pass
+        resource_type = klass.get_resource_type()
+        type_names = get_type_names(klass)
+        parameters = list(self._parameters.get(resource_type, ()))
+        for base in ABSTRACT_BASES:
+            if base in type_names:
+                parameters.extend(self._parameters.get(base, ()))
+
+        compiled = list()
+        for parameter in parameters:
+            name = parameter.code
+            if parameter.type not in SEARCH_TYPES:
+                self._skip(name, resource_type, f"type '{parameter.type}'")
+                continue
+            if not parameter.expression:
+                self._skip(name, resource_type, "no expression")
+                continue
+            try:
+                expression = compile(parameter.expression, klass)
+            except FHIRPathError as exc:
+                self._skip(name, resource_type, str(exc))
+                continue
+            row_class, convert = SEARCH_TYPES[parameter.type]
+            compiled.append(
+                CompiledSearchParameter(
+                    name, parameter.type, expression, row_class, convert
+                )
+            )
+        self._compiled[klass] = tuple(compiled)
+        return self._compiled[klass]
+
+    def _skip(self, name: str, resource_type: str, reason: str) -> None:
+        """Recorded once per (resource type, parameter), compiled parameters
+        are dropped on ``add`` and might be skipped again."""
+        key = (resource_type, name)
+        if key in self._skipped_keys:
+            return
+        self._skipped_keys.add(key)
+        LOG.debug(f"Search parameter '{name}' of {resource_type} skipped: {reason}")
+        self.skipped.append(SkippedParameter(name, resource_type, reason))
+
+    def iter_model_rows(
+        self, model: FHIRAbstractModel, resolver: TypeResolver
+    ) -> typing.Iterator[IndexRow]:
+        """ """
+        resource_type = model.resource_type
+        resource_id = _get(model, "id")
+        for parameter in self.compile(model.__class__):
+            row_class = parameter.row_class
+            convert = parameter.convert
+            for value in parameter.expression(model, index=resolver):
+                for row_values in convert(value):
+                    yield row_class(
+                        resource_type, resource_id, parameter.name, *row_values
+                    )
+
+    def extract(
+        self, model: FHIRAbstractModel, *, index: typing.Any = None
+    ) -> typing.List[IndexRow]:
+        """Index rows of single resource, ``index`` (i.e.
+        ``fhir.resources.references.ReferenceIndex``) is used for
+        ``resolve()``."""
+        return list(self.iter_model_rows(model, TypeResolver(index)))
+
+    def iter_rows(
+        self, models: typing.Iterable[FHIRAbstractModel], *, index: typing.Any = None
+    ) -> typing.Iterator[IndexRow]:
+        """Index rows of batch of resources."""
+        resolver = TypeResolver(index)
+        for model in models:
+            yield from self.iter_model_rows(model, resolver)
+
+
+__all__ = [
+    "SearchIndexer",
+    "StringRow",
+    "TokenRow",
+    "DateRow",
+    "ReferenceRow",
+    "QuantityRow",
+    "NumberRow",
+    "UriRow",
+    "SkippedParameter",
+    "date_range",
+]
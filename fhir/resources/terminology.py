@@ -0,0 +1,648 @@
+# _*_ coding: utf-8 _*_
+"""In-memory (offline) terminology index of ``CodeSystem``, ``ValueSet`` and
+``ConceptMap`` resources: hashed (system, code) lookup, precomputed
+subsumption closure of concept hierarchy, cached value set expansions
+(``include``/``exclude``/``filter``) and concept translation.
+https://hl7.org/fhir/terminology-service.html"""
+import mmap
+import pathlib
+import pickle
+import re
+import typing
+
+from fhir.resources.core.fhirabstractmodel import FHIRAbstractModel
+from fhir.resources.core.validators import get_choice_groups
+
+from .fhirtypesvalidators import get_fhir_model_class
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+# $subsumes outcome codes
+EQUIVALENT = "equivalent"
+SUBSUMES = "subsumes"
+SUBSUMED_BY = "subsumed-by"
+NOT_SUBSUMED = "not-subsumed"
+
+# concept properties, those define hierarchy.
+PARENT_PROPERTIES = ("parent", "subsumedBy")
+CHILD_PROPERTIES = ("child",)
+
+TERMINOLOGY_RESOURCE_TYPES = ("CodeSystem", "ValueSet", "ConceptMap")
+
+ResourceSource = typing.Union[FHIRAbstractModel, typing.Dict[str, typing.Any]]
+CodeKey = typing.Tuple[str, str]
+
+
+class Concept(typing.NamedTuple):
+    """ """
+
+    system: str
+    code: str
+    display: typing.Optional[str]
+    definition: typing.Optional[str]
+    properties: typing.Tuple[typing.Tuple[str, str], ...]
+    parents: typing.FrozenSet[str]
+
+
+class CodeSystemTable(typing.NamedTuple):
+    """Compiled CodeSystem, codes are lower cased for case insensitive code
+    system. ``complete`` is false for ``fragment``, ``example`` and
+    ``not-present`` content."""
+
+    url: str
+    version: typing.Optional[str]
+    case_sensitive: bool
+    complete: bool
+    concepts: typing.Dict[str, Concept]
+    ancestors: typing.Dict[str, typing.FrozenSet[str]]
+    descendants: typing.Dict[str, typing.FrozenSet[str]]
+
+
+class Include(typing.NamedTuple):
+    """``ValueSet.compose.include`` (or ``exclude``)."""
+
+    system: typing.Optional[str]
+    version: typing.Optional[str]
+    concepts: typing.Tuple[typing.Tuple[str, typing.Optional[str]], ...]
+    filters: typing.Tuple[typing.Tuple[str, str, str], ...]
+    value_sets: typing.Tuple[str, ...]
+
+
+class ValueSetDefinition(typing.NamedTuple):
+    """``contains`` is the (system, code, display) of given expansion,
+    used when there is no ``compose``."""
+
+    url: str
+    version: typing.Optional[str]
+    includes: typing.Tuple[Include, ...]
+    excludes: typing.Tuple[Include, ...]
+    contains: typing.Tuple[typing.Tuple[str, str, typing.Optional[str]], ...]
+
+
+class Expansion(typing.NamedTuple):
+    """Expanded value set. ``open_systems`` are (wholly or by filter)
+    included code systems, those are not loaded (or incomplete), the
+    membership of their codes is unknown."""
+
+    codes: typing.Dict[CodeKey, typing.Optional[str]]
+    systems_by_code: typing.Dict[str, typing.FrozenSet[str]]
+    open_systems: typing.FrozenSet[str]
+
+
+class Translation(typing.NamedTuple):
+    """ """
+
+    system: typing.Optional[str]
+    code: typing.Optional[str]
+    display: typing.Optional[str]
+    equivalence: typing.Optional[str]
+    concept_map: typing.Optional[str]
+
+
+class TerminologyError(LookupError):
+    """Unknown value set or code system."""
+
+
+def _property_value(property_) -> typing.Optional[str]:
+    """Value of ``CodeSystem.concept.property`` as string, as it's compared
+    with filter value."""
+    for prefix, _, fields, _ in get_choice_groups(property_.__class__)[0]:
+        if prefix != "value":
+            continue
+        dict_ = property_.__dict__
+        for field_name in fields:
+            value = dict_.get(field_name)
+            if value is None:
+                continue
+            if isinstance(value, bool):
+                return "true" if value else "false"
+            if isinstance(value, FHIRAbstractModel):
+                return getattr(value, "code", None)
+            return str(value)
+    return None
+
+
+def get_closure(
+    parents: typing.Dict[str, typing.Set[str]]
+) -> typing.Dict[str, typing.FrozenSet[str]]:
+    """Transitive closure (ancestors) of direct parents, iterative post
+    order walk, cycles are ignored."""
+    ancestors: typing.Dict[str, typing.FrozenSet[str]] = dict()
+    for root in parents:
+        stack = [root]
+        in_progress: typing.Set[str] = set()
+        while stack:
+            code = stack[-1]
+            if code in ancestors:
+                stack.pop()
+                continue
+            in_progress.add(code)
+            pending = [
+                parent
+                for parent in parents.get(code, ())
+                if parent not in ancestors and parent not in in_progress
+            ]
+            if pending:
+                stack.extend(pending)
+                continue
+            result: typing.Set[str] = set()
+            for parent in parents.get(code, ()):
+                result.add(parent)
+                result.update(ancestors.get(parent, ()))
+            result.discard(code)
+            ancestors[code] = frozenset(result)
+            in_progress.discard(code)
+            stack.pop()
+    return ancestors
+
+
+def compile_code_system(code_system: FHIRAbstractModel) -> CodeSystemTable:
+    """ """
+    case_sensitive = code_system.caseSensitive is not False
+    concepts: typing.Dict[str, Concept] = dict()
+    parents: typing.Dict[str, typing.Set[str]] = dict()
+
+    def normalize(code: str) -> str:
+        return code if case_sensitive else code.lower()
+
+    stack = [(concept, None) for concept in reversed(code_system.concept or ())]
+    while stack:
+        concept, parent = stack.pop()
+        code = normalize(concept.code)
+        code_parents = parents.setdefault(code, set())
+        if parent is not None:
+            code_parents.add(parent)
+        properties = list()
+        for property_ in concept.property or ():
+            value = _property_value(property_)
+            if value is None:
+                continue
+            properties.append((property_.code, value))
+            if property_.code in PARENT_PROPERTIES:
+                code_parents.add(normalize(value))
+            elif property_.code in CHILD_PROPERTIES:
+                parents.setdefault(normalize(value), set()).add(code)
+        concepts[code] = Concept(
+            code_system.url,
+            concept.code,
+            concept.display,
+            concept.definition,
+            tuple(properties),
+            frozenset(),
+        )
+        stack.extend((child, code) for child in reversed(concept.concept or ()))
+
+    for code, concept in concepts.items():
+        concepts[code] = concept._replace(parents=frozenset(parents.get(code, ())))
+    ancestors = get_closure(parents)
+    descendants: typing.Dict[str, typing.Set[str]] = dict()
+    for code, codes in ancestors.items():
+        for ancestor in codes:
+            descendants.setdefault(ancestor, set()).add(code)
+    return CodeSystemTable(
+        code_system.url,
+        code_system.version,
+        case_sensitive,
+        code_system.content in (None, "complete"),
+        concepts,
+        {code: ancestors.get(code, frozenset()) for code in concepts},
+        {code: frozenset(codes) for code, codes in descendants.items()},
+    )
+
+
+def _compile_include(include: FHIRAbstractModel) -> Include:
+    """ """
+    value_sets = include.valueSet or ()
+    if isinstance(value_sets, str):
+        value_sets = (value_sets,)
+    return Include(
+        include.system,
+        include.version,
+        tuple((concept.code, concept.display) for concept in include.concept or ()),
+        tuple(
+            (filter_.property, filter_.op, filter_.value)
+            for filter_ in include.filter or ()
+        ),
+        tuple(value_sets),
+    )
+
+
+def compile_value_set(value_set: FHIRAbstractModel) -> ValueSetDefinition:
+    """ """
+    compose = value_set.compose
+    contains = list()
+    if value_set.expansion is not None:
+        stack = list(reversed(value_set.expansion.contains or ()))
+        while stack:
+            item = stack.pop()
+            if item.code is not None:
+                contains.append((item.system, item.code, item.display))
+            stack.extend(reversed(item.contains or ()))
+    return ValueSetDefinition(
+        value_set.url,
+        value_set.version,
+        tuple(_compile_include(include) for include in compose.include or ())
+        if compose is not None
+        else (),
+        tuple(_compile_include(exclude) for exclude in compose.exclude or ())
+        if compose is not None
+        else (),
+        tuple(contains),
+    )
+
+
+def _filter_codes(
+    table: CodeSystemTable, property_: str, op: str, value: str
+) -> typing.Optional[typing.Set[str]]:
+    """Codes of code system by filter, ``None`` if filter is not
+    supported."""
+    normalize = str if table.case_sensitive else str.lower
+    if op in ("is-a", "descendent-of", "is-not-a", "generalizes"):
+        code = normalize(value)
+        if op == "generalizes":
+            return set(table.ancestors.get(code, ())) | (
+                {code} if code in table.concepts else set()
+            )
+        codes = set(table.descendants.get(code, ()))
+        if op == "is-a" and code in table.concepts:
+            codes.add(code)
+        if op == "is-not-a":
+            return set(table.concepts) - codes - {code}
+        return codes
+    if op == "exists":
+        expected = value == "true"
+        return {
+            code
+            for code, concept in table.concepts.items()
+            if any(name == property_ for name, _ in concept.properties) is expected
+        }
+    if op not in ("=", "in", "not-in", "regex"):
+        return None
+
+    def values(code: str, concept: Concept) -> typing.List[str]:
+        if property_ in ("concept", "code"):
+            return [code]
+        if property_ == "display":
+            return [concept.display] if concept.display else []
+        return [val for name, val in concept.properties if name == property_]
+
+    if op == "=":
+        return {
+            code
+            for code, concept in table.concepts.items()
+            if value in values(code, concept)
+        }
+    if op == "regex":
+        try:
+            pattern = re.compile(value)
+        except re.error:
+            return None
+        return {
+            code
+            for code, concept in table.concepts.items()
+            if any(pattern.fullmatch(val) for val in values(code, concept))
+        }
+    members = {item.strip() for item in value.split(",")}
+    if property_ in ("concept", "code"):
+        members = {normalize(item) for item in members}
+    codes = {
+        code
+        for code, concept in table.concepts.items()
+        if members.intersection(values(code, concept))
+    }
+    if op == "not-in":
+        return set(table.concepts) - codes
+    return codes
+
+
+class TerminologyIndex:
+    """Index of terminology resources, no network access. Value set
+    expansions are computed on first use and cached, adding resource
+    clears the cache.
+
+        index = TerminologyIndex.from_file("valuesets.json")
+        index.validate_code(
+            "http://hl7.org/fhir/ValueSet/administrative-gender",
+            "http://hl7.org/fhir/administrative-gender",
+            "male",
+        )
+
+    Index is also a ``Terminology`` callable (``validate_code``) for
+    ``fhir.resources.profiles.CompiledProfile.validate``.
+    """
+
+    def __init__(self, resources: typing.Iterable[ResourceSource] = ()):
+        """ """
+        self._code_systems: typing.Dict[str, CodeSystemTable] = dict()
+        self._value_sets: typing.Dict[str, ValueSetDefinition] = dict()
+        self._translations: typing.Dict[CodeKey, typing.List[Translation]] = dict()
+        self._expansions: typing.Dict[str, Expansion] = dict()
+        for resource in resources:
+            self.add(resource)
+
+    @classmethod
+    def from_bundle(cls, bundle: FHIRAbstractModel) -> "TerminologyIndex":
+        """ """
+        return cls(
+            entry.resource
+            for entry in bundle.entry or ()
+            if entry.resource is not None
+            and entry.resource.resource_type in TERMINOLOGY_RESOURCE_TYPES
+        )
+
+    @classmethod
+    def from_file(
+        cls, source: typing.Union[str, pathlib.Path, typing.IO], format: str = "json"
+    ) -> "TerminologyIndex":
+        """Terminology resources of Bundle file (i.e. the official
+        ``valuesets.json``), entries are parsed one by one."""
+        from .bundle_stream import iter_entries
+
+        return cls(
+            resource
+            for resource in iter_entries(source, format, resource_only=True)
+            if resource is not None
+            and resource.resource_type in TERMINOLOGY_RESOURCE_TYPES
+        )
+
+    def add(self, resource: ResourceSource) -> None:
+        """Adds CodeSystem, ValueSet or ConceptMap (model or dict)."""
+        if isinstance(resource, dict):
+            resource = get_fhir_model_class(resource.get("resourceType")).parse_obj(
+                resource
+            )
+        resource_type = resource.resource_type
+        if resource_type == "CodeSystem":
+            table = compile_code_system(resource)
+            self._register(self._code_systems, table)
+            if not table.case_sensitive and table.url is not None:
+                self._normalize_translations(table.url)
+        elif resource_type == "ValueSet":
+            self._register(self._value_sets, compile_value_set(resource))
+        elif resource_type == "ConceptMap":
+            self._add_concept_map(resource)
+        else:
+            raise ValueError(
+                f"Expected one of {TERMINOLOGY_RESOURCE_TYPES}, "
+                f"but got '{resource_type}'."
+            )
+        self._expansions.clear()
+
+    @staticmethod
+    def _register(registry: dict, item) -> None:
+        """By url and by versioned url (``url|version``)."""
+        if item.url is None:
+            return
+        registry[item.url] = item
+        if item.version is not None:
+            registry[f"{item.url}|{item.version}"] = item
+
+    def _add_concept_map(self, concept_map: FHIRAbstractModel) -> None:
+        """ """
+        for group in concept_map.group or ():
+            for element in group.element or ():
+                translations = self._translations.setdefault(
+                    (group.source, self._normalize(group.source, element.code)),
+                    list(),
+                )
+                for target in element.target or ():
+                    translations.append(
+                        Translation(
+                            group.target,
+                            target.code,
+                            target.display,
+                            target.equivalence,
+                            concept_map.url,
+                        )
+                    )
+
+    def _normalize_translations(self, system: str) -> None:
+        """Translations of case insensitive code system, those were added
+        before the code system, are keyed by normalized code."""
+        for key in [key for key in self._translations if key[0] == system]:
+            normalized = (system, key[1].lower())
+            if normalized != key:
+                self._translations.setdefault(normalized, list()).extend(
+                    self._translations.pop(key)
+                )
+
+    def _get(self, registry: dict, url: str):
+        """ """
+        item = registry.get(url, None)
+        if item is None and "|" in url:
+            item = registry.get(url.partition("|")[0], None)
+        return item
+
+    def code_system(self, url: str) -> typing.Optional[CodeSystemTable]:
+        """ """
+        return self._get(self._code_systems, url)
+
+    def _normalize(self, system: typing.Optional[str], code: str) -> str:
+        """ """
+        table = self._code_systems.get(system, None) if system else None
+        if table is None or table.case_sensitive:
+            return code
+        return code.lower()
+
+    def lookup(self, system: str, code: str) -> typing.Optional[Concept]:
+        """ """
+        table = self.code_system(system)
+        if table is None:
+            return None
+        return table.concepts.get(code if table.case_sensitive else code.lower())
+
+    def subsumes(self, system: str, code_a: str, code_b: str) -> typing.Optional[str]:
+        """Subsumption relationship of ``code_a`` to ``code_b``
+        (``$subsumes`` outcome), ``None`` if unknown."""
+        table = self.code_system(system)
+        if table is None:
+            return None
+        if not table.case_sensitive:
+            code_a, code_b = code_a.lower(), code_b.lower()
+        if code_a not in table.concepts or code_b not in table.concepts:
+            return None
+        if code_a == code_b:
+            return EQUIVALENT
+        if code_a in table.ancestors[code_b]:
+            return SUBSUMES
+        if code_b in table.ancestors[code_a]:
+            return SUBSUMED_BY
+        return NOT_SUBSUMED
+
+    def expand(self, value_set: str) -> Expansion:
+        """Expansion of value set (url or ``url|version``), cached.
+
+        :raises TerminologyError: unknown value set.
+        """
+        expansion = self._expansions.get(value_set, None)
+        if expansion is None:
+            expansion = self._expand(value_set, set())
+            self._expansions[value_set] = expansion
+        return expansion
+
+    def _expand(self, url: str, visiting: typing.Set[str]) -> Expansion:
+        """ """
+        if url in self._expansions:
+            return self._expansions[url]
+        definition = self._get(self._value_sets, url)
+        if definition is None:
+            raise TerminologyError(f"Unknown value set '{url}'.")
+        if url in visiting:
+            raise TerminologyError(f"Value set '{url}' includes itself.")
+        visiting.add(url)
+        codes: typing.Dict[CodeKey, typing.Optional[str]] = dict()
+        open_systems: typing.Set[str] = set()
+        if not definition.includes:
+            for system, code, display in definition.contains:
+                codes[(system, self._normalize(system, code))] = display
+        for include in definition.includes:
+            included, open_system = self._include(include, visiting)
+            codes.update(included)
+            open_systems.update(open_system)
+        for exclude in definition.excludes:
+            excluded, _ = self._include(exclude, visiting)
+            for key in excluded:
+                codes.pop(key, None)
+        visiting.discard(url)
+        systems_by_code: typing.Dict[str, typing.Set[str]] = dict()
+        for system, code in codes:
+            systems_by_code.setdefault(code, set()).add(system)
+        return Expansion(
+            codes,
+            {code: frozenset(systems) for code, systems in systems_by_code.items()},
+            frozenset(open_systems),
+        )
+
+    def _include(
+        self, include: Include, visiting: typing.Set[str]
+    ) -> typing.Tuple[typing.Dict[CodeKey, typing.Optional[str]], typing.Set[str]]:
+        """Codes of include (exclude) and open (not loaded) code systems."""
+        codes: typing.Optional[typing.Dict[CodeKey, typing.Optional[str]]] = None
+        open_systems: typing.Set[str] = set()
+        system = include.system
+        if system is not None:
+            table = self.code_system(
+                f"{system}|{include.version}" if include.version else system
+            )
+            if include.concepts:
+                codes = dict()
+                for code, display in include.concepts:
+                    code = self._normalize(system, code)
+                    if display is None and table is not None:
+                        concept = table.concepts.get(code, None)
+                        display = concept.display if concept is not None else None
+                    codes[(system, code)] = display
+            elif table is None:
+                codes = dict()
+                open_systems.add(system)
+            else:
+                selected = set(table.concepts)
+                for property_, op, value in include.filters:
+                    filtered = _filter_codes(table, property_, op, value)
+                    if filtered is None:
+                        open_systems.add(system)
+                        continue
+                    selected &= filtered
+                if not table.complete:
+                    open_systems.add(system)
+                codes = {
+                    (system, code): table.concepts[code].display for code in selected
+                }
+        for url in include.value_sets:
+            expansion = self._expand(url, visiting)
+            open_systems.update(expansion.open_systems)
+            if codes is None:
+                codes = dict(expansion.codes)
+            else:
+                codes = {
+                    key: display
+                    for key, display in codes.items()
+                    if key in expansion.codes
+                }
+        return codes or dict(), open_systems
+
+    def validate_code(
+        self, value_set: str, system: typing.Optional[str], code: str
+    ) -> typing.Optional[bool]:
+        """Membership of code in value set, ``None`` means unknown (value set
+        is not loaded, or the code system of code is not loaded)."""
+        try:
+            expansion = self.expand(value_set)
+        except TerminologyError:
+            return None
+        if system is None:
+            if code in expansion.systems_by_code:
+                return True
+            # code of case insensitive code system
+            for system_ in expansion.systems_by_code.get(code.lower(), ()):
+                if self._normalize(system_, code) != code:
+                    return True
+            return None if expansion.open_systems else False
+        if (system, self._normalize(system, code)) in expansion.codes:
+            return True
+        if system in expansion.open_systems:
+            return None
+        return False
+
+    __call__ = validate_code
+
+    def translate(
+        self,
+        system: str,
+        code: str,
+        target_system: typing.Optional[str] = None,
+        concept_map: typing.Optional[str] = None,
+    ) -> typing.List[Translation]:
+        """Mapped concepts of (system, code) from ConceptMap(s), optionally
+        limited to target system and (url of) concept map."""
+        translations = self._translations.get(
+            (system, self._normalize(system, code)), ()
+        )
+        return [
+            translation
+            for translation in translations
+            if (target_system is None or translation.system == target_system)
+            and (concept_map is None or translation.concept_map == concept_map)
+        ]
+
+    def save(self, path: typing.Union[str, pathlib.Path]) -> None:
+        """Persists the compiled index (all value sets are expanded) into
+        file, see ``load``."""
+        for url in list(self._value_sets):
+            try:
+                self.expand(url)
+            except TerminologyError:
+                continue
+        state = (
+            self._code_systems,
+            self._value_sets,
+            self._translations,
+            self._expansions,
+        )
+        with open(path, "wb") as fp:
+            pickle.dump(state, fp, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path: typing.Union[str, pathlib.Path]) -> "TerminologyIndex":
+        """Compiled index from file (written by ``save``), the file is memory
+        mapped and unpickled without reading into intermediate bytes.
+        Only load files from trusted source (pickle)."""
+        index = cls()
+        with open(path, "rb") as fp:
+            with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                (
+                    index._code_systems,
+                    index._value_sets,
+                    index._translations,
+                    index._expansions,
+                ) = pickle.loads(buffer)
+        return index
+
+
+__all__ = [
+    "TerminologyIndex",
+    "TerminologyError",
+    "Concept",
+    "Expansion",
+    "Translation",
+]
@@ -0,0 +1,51 @@
+# _*_ coding: utf-8 _*_
+import base64
+import os
+
+import pytest  # type: ignore
+from pydantic import ValidationError
+
+from fhir.resources.attachment import Attachment
+from fhir.resources.binary import Binary
+from fhir.resources.core.utils.base64binary import Base64Bytes
+from fhir.resources.STU3.binary import Binary as STU3Binary
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+
+def test_base64_binary():
+    """ """
+    raw = os.urandom(10000)
+    # MIME style (line breaks) encoded
+    encoded = base64.encodebytes(raw)
+    obj = Binary(contentType="application/pdf", data=encoded.decode())
+    assert isinstance(obj.data, Base64Bytes)
+    assert obj.data == encoded
+    assert obj.data.decoded() == raw
+    assert b"".join(obj.data.iter_decoded(chunk_size=1000)) == raw
+    assert all(len(chunk) <= 1000 for chunk in obj.data.iter_decoded(1000))
+
+    # original buffer is serialized unchanged
+    assert Binary.parse_raw(obj.json()).data == encoded
+    assert Binary.parse_raw(obj.yaml(), content_type="text/yaml").data == encoded
+    xml = obj.xml(return_bytes=True)
+    assert Binary.parse_raw(xml, content_type="text/xml").data == encoded
+
+    obj = Binary.construct_fhir(
+        {"resourceType": "Binary", "contentType": "text/plain", "data": "aGVsbG8="}
+    )
+    assert obj.data.decoded() == b"hello"
+    assert (
+        STU3Binary(contentType="text/plain", content=b"aGk=").content.decoded() == b"hi"
+    )
+    assert Attachment(data="aA==\n").data.decoded() == b"h"
+
+
+@pytest.mark.parametrize(
+    "value", ["aGVsbG8", "aGV!bG8=", "aGVsbG8=é", "AB=C", "aGk=aGk=", "A==="]
+)
+def test_base64_binary_invalid(value):
+    """ """
+    with pytest.raises(ValidationError) as exc_info:
+        Attachment(data=value)
+    assert exc_info.value.errors()[0]["type"] == "value_error.base64"
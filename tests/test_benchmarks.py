@@ -0,0 +1,21 @@
+# _*_ coding: utf-8 _*_
+from benchmarks.runner import collect, compare, run
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+
+def test_benchmark_suite():
+    """Synthetic resources are valid for every release and operation."""
+    cases = collect(size=2)
+    assert {case.release for case in cases} == {"R4B", "STU3", "DSTU2"}
+    for case in cases:
+        case.func()
+
+    cases = [case for case in cases if case.operation == "json"]
+    result = run(cases, size=2, repeat=1, min_time=0.001)
+    assert result["meta"]["size"] == 2
+    assert result["results"]["STU3.Bundle.json"]["min"] > 0
+
+    rows = compare(result, result)
+    assert len(rows) == len(cases)
+    assert all(row["status"] == "same" for row in rows)
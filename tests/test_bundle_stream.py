@@ -0,0 +1,125 @@
+# _*_ coding: utf-8 _*_
+import gzip
+import io
+
+import pytest  # type: ignore
+
+from fhir.resources.bundle import Bundle
+from fhir.resources.bundle_stream import BundleWriter, iter_entries
+from fhir.resources.patient import Patient
+
+from .fixtures import STATIC_PATH
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+
+def get_bundle():
+    """ """
+    patient = Patient.parse_file(STATIC_PATH / "Patient-with-ext.json")
+    entries = list()
+    for i in range(10):
+        resource = patient.copy(update={"id": f"p{i}"}).dict()
+        entries.append(
+            {"fullUrl": f"http://example.org/Patient/p{i}", "resource": resource}
+        )
+    return Bundle.parse_obj(
+        {
+            "resourceType": "Bundle",
+            "type": "searchset",
+            "total": 10,
+            "link": [{"relation": "self", "url": "http://example.org/Patient"}],
+            "entry": entries,
+        }
+    )
+
+
+def test_iter_entries_json(tmp_path):
+    """ """
+    bundle = get_bundle()
+    data = bundle.json(return_bytes=True, indent=2)
+    # small chunks, values are split across reads
+    for chunk_size in (3, 1024):
+        entries = iter_entries(io.BytesIO(data), chunk_size=chunk_size)
+        result = list(entries)
+        assert [e.dict() for e in result] == [e.dict() for e in bundle.entry]
+        assert entries.type == "searchset"
+        assert entries.total == 10
+        assert entries.link[0].url == "http://example.org/Patient"
+
+    # gzip file, resources only
+    path = tmp_path / "bundle.json.gz"
+    with gzip.open(path, "wb") as fp:
+        fp.write(data)
+    resources = list(iter_entries(path, resource_only=True))
+    assert [r.id for r in resources] == [f"p{i}" for i in range(10)]
+
+    # text stream, metadata after entries
+    data = '{"entry": [], "type": "collection", "resourceType": "Bundle"}'
+    entries = iter_entries(io.StringIO(data))
+    assert list(entries) == []
+    assert entries.type == "collection"
+    assert entries.total is None
+
+
+def test_iter_entries_xml(tmp_path):
+    """ """
+    bundle = get_bundle()
+    path = tmp_path / "bundle.xml"
+    path.write_bytes(bundle.xml(pretty_print=True, return_bytes=True))
+    expected = Bundle.parse_file(path)
+
+    entries = iter_entries(path, "xml", chunk_size=100)
+    result = list(entries)
+    assert [e.dict() for e in result] == [e.dict() for e in expected.entry]
+    assert entries.type == "searchset"
+    assert entries.total == 10
+    assert entries.link[0].relation == "self"
+
+
+def test_iter_entries_errors():
+    """ """
+    with pytest.raises(ValueError) as exc_info:
+        list(iter_entries(io.BytesIO(b'{"resourceType": "Patient"}')))
+    assert "Bundle" in str(exc_info.value)
+
+    with pytest.raises(ValueError):
+        list(iter_entries(io.BytesIO(b'{"entry": [{"fullUrl": "x"} {}]}')))
+
+    with pytest.raises(ValueError):
+        iter_entries(io.BytesIO(b"{}"), "yaml")
+
+
+def test_bundle_writer(tmp_path):
+    """ """
+    bundle = get_bundle()
+    header = {
+        "type": "searchset",
+        "total": 10,
+        "link": [{"relation": "self", "url": "http://example.org/Patient"}],
+    }
+    for format_ in ("json", "xml"):
+        path = tmp_path / f"bundle.{format_}"
+        with BundleWriter(path, format_, **header) as writer:
+            for entry in bundle.entry:
+                writer.add_entry(
+                    entry.resource, full_url=entry.fullUrl, search={"mode": "match"}
+                )
+        assert writer.count == 10
+
+        data = bundle.dict()
+        for entry in data["entry"]:
+            entry["search"] = {"mode": "match"}
+        expected = Bundle.parse_obj(data)
+        if format_ == "json":
+            assert path.read_bytes() == expected.json(return_bytes=True)
+        else:
+            assert path.read_bytes() == expected.xml(return_bytes=True)
+
+    # no entries
+    stream = io.BytesIO()
+    with BundleWriter(stream, type="collection"):
+        pass
+    assert stream.getvalue() == Bundle(type="collection").json(return_bytes=True)
+
+    with pytest.raises(ValueError):
+        BundleWriter(io.BytesIO(), type="collection", entry=[])
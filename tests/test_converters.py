@@ -0,0 +1,129 @@
+# _*_ coding: utf-8 _*_
+import pytest
+
+from fhir.resources.binary import Binary
+from fhir.resources.converters import ConversionError, Converter, convert, convert_many
+from fhir.resources.DSTU2.medicationorder import MedicationOrder
+from fhir.resources.DSTU2.patient import Patient as PatientDSTU2
+from fhir.resources.medicationrequest import MedicationRequest
+from fhir.resources.observation import Observation
+from fhir.resources.patient import Patient
+from fhir.resources.STU3.observation import Observation as ObservationSTU3
+from fhir.resources.STU3.patient import Patient as PatientSTU3
+
+from .fixtures import STATIC_PATH
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+
+def get_dstu2_patient():
+    """ """
+    return PatientDSTU2.parse_obj(
+        {
+            "resourceType": "Patient",
+            "id": "p1",
+            "birthDate": "1974-12",
+            "_birthDate": {
+                "extension": [{"url": "http://example.org/ext", "valueString": "y"}]
+            },
+            "name": [{"family": ["van", "Gogh"], "given": ["Vincent"]}],
+            "careProvider": [{"reference": "Practitioner/1"}],
+            "animal": {"species": {"text": "dog"}},
+            "contained": [{"resourceType": "Organization", "id": "o1", "name": "X"}],
+        }
+    )
+
+
+def test_convert_patient():
+    """ """
+    patient = get_dstu2_patient()
+    converter = Converter("DSTU2", "R4B")
+    result = converter.convert(patient)
+    assert isinstance(result, Patient)
+    assert result.name[0].family == "van Gogh"
+    assert result.generalPractitioner[0].reference == "Practitioner/1"
+    assert result.birthDate__ext.extension[0].valueString == "y"
+    assert result.contained[0].name == "X"
+    assert converter.lost == {"Patient.animal": 1}
+    # result is valid
+    assert Patient.parse_raw(result.json()) == result
+
+    stu3 = convert(patient, "STU3")
+    assert isinstance(stu3, PatientSTU3)
+    assert stu3.animal.species.text == "dog"
+    dstu2 = convert(stu3, "DSTU2")
+    assert dstu2.careProvider[0].reference == "Practitioner/1"
+    assert dstu2.dict()["_birthDate"] == patient.dict()["_birthDate"]
+
+
+def test_convert_renamed_resource():
+    """ """
+    order = MedicationOrder.parse_obj(
+        {
+            "resourceType": "MedicationOrder",
+            "id": "m1",
+            "status": "active",
+            "dateWritten": "2020-01-02",
+            "patient": {"reference": "Patient/p1"},
+            "prescriber": {"reference": "Practitioner/1"},
+            "medicationCodeableConcept": {"text": "aspirin"},
+            "priorPrescription": {"reference": "MedicationOrder/m0"},
+            "note": "take with water",
+        }
+    )
+    request = convert(order, "R4B")
+    assert isinstance(request, MedicationRequest)
+    assert request.intent == "order"
+    assert request.subject.reference == "Patient/p1"
+    assert request.requester.reference == "Practitioner/1"
+    assert request.priorPrescription.reference == "MedicationRequest/m0"
+    assert request.note[0].text == "take with water"
+    assert str(request.authoredOn) == "2020-01-02"
+
+    order2 = convert(request, "DSTU2")
+    assert isinstance(order2, MedicationOrder)
+    assert order2.prescriber.reference == "Practitioner/1"
+    assert order2.priorPrescription.reference == "MedicationOrder/m0"
+    assert order2.note == "take with water"
+
+
+def test_convert_many_strict():
+    """ """
+    observation = ObservationSTU3.parse_obj(
+        {
+            "resourceType": "Observation",
+            "status": "final",
+            "code": {"text": "weight"},
+            "comment": "after lunch",
+            "context": {"reference": "Encounter/e1"},
+            "related": [{"target": {"reference": "Observation/o2"}}],
+        }
+    )
+    results = list(convert_many([observation, get_dstu2_patient()], "R4B"))
+    assert isinstance(results[0], Observation)
+    assert results[0].note[0].text == "after lunch"
+    assert results[0].encounter.reference == "Encounter/e1"
+    assert isinstance(results[1], Patient)
+
+    with pytest.raises(ConversionError) as exc_info:
+        Converter("STU3", "R4B", strict=True).convert(observation)
+    assert "Observation.related" in str(exc_info.value)
+    with pytest.raises(ConversionError):
+        Converter("DSTU2", "R4B").convert(observation)
+
+
+def test_convert_binary_round_trip():
+    """ """
+    patient = Patient.parse_file(STATIC_PATH / "Patient-with-ext.json")
+    for release in ("STU3", "DSTU2"):
+        result = convert(patient, release)
+        assert result.contained[0].content == patient.contained[0].data
+        # result is valid
+        assert type(result).parse_obj(result.dict()) == result
+        assert convert(result, "R4B").contained[0] == patient.contained[0]
+
+    # target would miss required ``content``
+    binary = Binary.parse_obj({"resourceType": "Binary", "contentType": "text/plain"})
+    with pytest.raises(ConversionError) as exc_info:
+        convert(binary, "STU3")
+    assert "Binary.content" in str(exc_info.value)
@@ -0,0 +1,110 @@
+# _*_ coding: utf-8 _*_
+import datetime
+import random
+
+import pytest  # type: ignore
+
+from fhir.resources import fhirtypes
+from fhir.resources.core.utils.dateparse import parse_datetime, parse_timezone
+from fhir.resources.DSTU2 import fhirtypes as dstu2_fhirtypes
+from fhir.resources.STU3 import fhirtypes as stu3_fhirtypes
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+DATE_TYPES = [
+    getattr(mod, name)
+    for mod in (fhirtypes, stu3_fhirtypes, dstu2_fhirtypes)
+    for name in ("Date", "DateTime", "Instant", "Time")
+]
+
+
+def get_samples(size=3000):
+    """Well formed values and their mutations (out of range parts,
+    wrong separators, non ascii digits, trailing garbage)."""
+    samples = [
+        "2018",
+        "0000",
+        "1973-06",
+        "1973-13",
+        "1973-00",
+        "1905-08-23",
+        "2020-02-30",
+        "2015-02-07T13:28:17-05:00",
+        "2017-01-01T00:00:00.000Z",
+        "2017-01-01T00:00:00Z",
+        "2017-01-01T00:00:00",
+        "2017-01-01T00:00",
+        "2017-01-01 00:00:00Z",
+        "2017-01-01T24:00:00Z",
+        "2017-01-01T23:59:60Z",
+        "2017-01-01T10:00:00.1234567Z",
+        "2017-01-01T10:00:00.1234567890123Z",
+        "2017-01-01T10:00:00+14:00",
+        "2017-01-01T10:00:00+14:01",
+        "2017-01-01T10:00:00+15:00",
+        "2017-01-01T10:00:00+0500",
+        "2017-01-01T10:00:00.Z",
+        "2017-01-01T10:00:00Zjunk",
+        "2018\n",
+        "٢٠١٨",
+        "2018-0٦",
+        "13:28:17",
+        "13:28:17.239",
+        "13:28:60",
+        "24:00:00",
+        "13:28",
+        "13:28:17Z",
+        "13:28:17.",
+        "",
+        "x",
+    ]
+    rnd = random.Random(1)
+    alphabet = "0123456789-:T.Z+ "
+    for _ in range(size):
+        sample = list(rnd.choice(samples[:22]))
+        for _ in range(rnd.randint(1, 2)):
+            if not sample:
+                break
+            sample[rnd.randrange(len(sample))] = rnd.choice(alphabet)
+        samples.append("".join(sample))
+    return samples
+
+
+def outcome(func, value):
+    """ """
+    try:
+        result = func(value)
+    except (ValueError, TypeError) as exc:
+        return exc.__class__
+    if isinstance(result, (datetime.datetime, datetime.time)):
+        return result.__class__, result, result.utcoffset()
+    return result.__class__, result
+
+
+@pytest.mark.parametrize("klass", DATE_TYPES)
+def test_fast_parsers_equivalence(klass):
+    """Fast path must accept and reject exactly same as regex path."""
+    for value in get_samples():
+        assert outcome(klass.validate, value) == outcome(
+            klass._validate_regex, value
+        ), f"{klass.__module__}.{klass.__name__}: {value!r}"
+
+
+def test_parse_datetime():
+    """ """
+    value = parse_datetime("2015-02-07T13:28:17.239-05:00")
+    assert value == datetime.datetime(
+        2015,
+        2,
+        7,
+        13,
+        28,
+        17,
+        239000,
+        tzinfo=datetime.timezone(datetime.timedelta(hours=-5)),
+    )
+    assert parse_datetime("2015-02-07T13:28:17").tzinfo is None
+    # unusual input is left for regex path
+    assert parse_datetime("2015-02-07 13:28:17Z") is None
+    assert parse_timezone("Z") is datetime.timezone.utc
+    assert parse_timezone("+14:30") is None
@@ -0,0 +1,272 @@
+# _*_ coding: utf-8 _*_
+import subprocess
+import sys
+
+import orjson
+import pytest  # type: ignore
+from pydantic import ValidationError, root_validator
+
+from fhir.resources.humanname import HumanName
+from fhir.resources.observation import Observation
+from fhir.resources.patient import Patient
+
+from .fixtures import STATIC_PATH
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+
+def test_serialization_plan():
+    """ """
+    plan = Patient.get_serialization_plan()
+    assert plan is Patient.get_serialization_plan()
+    assert [entry[1] for entry in plan] == Patient.elements_sequence()
+
+    plan_map = {entry[0]: entry for entry in plan}
+    assert plan_map["active"] == ("active", "active", True, "active__ext", "_active")
+    assert plan_map["name"] == ("name", "name", False, None, None)
+    # Resource.id doesn't have any primitive extension
+    assert plan_map["id"] == ("id", "id", True, None, None)
+
+
+def test_serialization_plan_dict():
+    """ """
+    patient = Patient.parse_file(STATIC_PATH / "Patient-with-ext.json")
+    data = patient.dict()
+    assert list(data.keys())[0] == "resourceType"
+    assert data["_active"]["extension"][0]["valueCode"] == "archived"
+    assert "active" not in patient.dict(by_alias=False)
+    assert "active__ext" in patient.dict(by_alias=False)
+
+    observation = Observation.parse_file(STATIC_PATH / "Observation.json")
+    assert Observation.parse_obj(observation.dict()).dict() == observation.dict()
+
+
+def test_json_writer():
+    """ """
+    import orjson
+
+    from fhir.resources.core.utils.jsonwriter import json_dumps_model
+
+    patient = Patient.parse_file(STATIC_PATH / "Patient-with-ext.json")
+    observation = Observation.parse_file(STATIC_PATH / "Observation.json")
+    for model in (patient, observation):
+        for params in (
+            {},
+            {"exclude_none": False},
+            {"exclude_comments": True},
+            {"by_alias": False},
+        ):
+            expected = orjson.dumps(
+                model.dict(**params), default=model.__json_encoder__
+            )
+            assert json_dumps_model(model, **params) == expected
+        assert model.json(return_bytes=True) == json_dumps_model(model)
+        assert model.json() == json_dumps_model(model).decode()
+
+    # empty element is discarded
+    patient.name[0].given = []
+    assert b'"given"' not in json_dumps_model(patient.name[0])
+    assert (
+        json_dumps_model(patient.name[0], exclude_none=False).count(b'"given":[]') == 1
+    )
+
+
+def test_construct_fhir():
+    """ """
+    from fhir.resources import construct_fhir_element
+    from fhir.resources.bundle import Bundle
+
+    observation = Observation.parse_file(STATIC_PATH / "Observation.json")
+    patient = Patient.parse_file(STATIC_PATH / "Patient-with-ext.json")
+    bundle = Bundle.parse_obj(
+        {
+            "resourceType": "Bundle",
+            "type": "collection",
+            "entry": [
+                {"resource": patient.dict()},
+                {"resource": observation.dict()},
+            ],
+        }
+    )
+    data = orjson.loads(bundle.json())
+    constructed = Bundle.construct_fhir(data)
+    assert isinstance(constructed.entry[0].resource, Patient)
+    assert isinstance(constructed.entry[1].resource, Observation)
+    assert constructed == bundle
+    assert constructed.json() == bundle.json()
+    assert constructed.xml() == bundle.xml()
+    assert constructed.entry[1].__fields_set__ == bundle.entry[1].__fields_set__
+
+    # field name is also accepted
+    obj = Patient.construct_fhir(orjson.loads(patient.json(by_alias=False)))
+    assert obj == patient
+
+    # model's own ``dict()`` (``OrderedDict`` values)
+    obj = Patient.construct_fhir(patient.dict())
+    assert isinstance(obj.name[0], HumanName)
+    assert obj.json() == patient.json()
+    assert obj.xml() == patient.xml()
+    obj = Bundle.construct_fhir(bundle.dict())
+    assert isinstance(
+        obj.entry[1].resource.code, bundle.entry[1].resource.code.__class__
+    )
+    assert obj.json() == bundle.json()
+    assert obj.xml() == bundle.xml()
+
+    obj = construct_fhir_element(
+        "Observation", (STATIC_PATH / "Observation.json").read_bytes(), validate=False
+    )
+    assert obj == observation
+    obj = construct_fhir_element("Observation", STATIC_PATH / "Observation.json", False)
+    assert obj == observation
+
+    with pytest.raises(ValidationError) as exc_info:
+        Patient.construct_fhir({"resourceType": "Observation"})
+    assert "wrong.resource_type" in str(exc_info.value)
+
+    with pytest.raises(ValidationError):
+        Patient.construct_fhir({"unknown": True})
+
+
+def test_warmup():
+    """ """
+    from fhir.resources import fhirtypesvalidators, warmup
+
+    timings = warmup(["Patient", "Observation"], profile=True)
+    assert set(timings.keys()) <= {"patient", "observation"}
+    assert fhirtypesvalidators.MODEL_CLASSES["Patient"][0] is Patient
+    # nested element classes are imported as well
+    assert fhirtypesvalidators.MODEL_CLASSES["HumanName"][0] is not None
+    assert warmup("Patient", profile=True) == {}
+
+    # fresh interpreter, module is imported only by warmup
+    script = "\n".join(
+        [
+            "import sys",
+            "from fhir.resources import fhirtypesvalidators, warmup",
+            "from fhir.resources.core.utils import construct",
+            "name = 'fhir.resources.immunizationevaluation'",
+            "assert name not in sys.modules",
+            "assert fhirtypesvalidators.MODEL_CLASSES"
+            "['ImmunizationEvaluation'][0] is None",
+            "timings = warmup('ImmunizationEvaluation', profile=True)",
+            "assert list(timings) == ['immunizationevaluation'], timings",
+            "assert name in sys.modules",
+            "klass = fhirtypesvalidators.MODEL_CLASSES['ImmunizationEvaluation'][0]",
+            "assert klass is sys.modules[name].ImmunizationEvaluation",
+            "assert klass in construct._CONSTRUCT_PLANS",
+            "assert klass.get_serialization_plan.cache_info().currsize > 0",
+        ]
+    )
+    subprocess.check_call([sys.executable, "-c", script])
+
+
+def test_content_hash_eq_deep_copy():
+    """ """
+    import copy
+    import pickle
+
+    patient = Patient.parse_file(STATIC_PATH / "Patient-with-ext.json")
+    other = Patient.parse_file(STATIC_PATH / "Patient-with-ext.json")
+    assert patient is not other
+    assert patient.content_hash() == other.content_hash()
+    assert patient == other
+    assert patient == patient.dict()
+
+    # fhir_comments are ignored
+    other.fhir_comments = ["comment"]
+    assert patient == other
+
+    copied = patient.deep_copy()
+    assert copied == patient
+    assert copied.name is not patient.name
+    assert copied.name[0] is not patient.name[0]
+    assert copied.gender__ext is not patient.gender__ext
+    # nested mutation
+    copied.name[0].family = "Other"
+    assert copied != patient
+    assert copied.content_hash() != patient.content_hash()
+    assert patient.name[0].family != "Other"
+
+    # in place mutation of list
+    copied = patient.deep_copy()
+    assert copied == patient
+    copied.name.append(HumanName(family="Y"))
+    assert copied != patient
+    assert copied.content_hash() != patient.content_hash()
+    assert Patient(id="a", fhir_comments=["x"]) == Patient(id="a")
+
+    assert copy.deepcopy(patient) == patient
+    assert pickle.loads(pickle.dumps(patient)) == patient
+    assert Observation.parse_file(STATIC_PATH / "Observation.json") != patient
+
+
+def test_freeze_evolve():
+    """ """
+    import pickle
+
+    from fhir.resources.core.utils.frozen import FrozenList
+
+    patient = Patient.parse_file(STATIC_PATH / "Patient-with-ext.json")
+    frozen = patient.freeze()
+    assert frozen.is_frozen() is True
+    assert patient.is_frozen() is False
+    assert frozen.freeze() is frozen
+    assert frozen == patient
+    assert isinstance(frozen.name, FrozenList)
+    assert frozen.json() == patient.json()
+
+    with pytest.raises(TypeError):
+        frozen.active = False
+    with pytest.raises(TypeError):
+        frozen.name[0].family = "Other"
+    with pytest.raises(TypeError):
+        frozen.name.append(None)
+    with pytest.raises(TypeError):
+        hash(patient)
+    assert {frozen: 1}[patient.freeze()] == 1
+
+    evolved = frozen.evolve(gender="female", name=[frozen.name[0].evolve(family="X")])
+    assert evolved.is_frozen() is True
+    assert evolved.gender == "female"
+    assert evolved.name[0].family == "X"
+    # unchanged sub-elements are shared
+    assert evolved.address is frozen.address
+    assert evolved.name[0].given is frozen.name[0].given
+    assert frozen.gender == "male"
+    assert evolved != frozen
+
+    with pytest.raises(ValidationError):
+        frozen.evolve(birthDate="not-a-date")
+    observation = Observation.parse_file(STATIC_PATH / "Observation.json").freeze()
+    with pytest.raises(ValidationError):
+        # choice type, only one value[x] is allowed
+        observation.evolve(valueString="text")
+
+    assert pickle.loads(pickle.dumps(frozen)).is_frozen() is True
+    thawed = frozen.deep_copy()
+    assert thawed.is_frozen() is False
+    thawed.active = False
+    thawed.name.append(thawed.name[0])
+
+    # pydantic ``copy`` of frozen model is mutable, with plain lists
+    copied = frozen.copy(update={"active": False})
+    assert copied.is_frozen() is False
+    assert copied.name.__class__ is list
+    assert copied.name[0].given.__class__ is list
+    copied.name[0].family = "Other"
+    assert copied.active is False
+    assert frozen.name[0].family != "Other"
+
+    # values replaced by root validators are frozen too
+    class NamedPatient(Patient):
+        @root_validator(pre=True, allow_reuse=True)
+        def set_name(cls, values):
+            if values.get("gender") == "other":
+                values["name"] = [HumanName(family="V", given=["A"])]
+            return values
+
+    evolved = NamedPatient.parse_obj(patient.dict()).freeze().evolve(gender="other")
+    assert isinstance(evolved.name, FrozenList)
+    assert evolved.name[0].is_frozen() is True
+    assert isinstance(evolved.name[0].given, FrozenList)
@@ -0,0 +1,124 @@
+# _*_ coding: utf-8 _*_
+import decimal
+
+import pytest  # type: ignore
+
+from fhir.resources.fhirpath import FHIRPathError, compile, evaluate
+from fhir.resources.observation import Observation
+from fhir.resources.patient import Patient
+from fhir.resources.references import ReferenceIndex
+
+from .fixtures import STATIC_PATH
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+
+def get_observation():
+    """ """
+    return Observation.parse_obj(
+        {
+            "resourceType": "Observation",
+            "id": "o1",
+            "status": "final",
+            "code": {"text": "Body Weight"},
+            "subject": {"reference": "#p1"},
+            "contained": [{"resourceType": "Patient", "id": "p1"}],
+            "effectiveDateTime": "2020-01-02",
+            "valueQuantity": {"value": 72.5, "unit": "kg"},
+        }
+    )
+
+
+def test_fhirpath_navigation():
+    """ """
+    patient = Patient.parse_file(STATIC_PATH / "Patient-with-ext.json")
+    expr = compile("Patient.name.given", Patient)
+    assert expr is compile("Patient.name.given", Patient)
+    assert expr(patient) == ["Peter", "James", "Jim"]
+    # resolved at runtime, without type
+    assert compile("name.given")(patient) == ["Peter", "James", "Jim"]
+    assert evaluate(patient, "name.where(use = 'official').family") == ["Chalmers"]
+    assert evaluate(patient, "Patient.name[0].given[1]") == ["James"]
+    assert evaluate(patient, "name.given.first() | name.family") == [
+        "Peter",
+        "Chalmers",
+    ]
+    assert evaluate(patient, "name.select(given.first())") == ["Peter", "Jim"]
+    assert evaluate(patient, "name.exists(family.exists())") == [True]
+    assert evaluate(patient, "name.given.count() > 2 and {}.empty()") == [True]
+    assert evaluate(patient, "telecom.where(system='phone').value") == [
+        "(03) 5555 6473"
+    ]
+    # type name of other resource
+    assert evaluate(patient, "Practitioner.name") == []
+    # choice type
+    assert evaluate(patient, "deceased.exists() and deceased != false") == [True]
+    assert evaluate(patient, "(Patient.deceased as boolean)") == [True]
+    assert evaluate(patient, "multipleBirth is integer") == [True]
+    # partial date
+    assert evaluate(patient, "birthDate < @2000-01-01") == [True]
+    assert evaluate(patient, "birthDate = @1974-12") == [True]
+
+
+def test_fhirpath_types_and_resolve():
+    """ """
+    observation = get_observation()
+    index = ReferenceIndex.build(observation)
+    assert evaluate(observation, "Observation.value.ofType(Quantity).value") == [
+        decimal.Decimal("72.5")
+    ]
+    assert evaluate(observation, "(value as Quantity).unit") == ["kg"]
+    assert evaluate(observation, "value.as(string)") == []
+    assert evaluate(observation, "value is Quantity") == [True]
+    assert evaluate(observation, "effective.ofType(dateTime) >= @2020-01-01") == [True]
+    assert evaluate(observation, "code.text ~ 'body  weight'") == [True]
+    assert evaluate(observation, "contained.ofType(Patient).id") == ["p1"]
+
+    expr = compile("Observation.subject.where(resolve() is Patient)", Observation)
+    assert expr(observation) == []
+    assert expr(observation, index=index) == [observation.subject]
+    assert evaluate(observation, "subject.resolve().id", index=index) == ["p1"]
+    assert compile("%code = 'x'", Observation)(observation, variables={"code": "x"})
+
+
+def test_fhirpath_primitive_extension_and_precision():
+    """ """
+    patient = Patient.parse_obj(
+        {
+            "resourceType": "Patient",
+            "birthDate": "2020-01-01",
+            "_birthDate": {
+                "id": "b1",
+                "extension": [{"url": "http://example.org/ext", "valueString": "y"}],
+            },
+            "name": [{"family": "X", "_family": {"extension": [{"url": "http://f"}]}}],
+        }
+    )
+    assert evaluate(patient, "Patient.birthDate.extension.url") == [
+        "http://example.org/ext"
+    ]
+    assert evaluate(
+        patient, "Patient.birthDate.extension('http://example.org/ext').value"
+    ) == ["y"]
+    assert evaluate(patient, "birthDate.id") == ["b1"]
+    assert evaluate(patient, "name.family.extension.url") == ["http://f"]
+    assert evaluate(patient, "gender.extension") == []
+
+    # different precision: empty, unless already different
+    assert evaluate(patient, "@2020 = @2020-01-01") == []
+    assert evaluate(patient, "birthDate = @2020") == []
+    assert evaluate(patient, "@2020 = @2021-01-01") == [False]
+    assert evaluate(patient, "@2020 = @2020-01") == []
+    assert evaluate(patient, "@2020 = @2021-01") == [False]
+    assert evaluate(Patient(birthDate="2020-01"), "Patient.birthDate = @2020") == []
+    assert evaluate(patient, "birthDate = @2020-01-01") == [True]
+
+
+@pytest.mark.parametrize(
+    "expression",
+    ["Observation.foo", "value.ofType(Quantity).foo", "name.", "where(", "foo(1)"],
+)
+def test_fhirpath_errors(expression):
+    """ """
+    with pytest.raises(FHIRPathError):
+        compile(expression, Observation)
@@ -0,0 +1,76 @@
+# _*_ coding: utf-8 _*_
+import gzip
+import io
+
+import pytest  # type: ignore
+from pydantic import ValidationError
+
+from fhir.resources.ndjson import iter_ndjson, write_ndjson
+from fhir.resources.observation import Observation
+from fhir.resources.patient import Patient
+
+from .fixtures import STATIC_PATH
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+
+def get_models():
+    """ """
+    return [
+        Patient.parse_file(STATIC_PATH / "Patient-with-ext.json"),
+        Observation.parse_file(STATIC_PATH / "Observation.json"),
+    ]
+
+
+def test_ndjson_write_and_read(tmp_path):
+    """ """
+    models = get_models()
+    stream = io.BytesIO()
+    assert write_ndjson(models, stream) == 2
+    lines = stream.getvalue().splitlines()
+    assert lines == [m.json(return_bytes=True) for m in models]
+
+    stream.seek(0)
+    result = list(iter_ndjson(stream))
+    assert [m.resource_type for m in result] == ["Patient", "Observation"]
+    assert [m.dict() for m in result] == [m.dict() for m in models]
+
+    # gzip file
+    path = tmp_path / "export.ndjson.gz"
+    write_ndjson(models, path)
+    with gzip.open(path, "rb") as fp:
+        assert fp.read().splitlines() == lines
+    result = list(iter_ndjson(path))
+    assert [m.dict() for m in result] == [m.dict() for m in models]
+
+    # gzip stream
+    result = list(iter_ndjson(io.BytesIO(path.read_bytes())))
+    assert len(result) == 2
+
+    # text stream
+    result = list(iter_ndjson(io.StringIO(stream.getvalue().decode())))
+    assert len(result) == 2
+
+
+def test_ndjson_errors(tmp_path):
+    """ """
+    models = get_models()
+    stream = io.BytesIO()
+    write_ndjson(models, stream)
+    data = stream.getvalue().replace(b"\n", b'\n{"id": "no-type"}\n\n[1\n', 1)
+
+    with pytest.raises(ValidationError):
+        list(iter_ndjson(io.BytesIO(data)))
+
+    errors = list()
+    result = list(iter_ndjson(io.BytesIO(data), skip_errors=True, errors=errors))
+    assert len(result) == 2
+    assert [error.lineno for error in errors] == [2, 4]
+
+    # explicit resource type
+    errors = list()
+    result = list(
+        iter_ndjson(io.BytesIO(data), "Patient", skip_errors=True, errors=errors)
+    )
+    assert len(result) == 2
+    assert [error.lineno for error in errors] == [4, 5]
@@ -0,0 +1,75 @@
+# _*_ coding: utf-8 _*_
+import orjson
+import pytest  # type: ignore
+from pydantic import ValidationError
+
+from fhir.resources.observation import Observation
+from fhir.resources.parallel import _decode, _transport, parse_many
+from fhir.resources.patient import Patient
+
+from .fixtures import STATIC_PATH
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+
+def get_payloads():
+    """ """
+    patient = (STATIC_PATH / "Patient-with-ext.json").read_bytes()
+    observation = (STATIC_PATH / "Observation.json").read_bytes()
+    return [patient, observation] * 5
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_parse_many(workers):
+    """ """
+    payloads = get_payloads()
+    expected = [
+        Patient.parse_raw(p) if idx % 2 == 0 else Observation.parse_raw(p)
+        for idx, p in enumerate(payloads)
+    ]
+    result = list(parse_many(payloads, workers=workers, chunk_size=3))
+    assert [m.dict() for m in result] == [m.dict() for m in expected]
+    assert [m.__class__ for m in result] == [m.__class__ for m in expected]
+    assert result[0].xml() == expected[0].xml()
+
+    result = list(parse_many(payloads, workers=workers, output="json"))
+    assert result == [m.json(return_bytes=True) for m in expected]
+
+    result = list(
+        parse_many(
+            [Patient.parse_raw(payloads[0]).dict()] * 3,
+            "Patient",
+            workers=workers,
+            output="dict",
+            ordered=False,
+        )
+    )
+    assert sorted(idx for idx, _ in result) == [0, 1, 2]
+    assert all(value == orjson.loads(expected[0].json()) for _, value in result)
+
+
+def test_model_transport():
+    """Model crosses the process boundary as JSON bytes."""
+    payload = (STATIC_PATH / "Patient-with-ext.json").read_bytes()
+    _, error, result = _transport(0, payload, None, "model", False)
+    assert error is False
+    assert orjson.loads(result)["resourceType"] == "Patient"
+    model = _decode(error, result, "model")
+    assert isinstance(model, Patient)
+    assert model == Patient.parse_raw(payload)
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_parse_many_errors(workers):
+    """ """
+    payloads = get_payloads()[:2] + [b'{"resourceType": "Patient", "active": "?"}']
+    with pytest.raises(ValidationError):
+        list(parse_many(payloads, workers=workers))
+
+    result = list(parse_many(payloads, workers=workers, return_exceptions=True))
+    assert isinstance(result[0], Patient)
+    assert isinstance(result[1], Observation)
+    assert isinstance(result[2], ValidationError)
+
+    with pytest.raises(ValueError):
+        list(parse_many(payloads, workers=workers, output="xml"))
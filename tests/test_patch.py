@@ -0,0 +1,127 @@
+# _*_ coding: utf-8 _*_
+import json
+
+import pytest  # type: ignore
+
+from fhir.resources import apply_patch, diff
+from fhir.resources.medicationrequest import MedicationRequest
+from fhir.resources.patch import PatchError
+from fhir.resources.patient import Patient
+
+from .fixtures import STATIC_PATH
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+
+def get_patients():
+    """ """
+    patient = Patient.parse_file(STATIC_PATH / "Patient-with-ext.json")
+    data = patient.dict()
+    data["name"].insert(1, {"family": "Jones", "given": ["Anna"]})
+    data["name"][0]["given"][1] = "Jimmy"
+    data["telecom"] = data["telecom"][1:]
+    data["birthDate"] = "1975-01-01"
+    data["_birthDate"] = {
+        "extension": [{"url": "http://example.org/e", "valueCode": "x"}]
+    }
+    data.pop("gender")
+    return patient, Patient.parse_obj(data)
+
+
+def test_diff_json_patch():
+    """ """
+    a, b = get_patients()
+    assert diff(a, a) == []
+    patch = diff(a, b)
+    assert [(item["op"], item["path"]) for item in patch] == [
+        ("replace", "/name/0/given/1"),
+        ("add", "/name/1"),
+        ("remove", "/telecom/0"),
+        ("remove", "/gender"),
+        ("replace", "/birthDate"),
+        ("add", "/_birthDate"),
+    ]
+    patched = apply_patch(a, patch)
+    assert patched.dict() == b.dict()
+    assert a.gender is not None
+    # JSON compatible values
+    assert patch[4]["value"] == "1975-01-01"
+    assert apply_patch(a, json.loads(json.dumps(patch))).dict() == b.dict()
+    # untouched elements are not copied
+    assert patched.contact is a.contact
+
+
+def test_diff_fhirpath_patch():
+    """ """
+    a, b = get_patients()
+    parameters = diff(a, b, format="fhirpath")
+    assert parameters.resource_type == "Parameters"
+    operations = [
+        {part.name: part for part in parameter.part}
+        for parameter in parameters.parameter
+    ]
+    assert [(op["type"].valueCode, op["path"].valueString) for op in operations] == [
+        ("replace", "Patient.name[0].given[1]"),
+        ("insert", "Patient.name"),
+        ("delete", "Patient.telecom[0]"),
+        ("delete", "Patient.gender"),
+        ("replace", "Patient.birthDate"),
+        ("add", "Patient.birthDate"),
+    ]
+    assert operations[-1]["name"].valueString == "extension"
+    assert apply_patch(a, parameters).dict() == b.dict()
+    assert apply_patch(a, parameters.dict()).dict() == b.dict()
+    # reverse, removes primitive extension
+    assert apply_patch(b, diff(b, a, format="fhirpath")).dict() == a.dict()
+
+
+def test_apply_patch_errors():
+    """ """
+    a, _ = get_patients()
+    patched = apply_patch(
+        a,
+        [
+            {"op": "test", "path": "/name/0/given/0", "value": "Peter"},
+            {"op": "move", "from": "/name/0/given/0", "path": "/name/0/given/-"},
+        ],
+    )
+    assert patched.name[0].given == ["James", "Peter"]
+    for patch in (
+        [{"op": "test", "path": "/id", "value": "other"}],
+        [{"op": "add", "path": "/unknown", "value": 1}],
+        [{"op": "add", "path": "/name/10", "value": {"text": "x"}}],
+        [{"op": "replace", "path": "/photo", "value": []}],
+    ):
+        with pytest.raises(PatchError):
+            apply_patch(a, patch)
+
+
+def test_patch_choice_type():
+    """Required choice element changes its type by ``remove`` and ``add``,
+    root validators run once after all operations."""
+    data = {
+        "resourceType": "MedicationRequest",
+        "status": "active",
+        "intent": "order",
+        "subject": {"reference": "Patient/p1"},
+        "medicationCodeableConcept": {"text": "aspirin"},
+    }
+    a = MedicationRequest.parse_obj(data)
+    data.pop("medicationCodeableConcept")
+    data["medicationReference"] = {"reference": "Medication/m1"}
+    b = MedicationRequest.parse_obj(data)
+    for format in ("json-patch", "fhirpath"):
+        assert apply_patch(a, diff(a, b, format=format)).dict() == b.dict()
+    assert (
+        apply_patch(a, json.loads(json.dumps(diff(a, b)))).medicationReference
+        == b.medicationReference
+    )
+
+    # patched model is invalid
+    for patch in (
+        [{"op": "remove", "path": "/status"}],
+        [{"op": "remove", "path": "/medicationCodeableConcept"}],
+        [{"op": "add", "path": "/medicationReference", "value": {"reference": "x"}}],
+    ):
+        with pytest.raises(PatchError):
+            apply_patch(a, patch)
@@ -0,0 +1,243 @@
+# _*_ coding: utf-8 _*_
+import re
+
+import pytest  # type: ignore
+
+from fhir.resources.observation import Observation
+from fhir.resources.patient import Patient
+from fhir.resources.profiles import ProfileError, ProfileIssue, compile_profile
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+LOINC = "http://loinc.org"
+CATEGORY = "http://terminology.hl7.org/CodeSystem/observation-category"
+
+
+def element(id_, min_, max_, base=(0, "*"), **extra):
+    """ """
+    path = re.sub(r":[^.]+", "", id_)
+    data = {
+        "id": id_,
+        "path": path,
+        "min": min_,
+        "max": max_,
+        "base": {"path": path, "min": base[0], "max": base[1]},
+    }
+    if ":" in id_.rpartition(".")[2]:
+        data["sliceName"] = id_.rpartition(":")[2]
+    data.update(extra)
+    return data
+
+
+def structure_definition(type_, url, elements):
+    """ """
+    return {
+        "resourceType": "StructureDefinition",
+        "url": url,
+        "version": "1.0.0",
+        "name": "TestProfile",
+        "status": "active",
+        "kind": "resource",
+        "abstract": False,
+        "type": type_,
+        "derivation": "constraint",
+        "snapshot": {"element": [element(type_, 0, "*")] + elements},
+    }
+
+
+def coded(system, code):
+    """ """
+    return {"coding": [{"system": system, "code": code}]}
+
+
+BLOOD_PRESSURE = structure_definition(
+    "Observation",
+    "http://example.org/StructureDefinition/bp",
+    [
+        element(
+            "Observation.category",
+            1,
+            "*",
+            slicing={
+                "discriminator": [{"type": "pattern", "path": "$this"}],
+                "rules": "open",
+            },
+        ),
+        element(
+            "Observation.category:VSCat",
+            1,
+            "1",
+            patternCodeableConcept=coded(CATEGORY, "vital-signs"),
+        ),
+        element(
+            "Observation.status",
+            1,
+            "1",
+            (1, "1"),
+            binding={
+                "strength": "required",
+                "valueSet": "http://hl7.org/fhir/ValueSet/observation-status",
+            },
+        ),
+        element("Observation.value[x]", 0, "1", (0, "1"), type=[{"code": "Quantity"}]),
+        element(
+            "Observation.component",
+            2,
+            "*",
+            slicing={
+                "discriminator": [{"type": "pattern", "path": "code"}],
+                "rules": "closed",
+            },
+        ),
+        element("Observation.component:systolic", 1, "1"),
+        element(
+            "Observation.component:systolic.code",
+            1,
+            "1",
+            (1, "1"),
+            patternCodeableConcept=coded(LOINC, "8480-6"),
+        ),
+        element("Observation.component:systolic.value[x]", 0, "1", (0, "1")),
+        element("Observation.component:systolic.value[x].unit", 1, "1", (0, "1")),
+        element("Observation.component:diastolic", 1, "1"),
+        element(
+            "Observation.component:diastolic.code",
+            1,
+            "1",
+            (1, "1"),
+            patternCodeableConcept=coded(LOINC, "8462-4"),
+        ),
+    ],
+)
+
+
+def get_observation(codes=("8480-6", "8462-4"), **extra):
+    """ """
+    data = {
+        "resourceType": "Observation",
+        "status": "final",
+        "category": [coded(CATEGORY, "vital-signs")],
+        "code": {"text": "Blood pressure"},
+        "component": [
+            {"code": coded(LOINC, code), "valueQuantity": {"value": 80, "unit": "mmHg"}}
+            for code in codes
+        ],
+    }
+    data.update(extra)
+    return Observation.parse_obj(data)
+
+
+def test_compile_profile():
+    """ """
+    profile = compile_profile(BLOOD_PRESSURE)
+    assert compile_profile(BLOOD_PRESSURE) is profile
+    assert [rule.id for rule in profile.plan()] == [
+        "Observation.category",
+        "Observation.value[x]",
+        "Observation.component",
+    ]
+    assert profile.validate(get_observation()) == []
+    assert profile.is_valid(get_observation(), terminology=lambda *args: True)
+
+    with pytest.raises(ProfileError):
+        compile_profile(
+            {"resourceType": "StructureDefinition", "type": "Patient", "url": "x"}
+        )
+
+
+def test_profile_validate():
+    """ """
+    profile = compile_profile(BLOOD_PRESSURE)
+    observation = get_observation(
+        codes=("8480-6", "1111-1", "8480-6"), valueString="120/80", category=None
+    )
+    observation.component[0].valueQuantity.unit = None
+    issues = profile.validate(
+        observation, terminology=lambda value_set, system, code: code != "final"
+    )
+    assert [(issue.location, issue.message) for issue in issues] == [
+        ("Observation.category", "minimum required = 1, but only found 0"),
+        (
+            "Observation.category",
+            "slice 'VSCat' minimum required = 1, but only found 0",
+        ),
+        (
+            "Observation.status",
+            "code is not in value set "
+            "'http://hl7.org/fhir/ValueSet/observation-status' (required)",
+        ),
+        ("Observation.value", "type of 'valueString' is not allowed"),
+        (
+            "Observation.component[0].value.unit",
+            "minimum required = 1, but only found 0",
+        ),
+        ("Observation.component[1]", "value doesn't match any slice (closed)"),
+        (
+            "Observation.component",
+            "slice 'systolic' maximum allowed = 1, but found 2",
+        ),
+        (
+            "Observation.component",
+            "slice 'diastolic' minimum required = 1, but only found 0",
+        ),
+    ]
+    assert profile.validate(Patient.construct()) == [
+        ProfileIssue("error", "Observation", "Patient", "expected type 'Observation'")
+    ]
+
+
+def test_profile_extension_slices():
+    """ """
+    profile = compile_profile(
+        structure_definition(
+            "Patient",
+            "http://example.org/StructureDefinition/patient",
+            [
+                element(
+                    "Patient.extension",
+                    0,
+                    "*",
+                    slicing={
+                        "discriminator": [{"type": "value", "path": "url"}],
+                        "rules": "open",
+                    },
+                ),
+                element(
+                    "Patient.extension:race",
+                    1,
+                    "1",
+                    type=[
+                        {"code": "Extension", "profile": ["http://example.org/race"]}
+                    ],
+                ),
+                element("Patient.active", 0, "1", (0, "1"), fixedBoolean=True),
+                element(
+                    "Patient.link",
+                    0,
+                    "*",
+                    slicing={
+                        "discriminator": [{"type": "profile", "path": "other"}],
+                        "rules": "open",
+                    },
+                ),
+                element("Patient.link:other", 0, "1"),
+            ],
+        )
+    )
+    patient = Patient.parse_obj(
+        {
+            "resourceType": "Patient",
+            "active": True,
+            "extension": [{"url": "http://example.org/race", "valueString": "x"}],
+        }
+    )
+    assert profile.validate(patient) == []
+    patient.extension[0].url = "http://example.org/other"
+    patient.active = False
+    assert [issue.element for issue in profile.validate(patient)] == [
+        "Patient.extension:race",
+        "Patient.active",
+    ]
+    assert profile.unsupported == [
+        ("Patient.link:other", "slice discriminator is not supported")
+    ]
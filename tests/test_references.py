@@ -0,0 +1,142 @@
+# _*_ coding: utf-8 _*_
+from fhir.resources.bundle import Bundle
+from fhir.resources.references import (
+    ReferenceIndex,
+    iter_references,
+    rewrite_references,
+)
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+
+def get_transaction_bundle():
+    """ """
+    return Bundle.parse_obj(
+        {
+            "resourceType": "Bundle",
+            "type": "transaction",
+            "entry": [
+                {
+                    "fullUrl": "urn:uuid:61ebe359-bfdc-4613-8bf2-c5e300945f0a",
+                    "resource": {
+                        "resourceType": "Patient",
+                        "active": True,
+                        "generalPractitioner": [{"reference": "#gp"}],
+                        "contained": [
+                            {
+                                "resourceType": "Practitioner",
+                                "id": "gp",
+                                "active": True,
+                            }
+                        ],
+                    },
+                    "request": {"method": "POST", "url": "Patient"},
+                },
+                {
+                    "fullUrl": "http://example.org/fhir/Patient/p1",
+                    "resource": {
+                        "resourceType": "Patient",
+                        "id": "p1",
+                        "meta": {"versionId": "2"},
+                        "active": True,
+                    },
+                    "request": {"method": "PUT", "url": "Patient/p1"},
+                },
+                {
+                    "fullUrl": "http://example.org/fhir/Observation/o1",
+                    "resource": {
+                        "resourceType": "Observation",
+                        "id": "o1",
+                        "status": "final",
+                        "code": {"text": "weight"},
+                        "subject": {
+                            "reference": "urn:uuid:61ebe359-bfdc-4613-8bf2-c5e300945f0a"
+                        },
+                        "performer": [
+                            {"reference": "Patient/p1"},
+                            {"reference": "Patient/p1/_history/2"},
+                            {"reference": "http://other.org/fhir/Patient/p1"},
+                        ],
+                        "extension": [
+                            {
+                                "url": "http://example.org/ext",
+                                "valueReference": {"reference": "Observation/o1"},
+                            }
+                        ],
+                    },
+                    "request": {"method": "PUT", "url": "Observation/o1"},
+                },
+            ],
+        }
+    )
+
+
+def test_iter_references():
+    """ """
+    bundle = get_transaction_bundle()
+    locations = list(iter_references(bundle))
+    assert [loc.reference.reference for loc in locations] == [
+        "#gp",
+        "Observation/o1",
+        "Patient/p1",
+        "Patient/p1/_history/2",
+        "http://other.org/fhir/Patient/p1",
+        "urn:uuid:61ebe359-bfdc-4613-8bf2-c5e300945f0a",
+    ]
+    patient = bundle.entry[0].resource
+    observation = bundle.entry[2].resource
+    assert locations[0].owner is patient
+    assert locations[0].field_name == "generalPractitioner"
+    assert locations[0].resource is patient
+    assert locations[1].owner is observation.extension[0]
+    assert locations[1].resource is observation
+    assert locations[-1].field_name == "subject"
+    assert locations[-1].resource is observation
+
+
+def test_reference_index_resolve():
+    """ """
+    bundle = get_transaction_bundle()
+    index = ReferenceIndex.build(bundle)
+    patient, patient_p1, observation = (entry.resource for entry in bundle.entry)
+    performer, versioned, external, subject = [
+        loc.reference for loc in index.iter_references()
+    ][2:]
+
+    assert index.resolve(subject) is patient
+    assert index.resolve(performer) is patient_p1
+    assert index.resolve(performer, observation) is patient_p1
+    assert index.resolve(versioned) is patient_p1
+    assert index.resolve("Patient/p1/_history/1") is None
+    assert index.resolve(external) is None
+    assert index.resolve("http://example.org/fhir/Patient/p1") is patient_p1
+    assert index.resolve("#gp", patient) is patient.contained[0]
+    assert index.resolve("#", patient) is patient
+    assert index.resolve("#gp") is None
+    assert index.resolve("#gp", observation) is None
+    assert "Observation/o1" in index
+    assert index.resolve(None) is None
+
+
+def test_rewrite_references():
+    """ """
+    bundle = get_transaction_bundle()
+    index = ReferenceIndex.build(bundle)
+    count = index.rewrite(
+        {"urn:uuid:61ebe359-bfdc-4613-8bf2-c5e300945f0a": "Patient/new1"}
+    )
+    assert count == 1
+    assert bundle.entry[2].resource.subject.reference == "Patient/new1"
+
+    count = rewrite_references(
+        bundle,
+        lambda value: value.replace("Patient/p1", "Patient/p2")
+        if value.startswith("Patient/p1")
+        else None,
+    )
+    assert count == 2
+    assert [p.reference for p in bundle.entry[2].resource.performer] == [
+        "Patient/p2",
+        "Patient/p2/_history/2",
+        "http://other.org/fhir/Patient/p1",
+    ]
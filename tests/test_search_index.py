@@ -0,0 +1,168 @@
+# _*_ coding: utf-8 _*_
+import datetime
+import decimal
+
+from fhir.resources.bundle import Bundle
+from fhir.resources.observation import Observation
+from fhir.resources.patient import Patient
+from fhir.resources.search_index import (
+    DateRow,
+    QuantityRow,
+    ReferenceRow,
+    SearchIndexer,
+    StringRow,
+    TokenRow,
+    date_range,
+)
+
+from .fixtures import STATIC_PATH
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+UTC = datetime.timezone.utc
+
+
+def search_parameter(code, base, type_, expression):
+    """ """
+    return {
+        "resourceType": "SearchParameter",
+        "url": f"http://example.org/SearchParameter/{code}",
+        "name": code,
+        "status": "active",
+        "description": code,
+        "code": code,
+        "base": base,
+        "type": type_,
+        "expression": expression,
+    }
+
+
+SEARCH_PARAMETERS = [
+    search_parameter("_id", ["Resource"], "token", "Resource.id"),
+    search_parameter("name", ["Patient"], "string", "Patient.name"),
+    search_parameter("birthdate", ["Patient", "Person"], "date", "Patient.birthDate"),
+    search_parameter("telecom", ["Patient"], "token", "Patient.telecom"),
+    search_parameter("phonetic", ["Patient"], "special", "Patient.name"),
+    search_parameter("code", ["Observation"], "token", "Observation.code"),
+    search_parameter("date", ["Observation"], "date", "Observation.effective"),
+    search_parameter(
+        "patient",
+        ["Observation"],
+        "reference",
+        "Observation.subject.where(resolve() is Patient)",
+    ),
+    search_parameter(
+        "value-quantity",
+        ["Observation"],
+        "quantity",
+        "(Observation.value as Quantity) | (Observation.value as SampledData)",
+    ),
+]
+
+
+def get_observation(subject="Patient/p1"):
+    """ """
+    return Observation.parse_obj(
+        {
+            "resourceType": "Observation",
+            "id": "o1",
+            "status": "final",
+            "code": {
+                "coding": [
+                    {"system": "http://loinc.org", "code": "29463-7", "display": "BW"}
+                ]
+            },
+            "subject": {"reference": subject},
+            "effectivePeriod": {"start": "2020-02"},
+            "valueQuantity": {
+                "value": 72.5,
+                "unit": "kg",
+                "system": "http://unitsofmeasure.org",
+                "code": "kg",
+            },
+        }
+    )
+
+
+def test_date_range():
+    """ """
+    assert date_range("2020-02") == (
+        datetime.datetime(2020, 2, 1, tzinfo=UTC),
+        datetime.datetime(2020, 2, 29, 23, 59, 59, 999999, tzinfo=UTC),
+    )
+    assert date_range(datetime.date(2020, 1, 2))[1] == datetime.datetime(
+        2020, 1, 2, 23, 59, 59, 999999, tzinfo=UTC
+    )
+    tz = datetime.timezone(datetime.timedelta(hours=2))
+    assert date_range(datetime.datetime(2020, 1, 2, 10, tzinfo=tz))[0] == (
+        datetime.datetime(2020, 1, 2, 8, tzinfo=UTC)
+    )
+    assert date_range("unknown") is None
+
+
+def test_search_indexer_extract():
+    """ """
+    indexer = SearchIndexer(SEARCH_PARAMETERS)
+    patient = Patient.parse_file(STATIC_PATH / "Patient-with-ext.json")
+    rows = indexer.extract(patient)
+    assert StringRow("Patient", None, "name", "Peter", "peter") in rows
+    assert TokenRow("Patient", None, "telecom", "phone", "(03) 5555 6473", None) in rows
+    assert [row for row in rows if row.name == "birthdate"] == [
+        DateRow(
+            "Patient",
+            None,
+            "birthdate",
+            datetime.datetime(1974, 12, 1, tzinfo=UTC),
+            datetime.datetime(1974, 12, 31, 23, 59, 59, 999999, tzinfo=UTC),
+        )
+    ]
+    assert indexer.skipped[0].name == "phonetic"
+    # compiled again after ``add``, skipped parameter is not repeated
+    indexer.add(
+        search_parameter("family", ["Patient"], "string", "Patient.name.family")
+    )
+    indexer.extract(patient)
+    indexer.extract(patient)
+    assert len(indexer.skipped) == len(
+        {(skipped.resource_type, skipped.name) for skipped in indexer.skipped}
+    )
+
+    rows = indexer.extract(get_observation())
+    assert rows == [
+        TokenRow("Observation", "o1", "code", "http://loinc.org", "29463-7", "BW"),
+        DateRow(
+            "Observation",
+            "o1",
+            "date",
+            datetime.datetime(2020, 2, 1, tzinfo=UTC),
+            None,
+        ),
+        ReferenceRow("Observation", "o1", "patient", "Patient/p1", "Patient", "p1"),
+        QuantityRow(
+            "Observation",
+            "o1",
+            "value-quantity",
+            decimal.Decimal("72.5"),
+            "http://unitsofmeasure.org",
+            "kg",
+            "kg",
+        ),
+        TokenRow("Observation", "o1", "_id", None, "o1", None),
+    ]
+    # reference to other type than Patient
+    rows = list(indexer.iter_rows([get_observation("Group/g1")]))
+    assert [row for row in rows if row.name == "patient"] == []
+
+
+def test_search_indexer_from_bundle():
+    """ """
+    bundle = Bundle.parse_obj(
+        {
+            "resourceType": "Bundle",
+            "type": "collection",
+            "entry": [{"resource": param} for param in SEARCH_PARAMETERS],
+        }
+    )
+    indexer = SearchIndexer.from_bundle(bundle)
+    names = [param.name for param in indexer.compile(Observation)]
+    assert names == ["code", "date", "patient", "value-quantity", "_id"]
@@ -0,0 +1,126 @@
+# _*_ coding: utf-8 _*_
+from fhir.resources.terminology import TerminologyIndex
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+SYSTEM = "http://example.org/CodeSystem/species"
+
+CODE_SYSTEM = {
+    "resourceType": "CodeSystem",
+    "url": SYSTEM,
+    "version": "1.0.0",
+    "status": "active",
+    "content": "complete",
+    "caseSensitive": False,
+    "concept": [
+        {
+            "code": "animal",
+            "display": "Animal",
+            "concept": [
+                {"code": "Dog", "display": "Dog", "concept": [{"code": "puppy"}]},
+                {
+                    "code": "cat",
+                    "property": [{"code": "status", "valueCode": "retired"}],
+                },
+            ],
+        },
+        {"code": "plant", "display": "Plant"},
+        {"code": "tree", "property": [{"code": "parent", "valueCode": "plant"}]},
+    ],
+}
+
+ANIMALS = {
+    "resourceType": "ValueSet",
+    "url": "http://example.org/ValueSet/animals",
+    "status": "active",
+    "compose": {
+        "include": [
+            {
+                "system": SYSTEM,
+                "filter": [{"property": "concept", "op": "is-a", "value": "animal"}],
+            }
+        ],
+        "exclude": [{"system": SYSTEM, "concept": [{"code": "cat"}]}],
+    },
+}
+
+MIXED = {
+    "resourceType": "ValueSet",
+    "url": "http://example.org/ValueSet/mixed",
+    "status": "active",
+    "compose": {
+        "include": [
+            {"valueSet": ["http://example.org/ValueSet/animals"]},
+            {"system": "http://loinc.org"},
+            {
+                "system": SYSTEM,
+                "filter": [{"property": "status", "op": "=", "value": "retired"}],
+            },
+        ]
+    },
+}
+
+CONCEPT_MAP = {
+    "resourceType": "ConceptMap",
+    "url": "http://example.org/ConceptMap/species",
+    "status": "active",
+    "group": [
+        {
+            "source": SYSTEM,
+            "target": "http://other.org/species",
+            "element": [
+                {"code": "Dog", "target": [{"code": "D", "equivalence": "equivalent"}]}
+            ],
+        }
+    ],
+}
+
+
+def test_terminology_index():
+    """ """
+    index = TerminologyIndex([CODE_SYSTEM, ANIMALS, MIXED, CONCEPT_MAP])
+    assert sorted(index.expand(ANIMALS["url"]).codes) == [
+        (SYSTEM, "animal"),
+        (SYSTEM, "dog"),
+        (SYSTEM, "puppy"),
+    ]
+    assert index.validate_code(ANIMALS["url"], SYSTEM, "DOG") is True
+    assert index.validate_code(ANIMALS["url"], SYSTEM, "cat") is False
+    assert index(MIXED["url"], SYSTEM, "cat") is True
+    # LOINC is not loaded, unknown
+    assert index.validate_code(MIXED["url"], "http://loinc.org", "1-8") is None
+    assert index.validate_code("http://example.org/ValueSet/x", SYSTEM, "cat") is None
+
+    assert index.lookup(SYSTEM, "PUPPY").parents == frozenset({"dog"})
+    assert index.lookup(SYSTEM, "unknown") is None
+    assert index.subsumes(SYSTEM, "animal", "puppy") == "subsumes"
+    assert index.subsumes(SYSTEM, "puppy", "animal") == "subsumed-by"
+    assert index.subsumes(SYSTEM, "plant", "tree") == "subsumes"
+    assert index.subsumes(SYSTEM, "tree", "dog") == "not-subsumed"
+
+    translations = index.translate(
+        SYSTEM, "Dog", target_system="http://other.org/species"
+    )
+    assert [(item.code, item.equivalence) for item in translations] == [
+        ("D", "equivalent")
+    ]
+
+    # case insensitive code system
+    assert index.validate_code(ANIMALS["url"], None, "DOG") is True
+    assert index.validate_code(ANIMALS["url"], None, "PUPPY") is True
+    assert index.validate_code(ANIMALS["url"], None, "CAT") is False
+    assert index.translate(SYSTEM, "dog") == translations
+    assert index.translate(SYSTEM, "DOG") == translations
+    # concept map is added before its code system
+    index = TerminologyIndex([CONCEPT_MAP, CODE_SYSTEM])
+    assert index.translate(SYSTEM, "dOG") == translations
+
+
+def test_terminology_index_save_load(tmp_path):
+    """ """
+    index = TerminologyIndex([CODE_SYSTEM, ANIMALS])
+    path = tmp_path / "terminology.idx"
+    index.save(path)
+    loaded = TerminologyIndex.load(path)
+    assert loaded.validate_code(ANIMALS["url"], SYSTEM, "puppy") is True
+    assert loaded.code_system(f"{SYSTEM}|1.0.0").version == "1.0.0"
@@ -108,3 +108,155 @@ def test_model_obj_xml_file():
     patient.contained[1].text = None
     patient3.contained[1].text = None
     assert patient3 == patient
+
+
+def _legacy_xml_loads(klass, b):
+    """``Node`` tree based loading"""
+    node = utils.xml.Node.from_element(lxml.etree.fromstring(b))
+    return klass.parse_obj(node.to_fhir(klass))
+
+
+def test_xml_iterparse_same_as_node_tree():
+    """ """
+    for filename in ("Patient-with-ext.xml", "patient-example-animal(animal).xml"):
+        data = (STATIC_PATH / filename).read_bytes()
+        expected = _legacy_xml_loads(Patient, data)
+        assert Patient.parse_raw(data, content_type="text/xml") == expected
+        # tiny chunks, events are split everywhere
+        with open(STATIC_PATH / filename, "rb") as fp:
+            params = utils.xml.xml_iterparse(Patient, fp, chunk_size=7)
+        assert Patient.parse_obj(params).json() == expected.json()
+
+
+def test_xml_iterparse_comments_xhtml_and_primitive_extension():
+    """ """
+    data = b"""<?xml version="1.0" encoding="UTF-8"?>
+<Patient xmlns="http://hl7.org/fhir">
+  <id value="p1"/>
+  <text>
+    <!-- narrative -->
+    <status value="generated"/>
+    <!-- carried over xhtml -->
+    <div xmlns="http://www.w3.org/1999/xhtml"><p>Jim</p></div>
+    <!-- not used -->
+  </text>
+  <!-- active comment -->
+  <active value="true"/>
+  <name>
+    <given value="Peter"/>
+    <given>
+      <!-- extension comment -->
+      <extension url="http://hl7.org/fhir/StructureDefinition/data-absent-reason">
+        <valueCode value="unknown"/>
+      </extension>
+    </given>
+    <given value="James"><!-- dropped --></given>
+  </name>
+  <contained>
+    <!-- organization -->
+    <Organization>
+      <id value="o1"/>
+    </Organization>
+  </contained>
+</Patient>
+"""
+    patient = Patient.parse_raw(data, content_type="text/xml")
+    assert patient == _legacy_xml_loads(Patient, data)
+
+    assert patient.text.status__ext.fhir_comments == " narrative "
+    assert patient.text.div.startswith("<div")
+    assert patient.active__ext.fhir_comments == " active comment "
+    assert patient.name[0].given == ["Peter", None, "James"]
+    assert patient.name[0].given__ext[0] is None
+    ext = patient.name[0].given__ext[1].extension[0]
+    assert ext.valueCode == "unknown"
+    assert ext.fhir_comments == " extension comment "
+    assert patient.contained[0].resource_type == "Organization"
+    assert patient.contained[0].fhir_comments == " organization "
+
+
+def test_parse_file_xml_bundle(tmp_path):
+    """Bundle file is read in chunks"""
+    from fhir.resources.bundle import Bundle
+
+    entries = [
+        {
+            "fullUrl": f"http://example.org/Patient/{i}",
+            "resource": {"resourceType": "Patient", "id": str(i), "active": True},
+        }
+        for i in range(500)
+    ]
+    bundle = Bundle.parse_obj(
+        {"resourceType": "Bundle", "type": "collection", "entry": entries}
+    )
+    path = tmp_path / "bundle.xml"
+    path.write_bytes(bundle.xml(pretty_print=True, return_bytes=True))
+
+    bundle2 = Bundle.parse_file(path)
+    assert bundle2 == bundle
+    assert bundle2.entry[499].resource.id == "499"
+
+
+def test_xml_dump_stream(tmp_path):
+    """ """
+    from fhir.resources.bundle import Bundle
+
+    patient = Patient.parse_file(STATIC_PATH / "Patient-with-ext.json")
+    # same output as ``Node`` tree
+    expected = utils.xml.Node.from_fhir_obj(patient).to_string(pretty_print=True)
+    assert patient.xml(pretty_print=True, return_bytes=True) == expected
+
+    bundle = Bundle.parse_obj(
+        {
+            "resourceType": "Bundle",
+            "type": "collection",
+            "entry": [{"resource": patient.dict()}, {"resource": patient.dict()}],
+        }
+    )
+    path = tmp_path / "bundle.xml"
+    utils.xml_dump(bundle, path)
+    assert path.read_bytes() == bundle.xml(return_bytes=True)
+    assert Bundle.parse_file(path) == Bundle.parse_raw(
+        bundle.xml(), content_type="text/xml"
+    )
+
+
+def test_xml_exclude_comments():
+    """ """
+    patient = Patient.parse_obj(
+        {
+            "resourceType": "Patient",
+            "id": "p1",
+            "_active": {"fhir_comments": "active comment"},
+            "active": True,
+            "name": [{"fhir_comments": ["name comment"], "family": "Doe"}],
+        }
+    )
+    assert "<!--active comment-->" in patient.xml()
+    xml = patient.xml(exclude_comments=True)
+    assert "comment" not in xml
+    assert Patient.parse_raw(xml, content_type="text/xml") == patient.copy(
+        update={
+            "active__ext": None,
+            "name": [patient.name[0].copy(update={"fhir_comments": None})],
+        }
+    )
+
+
+def test_stu3_xml_contained_resource():
+    """STU3 primitives were marked as R4 release, contained resource
+    was looked up in the non-existent ``fhir.resources.R4`` package."""
+    from fhir.resources.STU3 import fhirtypes
+    from fhir.resources.STU3.bundle import Bundle
+
+    assert fhirtypes.Primitive.__fhir_release__ == "STU3"
+    bundle = Bundle.parse_obj(
+        {
+            "resourceType": "Bundle",
+            "type": "collection",
+            "entry": [{"resource": {"resourceType": "Patient", "id": "p1"}}],
+        }
+    )
+    loaded = Bundle.parse_raw(bundle.xml(), content_type="text/xml")
+    assert loaded.entry[0].resource.id == "p1"
+    assert loaded == bundle
@@ -0,0 +1,130 @@
+# _*_ coding: utf-8 _*_
+import pytest  # type: ignore
+from pydantic import ValidationError
+
+from fhir.resources.auditevent import AuditEventEntityDetail
+from fhir.resources.core.validators import (
+    get_choice_groups,
+    reference_targets_validation,
+    validate_required_primitive_elements,
+)
+from fhir.resources.observation import Observation
+from fhir.resources.STU3.extension import Extension as STU3Extension
+
+__author__ = "Md Nazrul Islam<email2nazrul@gmail.com>"
+
+
+def test_choice_groups():
+    """ """
+    groups, all_fields, any_required = get_choice_groups(Observation)
+    assert groups is get_choice_groups(Observation)[0]
+    assert [group[0] for group in groups] == ["effective", "value"]
+    assert groups[0][2] == [
+        "effectiveDateTime",
+        "effectiveInstant",
+        "effectivePeriod",
+        "effectiveTiming",
+    ]
+    assert "valueQuantity" in all_fields
+    assert any_required is False
+
+    groups, all_fields, any_required = get_choice_groups(STU3Extension)
+    assert any_required is False
+    assert groups[0][0] == "value"
+
+
+def test_validate_choice_fields():
+    """ """
+    data = {"status": "final", "code": {"text": "test"}}
+    Observation.parse_obj(dict(data, valueString="ok", valueBoolean=None))
+
+    with pytest.raises(ValidationError) as exc_info:
+        Observation.parse_obj(dict(data, valueString="ok", valueBoolean=True))
+    assert "but got multiple!" in str(exc_info.value)
+    assert "'valueBoolean', 'valueCodeableConcept'" in str(exc_info.value)
+
+    # required choice
+    AuditEventEntityDetail(type="x", valueString="ok")
+    with pytest.raises(ValidationError) as exc_info:
+        AuditEventEntityDetail(type="x", valueString=None)
+    assert "Expect any of field value from this list" in str(exc_info.value)
+
+
+def test_validate_required_primitive_elements():
+    """ """
+    required_fields = (("status", "_status"), ("code", "_code"))
+    values = {"status": "final", "code": "x"}
+    assert (
+        validate_required_primitive_elements(Observation, values, required_fields)
+        is values
+    )
+
+    with pytest.raises(ValidationError) as exc_info:
+        Observation.parse_obj({"code": {"text": "test"}})
+    assert exc_info.value.errors()[0]["loc"] == ("__root__", "status")
+    assert exc_info.value.errors()[0]["type"] == "value_error.missing"
+
+    with pytest.raises(ValidationError) as exc_info:
+        Observation.parse_obj({"status": None, "code": {"text": "test"}})
+    assert exc_info.value.errors()[0]["type"] == "type_error.none.not_allowed"
+
+    # primitive extension explains the missing value
+    ext = {"extension": [{"url": "http://example.org/absent", "valueString": "x"}]}
+    obj = Observation.parse_obj({"_status": ext, "code": {"text": "test"}})
+    assert obj.status is None
+    assert obj.status__ext.extension[0].valueString == "x"
+
+
+def test_reference_targets_validation():
+    """ """
+    targets = Observation.reference_targets()
+    assert targets is Observation.reference_targets()
+    assert targets["encounter"] == frozenset(["Encounter"])
+    assert "Resource" in targets["focus"]
+
+    data = {
+        "resourceType": "Observation",
+        "status": "final",
+        "code": {"text": "weight"},
+        "encounter": {"reference": "Patient/1"},
+        "focus": [{"reference": "Patient/1"}],
+    }
+    # opt-in
+    Observation.parse_obj(data)
+    with reference_targets_validation():
+        with pytest.raises(ValidationError, match="'encounter'"):
+            Observation.parse_obj(data)
+        data["encounter"] = {"type": "Patient", "reference": "urn:uuid:1"}
+        with pytest.raises(ValidationError, match="type 'Patient'"):
+            Observation.parse_obj(data)
+        data["encounter"] = {
+            "type": "http://hl7.org/fhir/StructureDefinition/Encounter",
+            "reference": "http://example.org/fhir/Encounter/1/_history/2",
+        }
+        obj = Observation.parse_obj(data)
+        with pytest.raises(ValidationError):
+            obj.encounter = {"reference": "Group/1"}
+    obj.encounter = {"reference": "Group/1"}
+
+
+def test_reference_targets_canonical():
+    """ """
+    from fhir.resources.careplan import CarePlan
+
+    assert "instantiatesCanonical" not in CarePlan.reference_targets()
+    assert CarePlan.reference_targets()["subject"] == frozenset(["Patient", "Group"])
+    with reference_targets_validation():
+        obj = CarePlan(
+            status="active",
+            intent="plan",
+            subject={"reference": "Patient/1"},
+            instantiatesCanonical=["http://example.org/PlanDefinition/x"],
+        )
+        assert obj.instantiatesCanonical == ["http://example.org/PlanDefinition/x"]
+        with pytest.raises(ValidationError, match="'subject'"):
+            CarePlan(
+                status="active",
+                intent="plan",
+                subject={"reference": "Device/1"},
+                instantiatesCanonical=["http://example.org/PlanDefinition/x"],
+            )